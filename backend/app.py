@@ -9,9 +9,12 @@ def filtered_getaddrinfo(*args, **kwargs):
 socket.getaddrinfo = filtered_getaddrinfo
 import os
 
-from src import create_app
+# Process pool workers are spawned and re-import this file as __mp_main__;
+# they only need their own module (e.g. rendering/variants.py), not the app
+if __name__ != "__mp_main__":
+    from src import create_app
 
-app = create_app()
+    app = create_app()
 
 if __name__ == "__main__":
     debug = os.getenv("FLASK_DEBUG", "0") == "1"
@@ -36,4 +36,72 @@ class Config:
     RESEND_FROM_EMAIL = os.environ.get('RESEND_FROM_EMAIL', 'onboarding@resend.dev')
     BREVO_API_KEY = os.environ.get('BREVO_API_KEY')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@yourdomain.com')
-    FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
\ No newline at end of file
+    FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+    # Background text extraction (documents are processed off the request thread)
+    EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '2'))
+    # Bulk uploads (several files or a ZIP archive in one request)
+    BULK_UPLOAD_MAX_FILES = int(os.getenv('BULK_UPLOAD_MAX_FILES', '100'))
+    BULK_UPLOAD_MAX_ENTRY_MB = int(os.getenv('BULK_UPLOAD_MAX_ENTRY_MB', '100'))
+    # PDFs with at least this many pages are extracted by a process pool
+    PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv('PDF_PARALLEL_PAGE_THRESHOLD', '150'))
+    PDF_PARALLEL_WORKERS = int(os.getenv('PDF_PARALLEL_WORKERS', str(os.cpu_count() or 1)))
+    PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '32'))
+    # Extracted text is stored as passages of ~CHUNK_TARGET_TOKENS tokens;
+    # generation sends the most relevant ones, up to GENERATION_TOKEN_BUDGET tokens
+    CHUNK_TARGET_TOKENS = int(os.getenv('CHUNK_TARGET_TOKENS', '300'))
+    GENERATION_TOKEN_BUDGET = int(os.getenv('GENERATION_TOKEN_BUDGET', '6000'))
+    # QCM generation runs as a background job; at most this many AI calls at once
+    GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', '4'))
+    # Large question counts are split into shards generated concurrently;
+    # a failed shard is retried on its own
+    GENERATION_SHARD_SIZE = int(os.getenv('GENERATION_SHARD_SIZE', '10'))
+    GENERATION_SHARD_CONCURRENCY = int(os.getenv('GENERATION_SHARD_CONCURRENCY', '3'))
+    GENERATION_SHARD_RETRIES = int(os.getenv('GENERATION_SHARD_RETRIES', '2'))
+    # Model used for generation: 'gemini' or 'fake' (offline, for benchmarks and load tests)
+    LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')
+    LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-flash-latest')
+    GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+    FAKE_LLM_LATENCY_MS = int(os.getenv('FAKE_LLM_LATENCY_MS', '1500'))
+    FAKE_LLM_FAILURE_RATE = float(os.getenv('FAKE_LLM_FAILURE_RATE', '0'))
+    FAKE_LLM_SEED = os.getenv('FAKE_LLM_SEED')
+    # Cache of generation results (per process, TTL + LRU); GENERATION_CACHE_SIZE=0 disables it
+    GENERATION_CACHE_SIZE = int(os.getenv('GENERATION_CACHE_SIZE', '256'))
+    GENERATION_CACHE_TTL = int(os.getenv('GENERATION_CACHE_TTL', str(24 * 3600)))
+    GENERATION_CACHE_MODES = tuple(os.getenv('GENERATION_CACHE_MODES', 'professor').split(','))
+    # Limits around model calls (per process): quota, retries with backoff, circuit breaker
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '60'))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '1000000'))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv('LLM_BACKOFF_BASE_SECONDS', '1'))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv('LLM_BACKOFF_MAX_SECONDS', '20'))
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv('LLM_RATE_LIMIT_MAX_WAIT_SECONDS', '30'))
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+    LLM_BREAKER_RESET_SECONDS = int(os.getenv('LLM_BREAKER_RESET_SECONDS', '60'))
+    # Generation jobs a single user may have queued or running at once
+    GENERATION_MAX_JOBS_PER_USER = int(os.getenv('GENERATION_MAX_JOBS_PER_USER', '2'))
+    # Each process refreshes the heartbeat of the jobs it holds; a queued/running job whose
+    # heartbeat is older than the lease was lost (restart, crash) and is marked failed
+    GENERATION_JOB_HEARTBEAT_SECONDS = int(os.getenv('GENERATION_JOB_HEARTBEAT_SECONDS', '30'))
+    GENERATION_JOB_LEASE_SECONDS = int(os.getenv('GENERATION_JOB_LEASE_SECONDS', '120'))
+    # Semantic near-duplicate detection (CPU sentence embeddings via transformers)
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+    DUPLICATE_SIMILARITY = float(os.getenv('DUPLICATE_SIMILARITY', '0.9'))
+    GENERATION_FILTER_DUPLICATES = os.getenv('GENERATION_FILTER_DUPLICATES') == 'True'
+    # Pre-generated practice questions per document and level (PRACTICE_POOL_SIZE=0 disables the pool)
+    PRACTICE_POOL_SIZE = int(os.getenv('PRACTICE_POOL_SIZE', '30'))
+    PRACTICE_POOL_MAX = int(os.getenv('PRACTICE_POOL_MAX', '300'))
+    PRACTICE_POOL_LOW_WATER = int(os.getenv('PRACTICE_POOL_LOW_WATER', '10'))
+    PRACTICE_POOL_LEVELS = tuple(os.getenv('PRACTICE_POOL_LEVELS', 'easy,medium,hard').split(','))
+    # Threads filling pools; kept apart from GENERATION_WORKERS so fills never delay interactive jobs
+    PRACTICE_POOL_WORKERS = int(os.getenv('PRACTICE_POOL_WORKERS', '1'))
+    # Rendered QCM PDFs are cached on disk; big QCMs render in the background
+    PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(os.getcwd(), 'pdf_cache'))
+    PDF_BACKGROUND_THRESHOLD = int(os.getenv('PDF_BACKGROUND_THRESHOLD', '80'))
+    PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '2'))
+    # Seeded paper variants (one per student), rendered in a process pool
+    VARIANTS_MAX = int(os.getenv('VARIANTS_MAX', '1000'))
+    VARIANT_RENDER_WORKERS = int(os.getenv('VARIANT_RENDER_WORKERS', str(os.cpu_count() or 1)))
+    # Seconds an exam session looked up by code is cached per process for /exams/join
+    EXAM_SESSION_CACHE_TTL = int(os.getenv('EXAM_SESSION_CACHE_TTL', '30'))
+    # Autosaves are buffered per process and written every AUTOSAVE_FLUSH_SECONDS (0 = write each save immediately)
+    AUTOSAVE_FLUSH_SECONDS = float(os.getenv('AUTOSAVE_FLUSH_SECONDS', '2'))
\ No newline at end of file
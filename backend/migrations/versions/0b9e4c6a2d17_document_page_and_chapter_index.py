@@ -0,0 +1,41 @@
+"""Page and chapter index for documents
+
+Revision ID: 0b9e4c6a2d17
+Revises: f5a3d7c81e94
+Create Date: 2026-02-16 15:48:30.774192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9e4c6a2d17'
+down_revision = 'f5a3d7c81e94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_pages',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('page_number', sa.Integer(), nullable=False),
+    sa.Column('char_start', sa.Integer(), nullable=False),
+    sa.Column('char_end', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['content_hash'], ['document_blobs.sha256'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('content_hash', 'page_number')
+    )
+    op.create_table('document_chapters',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.Column('char_start', sa.Integer(), nullable=False),
+    sa.Column('char_end', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['content_hash'], ['document_blobs.sha256'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('content_hash', 'number')
+    )
+
+
+def downgrade():
+    op.drop_table('document_chapters')
+    op.drop_table('document_pages')
@@ -0,0 +1,39 @@
+"""Add extraction status to documents
+
+Revision ID: 3f1c2a9d7b10
+Revises: 8785d0271372
+Create Date: 2026-01-12 10:14:32.481203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = '8785d0271372'
+branch_labels = None
+depends_on = None
+
+document_status = sa.Enum('PENDING', 'PROCESSING', 'READY', 'FAILED', name='documentstatus')
+
+
+def upgrade():
+    document_status.create(op.get_bind(), checkfirst=True)
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        # Documents uploaded before this migration were extracted synchronously
+        batch_op.add_column(sa.Column('status', document_status, nullable=False, server_default='READY'))
+        batch_op.add_column(sa.Column('status_message', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('processed_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.alter_column('status', server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('processed_at')
+        batch_op.drop_column('status_message')
+        batch_op.drop_column('status')
+
+    document_status.drop(op.get_bind(), checkfirst=True)
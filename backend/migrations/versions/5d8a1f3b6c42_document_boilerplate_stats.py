@@ -0,0 +1,32 @@
+"""Track characters of repeated headers/footers removed at extraction
+
+Revision ID: 5d8a1f3b6c42
+Revises: 0b9e4c6a2d17
+Create Date: 2026-02-23 10:02:19.537680
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8a1f3b6c42'
+down_revision = '0b9e4c6a2d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('boilerplate_chars', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('boilerplate_chars', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('boilerplate_chars')
+
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.drop_column('boilerplate_chars')
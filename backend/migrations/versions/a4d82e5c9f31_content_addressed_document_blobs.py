@@ -0,0 +1,42 @@
+"""Content-addressed document blobs
+
+Revision ID: a4d82e5c9f31
+Revises: 3f1c2a9d7b10
+Create Date: 2026-01-19 16:42:08.913555
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d82e5c9f31'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('extracted_text', sa.Text(), nullable=True),
+    sa.Column('extracted_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    # Existing documents keep their legacy uploads/{user_id}_{filename} path (content_hash NULL)
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_content_hash'), ['content_hash'], unique=False)
+        batch_op.create_foreign_key('fk_documents_content_hash', 'document_blobs', ['content_hash'], ['sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_documents_content_hash', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_documents_content_hash'))
+        batch_op.drop_column('content_hash')
+
+    op.drop_table('document_blobs')
@@ -0,0 +1,26 @@
+"""Questions a generation job could not produce
+
+Revision ID: a4e9c2d7f318
+Revises: e7c4a2f9b316
+Create Date: 2026-03-13 14:08:31.275904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e9c2d7f318'
+down_revision = 'e7c4a2f9b316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('missing_questions', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        batch_op.drop_column('missing_questions')
@@ -0,0 +1,42 @@
+"""One answer per question and attempt
+
+Revision ID: a6d3e9b27c40
+Revises: f2c8a4d61b93
+Create Date: 2026-03-11 14:27:05.904361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d3e9b27c40'
+down_revision = 'f2c8a4d61b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Concurrent autosaves may have stored the same answer twice: keep the most recent row
+    op.execute("""
+        DELETE FROM student_answers
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY attempt_id, question_id
+                    ORDER BY saved_at DESC NULLS LAST, id DESC
+                ) AS rank
+                FROM student_answers
+            ) ranked
+            WHERE rank > 1
+        )
+    """)
+
+    # The unique index on (attempt_id, question_id) also serves lookups by attempt
+    with op.batch_alter_table('student_answers', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_student_answers_attempt_question', ['attempt_id', 'question_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('student_answers', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_student_answers_attempt_question', type_='unique')
@@ -0,0 +1,31 @@
+"""Cached sentence embeddings of question texts
+
+Revision ID: b3e8d2f47a19
+Revises: 9a7c3e51b2d8
+Create Date: 2026-02-26 15:12:44.903127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d2f47a19'
+down_revision = '9a7c3e51b2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('question_embeddings',
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('model', sa.String(length=200), nullable=False),
+    sa.Column('dim', sa.Integer(), nullable=False),
+    sa.Column('vector', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('text_hash', 'model')
+    )
+
+
+def downgrade():
+    op.drop_table('question_embeddings')
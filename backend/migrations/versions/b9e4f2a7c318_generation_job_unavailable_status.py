@@ -0,0 +1,25 @@
+"""Generation job status for an unavailable AI provider
+
+Revision ID: b9e4f2a7c318
+Revises: a6d3e9b27c40
+Create Date: 2026-03-12 10:41:18.226905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4f2a7c318'
+down_revision = 'a6d3e9b27c40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TYPE jobstatus ADD VALUE IF NOT EXISTS 'UNAVAILABLE'")
+
+
+def downgrade():
+    # Postgres cannot drop an enum value: fold the rows back into FAILED and keep the label
+    op.execute("UPDATE generation_jobs SET status = 'FAILED' WHERE status = 'UNAVAILABLE'")
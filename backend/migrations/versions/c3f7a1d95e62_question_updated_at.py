@@ -0,0 +1,27 @@
+"""Last edit time of questions
+
+Revision ID: c3f7a1d95e62
+Revises: b9e4f2a7c318
+Create Date: 2026-03-12 15:03:51.774120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a1d95e62'
+down_revision = 'b9e4f2a7c318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL: they are older than any cached index
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,48 @@
+"""Pre-generated practice question pool per document
+
+Revision ID: c5f1a8e09d3b
+Revises: b3e8d2f47a19
+Create Date: 2026-03-02 11:27:31.448210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f1a8e09d3b'
+down_revision = 'b3e8d2f47a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('practice_questions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.String(length=50), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('choices', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('practice_questions', schema=None) as batch_op:
+        batch_op.create_index('ix_practice_questions_document_level', ['document_id', 'level'], unique=False)
+
+    op.create_table('practice_served',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('practice_question_id', sa.Integer(), nullable=False),
+    sa.Column('served_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['practice_question_id'], ['practice_questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'practice_question_id')
+    )
+
+
+def downgrade():
+    op.drop_table('practice_served')
+    with op.batch_alter_table('practice_questions', schema=None) as batch_op:
+        batch_op.drop_index('ix_practice_questions_document_level')
+
+    op.drop_table('practice_questions')
@@ -0,0 +1,44 @@
+"""Precomputed preview, word and page counts for documents
+
+Revision ID: c7e19b04d2a6
+Revises: a4d82e5c9f31
+Create Date: 2026-01-26 09:31:55.102847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e19b04d2a6'
+down_revision = 'a4d82e5c9f31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('preview', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('page_count', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('page_count', sa.Integer(), nullable=True))
+
+    # Backfill from the text already stored (page counts stay unknown for old rows)
+    op.execute("""
+        UPDATE documents
+        SET preview = LEFT(extracted_text, 100),
+            word_count = COALESCE(array_length(regexp_split_to_array(btrim(extracted_text), '\\s+'), 1), 0)
+        WHERE extracted_text IS NOT NULL AND extracted_text <> ''
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.drop_column('page_count')
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('page_count')
+        batch_op.drop_column('word_count')
+        batch_op.drop_column('preview')
@@ -0,0 +1,32 @@
+"""Indexes for the paginated QCM list and question counts
+
+Revision ID: d8b2c6f3e417
+Revises: c5f1a8e09d3b
+Create Date: 2026-03-04 16:48:09.302771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b2c6f3e417'
+down_revision = 'c5f1a8e09d3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('qcms', schema=None) as batch_op:
+        batch_op.create_index('ix_qcms_user_created', ['user_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_questions_qcm_id'), ['qcm_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_questions_qcm_id'))
+
+    with op.batch_alter_table('qcms', schema=None) as batch_op:
+        batch_op.drop_index('ix_qcms_user_created')
@@ -0,0 +1,27 @@
+"""When a worker started extracting a document
+
+Revision ID: d8b2e6f4a1c7
+Revises: c3f7a1d95e62
+Create Date: 2026-03-13 09:27:44.108352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b2e6f4a1c7'
+down_revision = 'c3f7a1d95e62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Documents already PROCESSING stay NULL and count as stale for requeue_extractions
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('processing_started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('processing_started_at')
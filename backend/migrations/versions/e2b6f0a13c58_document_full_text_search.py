@@ -0,0 +1,39 @@
+"""Full-text search vector on documents
+
+Revision ID: e2b6f0a13c58
+Revises: c7e19b04d2a6
+Create Date: 2026-02-02 14:05:47.660219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6f0a13c58'
+down_revision = 'c7e19b04d2a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Index the documents that were already extracted (same expression as DocumentRepository)
+    op.execute("""
+        UPDATE documents
+        SET search_vector =
+            setweight(to_tsvector('french'::regconfig, coalesce(module, '')), 'A') ||
+            setweight(to_tsvector('french'::regconfig, left(coalesce(extracted_text, ''), 500000)), 'B')
+    """)
+
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_documents_search_vector', table_name='documents', postgresql_using='gin')
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
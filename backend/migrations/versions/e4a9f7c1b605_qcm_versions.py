@@ -0,0 +1,47 @@
+"""Immutable QCM versions referenced by exam sessions
+
+Revision ID: e4a9f7c1b605
+Revises: d8b2c6f3e417
+Create Date: 2026-03-06 10:35:52.118604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9f7c1b605'
+down_revision = 'd8b2c6f3e417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('qcm_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('qcm_id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['qcm_id'], ['qcms.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    with op.batch_alter_table('qcm_versions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_qcm_versions_qcm_id'), ['qcm_id'], unique=False)
+
+    # Existing sessions get their snapshot the first time they are joined or graded
+    with op.batch_alter_table('exam_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('qcm_version_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_exam_sessions_qcm_version_id', 'qcm_versions', ['qcm_version_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('exam_sessions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_exam_sessions_qcm_version_id', type_='foreignkey')
+        batch_op.drop_column('qcm_version_id')
+
+    with op.batch_alter_table('qcm_versions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_qcm_versions_qcm_id'))
+
+    op.drop_table('qcm_versions')
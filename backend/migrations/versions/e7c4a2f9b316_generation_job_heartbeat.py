@@ -0,0 +1,27 @@
+"""Heartbeat of generation jobs, to detect jobs lost in a restart
+
+Revision ID: e7c4a2f9b316
+Revises: d8b2e6f4a1c7
+Create Date: 2026-03-13 11:52:09.640127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c4a2f9b316'
+down_revision = 'd8b2e6f4a1c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL: unfinished ones are judged by created_at
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
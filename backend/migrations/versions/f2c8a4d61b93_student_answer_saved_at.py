@@ -0,0 +1,26 @@
+"""Time of the autosave a student answer comes from
+
+Revision ID: f2c8a4d61b93
+Revises: e4a9f7c1b605
+Create Date: 2026-03-09 09:12:40.537218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a4d61b93'
+down_revision = 'e4a9f7c1b605'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('student_answers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('saved_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('student_answers', schema=None) as batch_op:
+        batch_op.drop_column('saved_at')
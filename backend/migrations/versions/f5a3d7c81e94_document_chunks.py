@@ -0,0 +1,35 @@
+"""Document chunks for passage selection
+
+Revision ID: f5a3d7c81e94
+Revises: e2b6f0a13c58
+Create Date: 2026-02-09 11:27:13.348021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5a3d7c81e94'
+down_revision = 'e2b6f0a13c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing blobs are chunked on the fly at generation time until re-extracted
+    op.create_table('document_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('char_start', sa.Integer(), nullable=False),
+    sa.Column('char_end', sa.Integer(), nullable=False),
+    sa.Column('token_estimate', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['content_hash'], ['document_blobs.sha256'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'position', name='uq_document_chunks_position')
+    )
+
+
+def downgrade():
+    op.drop_table('document_chunks')
@@ -0,0 +1 @@
+"""PDF rendering that does not depend on the Flask app (safe to import in worker processes)."""
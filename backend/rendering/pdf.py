@@ -3,30 +3,18 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from io import BytesIO
 
-class PDFGenerator:
-    @staticmethod
-    def create_pdf(qcm_object):
-        buffer = BytesIO()
-        
-        # 1. Setup the Document with margins (72 points = 1 inch)
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=50,
-            leftMargin=50,
-            topMargin=50,
-            bottomMargin=50
-        )
-        
-        story = [] # This list holds all the elements (paragraphs, spaces)
+_styles = None
+
+def _get_styles():
+    """Paragraph styles are built once per process; ReportLab only reads them."""
+    global _styles
+    if _styles is None:
         styles = getSampleStyleSheet()
-        
-        # 2. Define Custom Styles
-        
+
         # Title Style
         title_style = styles["Heading1"]
         title_style.alignment = 1 # Center alignment
-        
+
         # Question Style (Bold & Bigger)
         question_style = ParagraphStyle(
             'QuestionStyle',
@@ -46,6 +34,34 @@ class PDFGenerator:
             leftIndent=20,     # <--- Indents the options
             spaceAfter=4
         )
+        _styles = (title_style, question_style, choice_style)
+    return _styles
+
+class PDFGenerator:
+    @staticmethod
+    def create_pdf(qcm_object):
+        buffer = BytesIO()
+        PDFGenerator.render(qcm_object, buffer)
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def render(qcm_object, output):
+        """Writes the PDF to `output` (a path or a binary file object)."""
+        # 1. Setup the Document with margins (72 points = 1 inch)
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=A4,
+            rightMargin=50,
+            leftMargin=50,
+            topMargin=50,
+            bottomMargin=50
+        )
+        
+        story = [] # This list holds all the elements (paragraphs, spaces)
+
+        # 2. Styles (shared, see _get_styles)
+        title_style, question_style, choice_style = _get_styles()
 
         # 3. Build the Content
         
@@ -76,5 +92,14 @@ class PDFGenerator:
 
         # 4. Generate PDF
         doc.build(story)
-        buffer.seek(0)
-        return buffer
\ No newline at end of file
+
+    @staticmethod
+    def render_answer_key(title, answers, output):
+        """answers: correct letter of each question, in paper order."""
+        doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=50)
+        title_style, _, choice_style = _get_styles()
+
+        story = [Paragraph(title, title_style), Spacer(1, 24)]
+        for i, letter in enumerate(answers, 1):
+            story.append(Paragraph(f"<b>{i}.</b> {letter}", choice_style))
+        doc.build(story)
@@ -0,0 +1,42 @@
+"""
+Worker side of paper variants (see src/qcm/variants.py).
+
+This package sits outside `src` on purpose: importing anything under `src`
+runs src/__init__.py, which imports Flask, SQLAlchemy and every blueprint.
+Spawned render workers import this module only (app.py skips building the
+app when a worker re-imports it), so they start with ReportLab alone.
+"""
+import io
+import random
+from types import SimpleNamespace
+from .pdf import PDFGenerator
+
+def make_variant(content, seed):
+    """Returns: (questions in paper order with shuffled choices, correct letter per question)"""
+    rng = random.Random(seed)
+    questions = list(content["questions"])
+    rng.shuffle(questions)
+
+    shuffled = []
+    key = []
+    for q in questions:
+        choices = list(q["choices"])
+        rng.shuffle(choices)
+        correct = next((i for i, c in enumerate(choices) if c.get("is_correct")), -1)
+        key.append(chr(65 + correct) if correct >= 0 else "?")
+        shuffled.append(SimpleNamespace(text=q["text"], choices=choices))
+    return shuffled, key
+
+def render_batch(content, seeds, numbers):
+    """Runs in a worker process. Returns: [(number, seed, variant pdf bytes, key pdf bytes, key)]"""
+    rendered = []
+    for number, seed in zip(numbers, seeds):
+        questions, key = make_variant(content, seed)
+        label = f"{content['title']} - Variante {number}"
+
+        paper = io.BytesIO()
+        PDFGenerator.render(SimpleNamespace(title=label, questions=questions), paper)
+        answers = io.BytesIO()
+        PDFGenerator.render_answer_key(f"{label} - Corrigé", key, answers)
+        rendered.append((number, seed, paper.getvalue(), answers.getvalue(), key))
+    return rendered
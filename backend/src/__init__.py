@@ -8,7 +8,8 @@ from src.qcm import qcm_bp
 from src.exams import exams_bp
 from src.stats import stats_bp
 from src.school import school_bp
-from src.commands import create_admin
+from src.commands import create_admin, requeue_extractions, benchmark_generation, benchmark_question_insert, benchmark_variants
+from src.qcm.providers import configure_provider
 
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
@@ -35,6 +36,7 @@ def create_app():
     bcrypt.init_app(app)
 
     Swagger(app)
+    configure_provider(app)
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(users_bp, url_prefix="/users")
@@ -45,5 +47,9 @@ def create_app():
     app.register_blueprint(school_bp, url_prefix="/school")
 
     app.cli.add_command(create_admin)
+    app.cli.add_command(requeue_extractions)
+    app.cli.add_command(benchmark_generation)
+    app.cli.add_command(benchmark_question_insert)
+    app.cli.add_command(benchmark_variants)
 
     return app
\ No newline at end of file
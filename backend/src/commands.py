@@ -1,8 +1,19 @@
 #flask create_admin admin@gmail.com Password123 <= Command to create a superuser admin
+import time
+from datetime import datetime, timedelta
 import click
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
 from flask.cli import with_appcontext
 from src.extensions import db, bcrypt
 from src.users.models import User, UserRole
+from src.documents.repository import DocumentRepository
+from src.documents.tasks import process_document
+from src.qcm.service import QCMService
+from src.qcm.repository import QCMRepository
+from src.qcm.models import QCM, Question
+from src.qcm.providers import get_provider
+from src.qcm.resilience import ProviderUnavailable
 
 @click.command(name='create_admin')
 @click.argument('email')
@@ -34,4 +45,137 @@ def create_admin(email, password):
     db.session.add(admin)
     db.session.commit()
     
-    print(f"Success! Admin {email} created.")
\ No newline at end of file
+    print(f"Success! Admin {email} created.")
+
+#flask requeue_extractions <= Re-run extraction for documents left pending/processing (e.g. after a restart)
+@click.command(name='requeue_extractions')
+@click.option('--stale-minutes', default=30, help='Only re-run PROCESSING documents picked up longer ago than this.')
+@with_appcontext
+def requeue_extractions(stale_minutes):
+    """
+    Extracts the text of every document stuck in PENDING, or in PROCESSING for more than
+    --stale-minutes (younger ones are left to the worker extracting them).
+    """
+    docs = DocumentRepository.get_stuck(datetime.utcnow() - timedelta(minutes=stale_minutes))
+    if not docs:
+        print("Nothing to do: no pending documents.")
+        return
+
+    for doc in docs:
+        doc = process_document(doc.id)
+        print(f"Document {doc.id} ({doc.filename}): {doc.status.value}")
+
+
+#flask benchmark_generation 1 --user-id 1 --requests 20 --concurrency 5 <= Load-test generate_exam (use LLM_PROVIDER=fake to stay offline)
+@click.command(name='benchmark_generation')
+@click.argument('document_id', type=int)
+@click.option('--user-id', type=int, required=True, help='Owner of the generated QCMs (role selects the mode).')
+@click.option('--requests', 'total', default=10, help='Number of generate_exam calls.')
+@click.option('--concurrency', default=4, help='Calls running at the same time.')
+@click.option('--questions', default=10, help='Questions per call.')
+@with_appcontext
+def benchmark_generation(document_id, user_id, total, concurrency, questions):
+    """Runs generate_exam end to end and prints latency percentiles. Generated QCMs are deleted."""
+    app = current_app._get_current_object()
+    print(f"Provider: {get_provider().name}")
+
+    def run_once(_):
+        with app.app_context():
+            started = time.perf_counter()
+            try:
+                qcm, error = QCMService.generate_exam(user_id, document_id, questions, 'medium')
+            except ProviderUnavailable as e:
+                qcm, error = None, str(e)
+            elapsed = time.perf_counter() - started
+            if qcm:
+                QCMRepository.delete_qcm(qcm)
+            db.session.remove()
+            return elapsed, error
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run_once, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, error in results if not error)
+    errors = [error for _, error in results if error]
+    if latencies:
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+        print(f"{len(latencies)} ok in {wall:.2f}s ({len(latencies) / wall:.2f} req/s)")
+        print(f"p50 {pct(0.5):.3f}s  p95 {pct(0.95):.3f}s  max {latencies[-1]:.3f}s")
+    if errors:
+        print(f"{len(errors)} failed, e.g. {errors[0]}")
+
+
+#flask benchmark_question_insert 1 --user-id 1 --questions 100 <= Compare per-object ORM inserts with the bulk INSERT ... RETURNING path
+@click.command(name='benchmark_question_insert')
+@click.argument('document_id', type=int)
+@click.option('--user-id', type=int, required=True, help='Owner of the temporary QCMs.')
+@click.option('--questions', default=100, help='Questions per QCM.')
+@click.option('--runs', default=5, help='Repetitions of each path.')
+@with_appcontext
+def benchmark_question_insert(document_id, user_id, questions, runs):
+    """Times both ways of saving a question bank. The QCMs are deleted afterwards."""
+    bank = [{
+        "text": f"Benchmark question {i + 1}",
+        "choices": [{"text": f"Choice {c + 1}", "is_correct": c == 0} for c in range(4)]
+    } for i in range(questions)]
+    header = {"title": "Insert benchmark", "level": "medium", "user_id": user_id, "document_id": document_id}
+
+    def orm_path():
+        # The previous implementation: one ORM object per question
+        qcm = QCM(**header)
+        db.session.add(qcm)
+        db.session.flush()
+        for q_data in bank:
+            db.session.add(Question(text=q_data['text'], choices=q_data['choices'], qcm_id=qcm.id))
+        db.session.commit()
+        return qcm
+
+    def bulk_path():
+        return QCMRepository.create_qcm_with_questions(header, bank)
+
+    for label, create in (("orm", orm_path), ("bulk", bulk_path)):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            qcm = create()
+            timings.append(time.perf_counter() - started)
+            QCMRepository.delete_qcm(qcm)
+        timings.sort()
+        print(f"{label:>4}: median {timings[len(timings) // 2] * 1000:.1f} ms, best {timings[0] * 1000:.1f} ms "
+              f"({questions} questions, {runs} runs)")
+
+
+#flask benchmark_variants 1 --count 500 <= Time a full variants ZIP (set VARIANT_RENDER_WORKERS to compare pool sizes)
+@click.command(name='benchmark_variants')
+@click.argument('qcm_id', type=int)
+@click.option('--count', default=500, help='Number of variants in the ZIP.')
+@click.option('--seed', default='benchmark', help='Seed of the variants.')
+@with_appcontext
+def benchmark_variants(qcm_id, count, seed):
+    """Streams the variants ZIP to nowhere and prints time to first byte, total time and size."""
+    qcm = QCMRepository.get_by_id(qcm_id)
+    if not qcm:
+        print(f"QCM {qcm_id} not found")
+        return
+
+    started = time.perf_counter()
+    result, error, _ = QCMService.export_variants(qcm.user_id, qcm_id, count, seed)
+    if error:
+        print(error)
+        return
+    chunks, _ = result
+    first_byte = None
+    size = 0
+    for chunk in chunks:
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    wall = time.perf_counter() - started
+
+    workers = current_app.config.get('VARIANT_RENDER_WORKERS', 2)
+    print(f"{count} variants of {len(qcm.questions)} questions with {workers} workers: "
+          f"first byte {first_byte:.2f}s, total {wall:.2f}s ({wall / count * 1000:.1f} ms per variant), "
+          f"{size / 1024 / 1024:.1f} MiB")
@@ -0,0 +1,48 @@
+"""
+Splits extracted text into passages ("chunks") used to build generation prompts.
+
+Chunks follow line boundaries and are described by character offsets into
+the extracted text, so they can be stored compactly and sliced on demand.
+"""
+import math
+
+CHARS_PER_TOKEN = 4          # Rough average for French/English prose
+DEFAULT_CHUNK_TOKENS = 300
+
+def estimate_tokens(text_or_length):
+    length = text_or_length if isinstance(text_or_length, int) else len(text_or_length)
+    return max(1, math.ceil(length / CHARS_PER_TOKEN))
+
+def chunk_text(text, target_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    Returns: [(char_start, char_end), ...] covering the whole text.
+    Lines are never split, except a single line longer than a chunk.
+    """
+    if not text:
+        return []
+
+    max_chars = target_tokens * CHARS_PER_TOKEN
+    spans = []
+    start = 0
+    end = 0
+    length = len(text)
+
+    while end < length:
+        newline = text.find("\n", end)
+        line_end = length if newline == -1 else newline + 1
+
+        if line_end - start > max_chars and end > start:
+            # Adding this line would overflow: close the current chunk
+            spans.append((start, end))
+            start = end
+            continue
+
+        end = line_end
+        # Very long line (tables, no line breaks...): cut it hard
+        while end - start > max_chars:
+            spans.append((start, start + max_chars))
+            start += max_chars
+
+    if end > start:
+        spans.append((start, end))
+    return spans
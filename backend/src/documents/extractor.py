@@ -1,52 +1,352 @@
 import fitz  # PyMuPDF
-import docx
+import multiprocessing
 import os
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
 
+# Defaults used when the caller does not pass explicit settings (see Config)
+DEFAULT_PARALLEL_PAGE_THRESHOLD = 150
+DEFAULT_PAGES_PER_TASK = 32
+
+# Running headers/footers: only the first/last lines of each page are candidates,
+# and a line must repeat on enough pages to be treated as boilerplate
+# (exactly, except page numbers and dates)
+BOILERPLATE_EDGE_LINES = 3
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MIN_RATIO = 0.5
+
+class ExtractionError(Exception):
+    """Raised when a file cannot be read (corrupted, encrypted, unsupported...)."""
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_file(file_path):
+def extract_text_from_file(file_path, **options):
     """
     Detects file type and extracts text using the most efficient library.
     Returns: Cleaned string ready for AI processing.
+    Raises: ExtractionError if the file cannot be read.
+    """
+    text, _, _ = extract_document(file_path, **options)
+    return text
+
+def extract_document(file_path, **options):
+    """
+    Same as extract_text_from_file, but also keeps the page boundaries and
+    removes running headers/footers repeated across PDF pages.
+    Returns: (text, pages, boilerplate_chars) where pages is
+    [(page_number, char_start, char_end), ...] giving the slice of `text` that
+    comes from each non-empty PDF page (empty list for DOCX and TXT), and
+    boilerplate_chars is the number of characters removed as boilerplate.
+    """
+    numbered = [(number, text) for number, text in iter_pages_from_file(file_path, **options) if text]
+    page_texts, boilerplate_chars = strip_repeated_lines([text for _, text in numbered])
+
+    parts = []
+    pages = []
+    offset = 0
+
+    for (page_number, _), page_text in zip(numbered, page_texts):
+        if not page_text:
+            continue
+        if parts:
+            offset += 1  # The "\n" separator added by the join below
+        if page_number is not None:
+            pages.append((page_number, offset, offset + len(page_text)))
+        parts.append(page_text)
+        offset += len(page_text)
+
+    # Pages are joined once at the end (no quadratic string concatenation)
+    return "\n".join(parts), pages, boilerplate_chars
+
+_DIGITS_RE = re.compile(r"\d+")
+# Lines that are only a page number or a date ("Page 3 / 40", "- 3 -", "12/03/2024", "p. 7")
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:page|p\.|slide|diapositive)?\s*[-–—(\[]?\s*\d+(?:\s*(?:/|\||of|sur|de|[.-])\s*\d+)*\s*[-–—)\]]?$",
+    re.IGNORECASE
+)
+
+def _boilerplate_key(line):
+    """
+    Page numbers and dates vary from page to page, so they are compared with
+    digits masked. Any other line must repeat exactly: "Exercice 3" is content.
+    """
+    line = line.strip().lower()
+    if _PAGE_NUMBER_RE.match(line):
+        return _DIGITS_RE.sub("#", line)
+    return line
+
+def _edge_size(lines):
+    """Header/footer window of a page; short pages (slides) only expose their first and last line."""
+    return max(1, min(BOILERPLATE_EDGE_LINES, (len(lines) - 1) // 3))
+
+def strip_repeated_lines(page_texts):
+    """
+    Frequency-based cross-page deduplication of headers, footers, page numbers
+    and copyright lines. A line counts as boilerplate when it appears among the
+    first/last lines of at least half of the pages; its first occurrence is
+    kept (often the document title), the others removed. A line holding most
+    of its page's text is never removed, and no page is ever emptied.
+    Returns: (cleaned_page_texts, removed_characters)
+    """
+    if len(page_texts) < BOILERPLATE_MIN_PAGES:
+        return page_texts, 0
+
+    page_lines = [text.split("\n") for text in page_texts]
+
+    page_frequency = {}
+    for lines in page_lines:
+        edge = _edge_size(lines)
+        for key in {_boilerplate_key(line) for line in lines[:edge] + lines[-edge:]}:
+            if key:
+                page_frequency[key] = page_frequency.get(key, 0) + 1
+
+    min_pages = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_MIN_RATIO * len(page_texts))
+    boilerplate = {key for key, count in page_frequency.items() if count >= min_pages}
+    if not boilerplate:
+        return page_texts, 0
+
+    seen = set()
+    removed = 0
+    cleaned = []
+    for text, lines in zip(page_texts, page_lines):
+        keep = []
+        dropped = 0
+        edge = _edge_size(lines)
+        last = len(lines) - 1
+        for i, line in enumerate(lines):
+            key = _boilerplate_key(line)
+            at_edge = i < edge or i > last - edge
+            if at_edge and key in boilerplate and len(line) * 2 <= len(text):
+                if key in seen:
+                    dropped += len(line) + 1
+                    continue
+                seen.add(key)
+            keep.append(line)
+
+        if not any(line.strip() for line in keep):
+            # Only boilerplate-looking lines: keep the page as it was
+            cleaned.append(text)
+            continue
+        removed += dropped
+        cleaned.append("\n".join(keep))
+    return cleaned, removed
+
+def count_pages(file_path):
+    """Number of pages of a PDF (DOCX has no fixed layout and TXT no pages: None)."""
+    ext = file_path.rsplit('.', 1)[1].lower()
+    if ext == 'pdf':
+        try:
+            with fitz.open(file_path) as doc:
+                return doc.page_count
+        except Exception as e:
+            raise ExtractionError(str(e)) from e
+    return None
+
+def iter_text_from_file(file_path, **options):
+    """Streaming version of extract_text_from_file: yields cleaned, non-empty text blocks."""
+    for _, text in iter_pages_from_file(file_path, **options):
+        if text:
+            yield text
+
+def iter_pages_from_file(file_path, parallel_threshold=None, max_workers=None, pages_per_task=None):
+    """
+    Yields (page_number, cleaned_text) one PDF page at a time (1-based, empty
+    pages included), or a single (None, text) block for DOCX and TXT.
+
+    parallel_threshold: PDFs with at least this many pages are split across a process pool.
+    max_workers: size of that pool (defaults to the number of CPUs).
+    pages_per_task: number of consecutive pages a worker extracts per task.
     """
     ext = file_path.rsplit('.', 1)[1].lower()
     
     try:
         if ext == 'pdf':
-            return _read_pdf(file_path)
+            yield from _iter_pdf_pages(file_path, parallel_threshold, max_workers, pages_per_task)
+            return
         elif ext == 'docx':
-            return _read_docx(file_path)
+            yield None, _read_docx(file_path)
+            return
         elif ext == 'txt':
-            return _read_txt(file_path)
+            yield None, _read_txt(file_path)
+            return
     except Exception as e:
-        print(f"Extraction Error: {str(e)}")
-        return ""
+        raise ExtractionError(str(e)) from e
+
+    raise ExtractionError(f"Unsupported file type: .{ext}")
+
+def _iter_pdf_pages(path, parallel_threshold=None, max_workers=None, pages_per_task=None):
+    threshold = parallel_threshold or DEFAULT_PARALLEL_PAGE_THRESHOLD
+    workers = max_workers or os.cpu_count() or 1
+    chunk = pages_per_task or DEFAULT_PAGES_PER_TASK
+
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+        if page_count < threshold or workers < 2:
+            # Small document: one handle, one core, page by page
+            for number, page in enumerate(doc, 1):
+                # "text" mode is fast and preserves natural reading order
+                yield number, _clean_text(page.get_text("text"))
+            return
+
+    number = 0
+    for page_texts in _iter_page_ranges_parallel(path, page_count, workers, chunk):
+        for text in page_texts:
+            number += 1
+            yield number, text
+
+def _iter_page_ranges_parallel(path, page_count, workers, pages_per_task):
+    """
+    Splits [0, page_count) into ranges extracted by the process pool and yields
+    the results in page order. At most 2 * workers ranges are in flight, so
+    memory stays bounded whatever the size of the document.
+    """
+    pool = _get_process_pool(workers)
+    in_flight = deque()
+
+    try:
+        for start in range(0, page_count, pages_per_task):
+            stop = min(start + pages_per_task, page_count)
+            in_flight.append(pool.submit(_extract_page_range, path, start, stop))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed): drop the pool so the next document gets a fresh one
+        _reset_process_pool(pool)
+        raise
+    finally:
+        for future in in_flight:
+            future.cancel()
 
-def _read_pdf(path):
-    text = ""
+def _extract_page_range(path, start, stop):
+    """Runs in a worker process: opens its own fitz handle (they cannot be shared)."""
     with fitz.open(path) as doc:
-        for page in doc:
-            # "text" mode is fast and preserves natural reading order
-            text += page.get_text("text") + "\n"
-    return _clean_text(text)
+        return [_clean_text(doc[i].get_text("text")) for i in range(start, stop)]
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(workers):
+    """One long-lived pool per process; 'spawn' avoids forking a multi-threaded server."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _process_pool
+
+def _reset_process_pool(pool):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
 def _read_docx(path):
-    doc = docx.Document(path)
-    # Join paragraphs with newlines
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return _clean_text(text)
+    return "\n".join(_iter_docx_lines(path))
+
+# WordprocessingML tags (a .docx is a ZIP; the body lives in word/document.xml)
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_BODY, _W_P, _W_T, _W_TAB, _W_BR, _W_CR = (_W + 'body', _W + 'p', _W + 't', _W + 'tab', _W + 'br', _W + 'cr')
+_W_TBL, _W_TR, _W_TC = (_W + 'tbl', _W + 'tr', _W + 'tc')
+
+def _iter_docx_lines(path):
+    """
+    Streams word/document.xml with an incremental parser instead of loading the
+    python-docx object model (embedded media are never read). Yields cleaned,
+    non-empty lines in document order: paragraphs as-is, and each table row as
+    its cell texts joined with " | ". Nested tables are flattened into their cell.
+    """
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as xml:
+        runs = []        # Text of the paragraph being read
+        cells = []       # Stack (one level per open table) of the current cell's paragraphs
+        rows = []        # Stack of the current row's cell texts
+        body = None
+        depth = 0
+
+        for event, elem in ET.iterparse(xml, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                tag = elem.tag
+                if tag == _W_BODY:
+                    body = elem
+                elif tag == _W_TBL:
+                    cells.append([])
+                    rows.append([])
+                continue
+
+            depth -= 1
+            tag = elem.tag
+
+            if tag == _W_T:
+                runs.append(elem.text or "")
+            elif tag == _W_TAB:
+                runs.append(" ")
+            elif tag in (_W_BR, _W_CR):
+                runs.append("\n")
+            elif tag == _W_P:
+                text = "".join(runs)
+                runs = []
+                elem.clear()
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    for line in text.splitlines():
+                        line = line.strip()
+                        if line:
+                            yield line
+            elif tag == _W_TC and cells:
+                rows[-1].append(" ".join(part.strip() for part in cells[-1] if part.strip()))
+                cells[-1] = []
+                elem.clear()
+            elif tag == _W_TR and rows:
+                row_text = " | ".join(cell for cell in rows[-1] if cell)
+                rows[-1] = []
+                if row_text:
+                    if len(rows) > 1:
+                        # Nested table: its rows belong to the enclosing cell
+                        cells[-2].append(row_text)
+                    else:
+                        yield row_text
+            elif tag == _W_TBL and rows:
+                cells.pop()
+                rows.pop()
+
+            # Free memory: drop finished top-level blocks (children of <w:body>)
+            if body is not None and depth == 2:
+                body.clear()
 
 def _read_txt(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        return _clean_text(f.read())
+    try:
+        return "\n".join(_iter_txt_lines(path, 'utf-8-sig'))
+    except UnicodeDecodeError:
+        # Windows-made course notes are often saved as ANSI
+        return "\n".join(_iter_txt_lines(path, 'cp1252'))
+
+def _iter_txt_lines(path, encoding):
+    """Same normalization as _clean_text, one line at a time (the file is never read whole)."""
+    with open(path, 'r', encoding=encoding) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
 
 def _clean_text(text):
     """
     Basic cleanup to help the AI (removes excessive whitespace).
     """
     # Replace multiple newlines with a single one to save token space
-    return "\n".join([line.strip() for line in text.splitlines() if line.strip()])
\ No newline at end of file
+    return "\n".join([line.strip() for line in text.splitlines() if line.strip()])
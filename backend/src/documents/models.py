@@ -1,8 +1,81 @@
+import enum
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from src.extensions import db
 from datetime import datetime
 
+PREVIEW_LENGTH = 100
+
+class DocumentStatus(enum.Enum):
+    PENDING = "pending"        # Saved on disk, waiting for a worker
+    PROCESSING = "processing"  # Text extraction in progress
+    READY = "ready"            # Text extracted, usable for QCM generation
+    FAILED = "failed"          # Extraction failed (see status_message)
+
+class DocumentBlob(db.Model):
+    """
+    One stored file per distinct content (SHA-256), shared by every Document
+    uploaded with the same bytes. Its text is extracted only once.
+    """
+    __tablename__ = 'document_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    # Deferred: only loaded when a duplicate upload needs to copy it
+    extracted_text = db.deferred(db.Column(db.Text, nullable=True))    # None until extracted successfully
+    extracted_at = db.Column(db.DateTime, nullable=True)
+    page_count = db.Column(db.Integer, nullable=True)
+    boilerplate_chars = db.Column(db.Integer, nullable=True)  # Headers/footers stripped at extraction
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def is_extracted(self):
+        return self.extracted_at is not None
+
+class DocumentChunk(db.Model):
+    """
+    A passage of a blob's extracted text, stored as character offsets.
+    Used to pick relevant passages for generation instead of the whole text.
+    """
+    __tablename__ = 'document_chunks'
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'position', name='uq_document_chunks_position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), db.ForeignKey('document_blobs.sha256', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)       # 0, 1, 2... in reading order
+    char_start = db.Column(db.Integer, nullable=False)
+    char_end = db.Column(db.Integer, nullable=False)
+    token_estimate = db.Column(db.Integer, nullable=False)
+
+class DocumentPage(db.Model):
+    """Where each PDF page lives in the extracted text (lets us quiz on a page range)."""
+    __tablename__ = 'document_pages'
+
+    content_hash = db.Column(db.String(64), db.ForeignKey('document_blobs.sha256', ondelete='CASCADE'), primary_key=True)
+    page_number = db.Column(db.Integer, primary_key=True)  # 1-based, as printed by PDF viewers
+    char_start = db.Column(db.Integer, nullable=False)
+    char_end = db.Column(db.Integer, nullable=False)
+
+class DocumentChapter(db.Model):
+    """Chapters detected from headings such as "Chapitre 3 : Les threads"."""
+    __tablename__ = 'document_chapters'
+
+    content_hash = db.Column(db.String(64), db.ForeignKey('document_blobs.sha256', ondelete='CASCADE'), primary_key=True)
+    number = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=True)
+    char_start = db.Column(db.Integer, nullable=False)
+    char_end = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {"number": self.number, "title": self.title}
+
 class Document(db.Model):
     __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('ix_documents_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
@@ -14,7 +87,24 @@ class Document(db.Model):
     
     # Storage
     file_path = db.Column(db.String(500), nullable=False)
-    extracted_text = db.Column(db.Text, nullable=True)
+    content_hash = db.Column(db.String(64), db.ForeignKey('document_blobs.sha256'), nullable=True, index=True)
+    # Deferred: can be megabytes, and list views only need the precomputed columns below
+    extracted_text = db.deferred(db.Column(db.Text, nullable=True))
+
+    # Computed once at extraction time
+    preview = db.Column(db.String(PREVIEW_LENGTH), nullable=True)
+    word_count = db.Column(db.Integer, nullable=True)
+    page_count = db.Column(db.Integer, nullable=True)      # None for formats without pages (TXT)
+    boilerplate_chars = db.Column(db.Integer, nullable=True)  # Repeated headers/footers removed
+
+    # Full-text index over module + extracted_text, refreshed when extraction finishes
+    search_vector = db.deferred(db.Column(TSVECTOR, nullable=True))
+
+    # Processing state (extraction runs in a background worker)
+    status = db.Column(db.Enum(DocumentStatus), default=DocumentStatus.PENDING, nullable=False)
+    status_message = db.Column(db.Text, nullable=True)    # Error details when FAILED
+    processing_started_at = db.Column(db.DateTime, nullable=True)  # Set when a worker picks it up
+    processed_at = db.Column(db.DateTime, nullable=True)
     
     # Archival & History
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -27,6 +117,29 @@ class Document(db.Model):
     # but defining the relationship here makes access easier if backref wasn't explicit)
     # branch = db.relationship('Branch', backref='documents') # optional if backref exists
     branch = db.relationship('Branch', backref='documents')
+    blob = db.relationship('DocumentBlob', backref='documents', lazy=True)
+
+    def set_extracted_text(self, text, page_count=None, boilerplate_chars=None):
+        """Stores the text along with the summary columns used by list endpoints."""
+        self.extracted_text = text
+        self.preview = text[:PREVIEW_LENGTH] if text else None
+        self.word_count = len(text.split()) if text else 0
+        self.page_count = page_count
+        self.boilerplate_chars = boilerplate_chars
+
+    @property
+    def is_ready(self):
+        return self.status == DocumentStatus.READY
+
+    def status_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status.value,
+            "message": self.status_message,
+            "boilerplate_chars_removed": self.boilerplate_chars,
+            "upload_date": self.upload_date.isoformat() if self.upload_date else None,
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None
+        }
 
     def to_dict(self):
         return {
@@ -37,5 +150,8 @@ class Document(db.Model):
             "branch": self.branch.name if self.branch else "Unknown",
             "year": self.year,
             "upload_date": self.upload_date.isoformat(),
-            "preview": self.extracted_text[:100] + "..." if self.extracted_text else ""
-        }
\ No newline at end of file
+            "status": self.status.value,
+            "word_count": self.word_count,
+            "page_count": self.page_count,
+            "preview": self.preview + "..." if self.preview else ""
+        }
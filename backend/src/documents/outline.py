@@ -0,0 +1,69 @@
+"""
+Detects the chapter structure of extracted course text.
+
+A chapter starts at the first line that looks like "Chapitre 3", "CHAPTER III",
+"Chapitre 2 : Les threads"... Running headers repeat the same heading on
+every page, so only the first occurrence of each number counts, and a table
+of contents (headings a few lines apart) is skipped.
+"""
+import re
+
+_HEADING_RE = re.compile(
+    r"^\s*(?:chapitre|chapter|chap\.)\s+(?P<number>\d{1,3}|[IVXLC]{1,7})\b[\s:.\-–—]*(?P<title>.*)$",
+    re.IGNORECASE
+)
+_ROMAN = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100}
+MAX_TITLE_LENGTH = 200
+MIN_CHAPTER_LENGTH = 300   # Shorter "chapters" are table-of-contents entries
+
+def _to_int(number):
+    if number.isdigit():
+        return int(number)
+    total = 0
+    values = [_ROMAN[c] for c in number.upper()]
+    for i, value in enumerate(values):
+        total += -value if i + 1 < len(values) and value < values[i + 1] else value
+    return total
+
+def _scan_headings(text, begin):
+    """First occurrence of each chapter number after `begin`, numbers increasing."""
+    starts = []
+    seen = set()
+    offset = begin
+
+    for line in text[begin:].splitlines(keepends=True):
+        match = _HEADING_RE.match(line)
+        if match:
+            number = _to_int(match.group('number'))
+            # Headings must move forward: ignores running headers repeating the title
+            if number not in seen and (not starts or number > starts[-1][0]):
+                seen.add(number)
+                title = match.group('title').strip()[:MAX_TITLE_LENGTH]
+                starts.append((number, title, offset, offset + len(line)))
+        offset += len(line)
+    return starts
+
+def detect_chapters(text):
+    """
+    Returns: [(number, title, char_start, char_end), ...] in reading order.
+    Each chapter runs until the next one starts (the last one until the end).
+    """
+    begin = 0
+    while True:
+        starts = _scan_headings(text, begin)
+
+        # A table of contents lists several headings a few lines apart: skip it and rescan
+        toc_end = None
+        for current, following in zip(starts, starts[1:]):
+            if following[2] - current[2] >= MIN_CHAPTER_LENGTH:
+                break
+            toc_end = following[3]
+        if toc_end is None:
+            break
+        begin = toc_end
+
+    chapters = []
+    for i, (number, title, start, _) in enumerate(starts):
+        end = starts[i + 1][2] if i + 1 < len(starts) else len(text)
+        chapters.append((number, title, start, end))
+    return chapters
@@ -1,5 +1,38 @@
+import html
+from datetime import datetime
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from src.extensions import db
-from .models import Document
+from .models import Document, DocumentBlob, DocumentChunk, DocumentPage, DocumentChapter, DocumentStatus
+
+# Course material is in French. Module name and text use the same configuration as the
+# query, otherwise stemmed query terms never match the module's lexemes
+SEARCH_LANGUAGE = 'french'
+# tsvector values are limited to 1 MB: only index the beginning of huge documents
+SEARCH_MAX_CHARS = 500000
+# ts_headline marks matches with private-use characters, never with HTML: the text comes from
+# uploaded files, so it is escaped first and only then are the markers turned into <mark> tags
+_MATCH_START, _MATCH_STOP = '\ue000', '\ue001'
+SNIPPET_OPTIONS = f'MaxFragments=2, MaxWords=25, MinWords=8, StartSel="{_MATCH_START}", StopSel="{_MATCH_STOP}"'
+
+def snippet_html(snippet):
+    """HTML-escaped snippet with the matched words wrapped in <mark>."""
+    if not snippet:
+        return ""
+    return html.escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_STOP, '</mark>')
+
+def _search_vector_expression():
+    """Module name (weight A) ranks above body text (weight B)."""
+    return func.setweight(
+        func.to_tsvector(cast(SEARCH_LANGUAGE, REGCONFIG), func.coalesce(Document.module, '')), 'A'
+    ).op('||')(func.setweight(
+        func.to_tsvector(
+            cast(SEARCH_LANGUAGE, REGCONFIG),
+            func.left(func.coalesce(Document.extracted_text, ''), SEARCH_MAX_CHARS)
+        ), 'B'
+    ))
 
 class DocumentRepository:
     @staticmethod
@@ -8,10 +41,14 @@ class DocumentRepository:
         db.session.commit()
         return doc
 
+    @staticmethod
+    def rollback():
+        db.session.rollback()
+
     @staticmethod
     def get_by_branch(branch_id):
         """Used by Students: Get all docs for their branch"""
-        return Document.query.filter_by(
+        return Document.query.options(joinedload(Document.branch)).filter_by(
             branch_id=branch_id, 
             is_archived=False
         ).order_by(Document.upload_date.desc()).all()
@@ -19,7 +56,7 @@ class DocumentRepository:
     @staticmethod
     def get_by_uploader(user_id):
         """Used by Professors: Get docs they uploaded"""
-        return Document.query.filter_by(
+        return Document.query.options(joinedload(Document.branch)).filter_by(
             user_id=user_id, 
             is_archived=False
         ).order_by(Document.upload_date.desc()).all()
@@ -32,6 +69,190 @@ class DocumentRepository:
     def get_all_by_user(user_id):
         return Document.query.filter_by(user_id=user_id, is_archived=False).order_by(Document.upload_date.desc()).all()
 
+    @staticmethod
+    def get_stuck(started_before):
+        """
+        Documents whose extraction has not completed, to re-queue after a restart:
+        PENDING ones, and PROCESSING ones picked up before
+        `started_before` (younger ones are most likely still being extracted by a worker).
+        """
+        stale = db.or_(
+            Document.processing_started_at.is_(None),
+            Document.processing_started_at < started_before
+        )
+        return Document.query.filter(db.or_(
+            Document.status == DocumentStatus.PENDING,
+            db.and_(Document.status == DocumentStatus.PROCESSING, stale)
+        )).order_by(Document.id).all()
+
+    @staticmethod
+    def set_status(doc, status, message=None):
+        doc.status = status
+        doc.status_message = message
+        if status == DocumentStatus.PROCESSING:
+            doc.processing_started_at = datetime.utcnow()
+        if status in (DocumentStatus.READY, DocumentStatus.FAILED):
+            doc.processed_at = datetime.utcnow()
+        db.session.commit()
+        return doc
+
+    @staticmethod
+    def mark_ready(doc, extracted_text, page_count=None, boilerplate_chars=None):
+        doc.set_extracted_text(extracted_text, page_count, boilerplate_chars)
+        db.session.flush()
+        DocumentRepository.refresh_search_vector(doc.id)
+        return DocumentRepository.set_status(doc, DocumentStatus.READY)
+
+    @staticmethod
+    def refresh_search_vector(doc_id):
+        """Recomputes the tsvector in SQL (the text never travels back to Python)."""
+        db.session.execute(
+            db.update(Document)
+            .where(Document.id == doc_id)
+            .values(search_vector=_search_vector_expression())
+        )
+
+    @staticmethod
+    def search(query, branch_id=None, user_id=None, limit=20):
+        """
+        Ranked full-text search restricted to a branch (students) or an uploader (staff).
+        Returns: [(Document, rank, snippet), ...], snippet as produced by snippet_html
+        """
+        tsquery = func.websearch_to_tsquery(cast(SEARCH_LANGUAGE, REGCONFIG), query)
+        rank = func.ts_rank_cd(Document.search_vector, tsquery)
+
+        # 1. Rank using the GIN index only (no text loaded)
+        matches = db.session.query(Document.id.label('id'), rank.label('rank')).filter(
+            Document.search_vector.op('@@')(tsquery),
+            Document.is_archived == False
+        )
+        if branch_id is not None:
+            matches = matches.filter(Document.branch_id == branch_id)
+        if user_id is not None:
+            matches = matches.filter(Document.user_id == user_id)
+        matches = matches.order_by(rank.desc()).limit(limit).subquery()
+
+        # 2. Build snippets for the top results only
+        snippet = func.ts_headline(
+            cast(SEARCH_LANGUAGE, REGCONFIG),
+            func.left(Document.extracted_text, SEARCH_MAX_CHARS),
+            tsquery,
+            SNIPPET_OPTIONS
+        )
+        rows = db.session.query(Document, matches.c.rank, snippet)\
+            .join(matches, matches.c.id == Document.id)\
+            .options(joinedload(Document.branch))\
+            .order_by(matches.c.rank.desc())\
+            .all()
+        return [(doc, doc_rank, snippet_html(text)) for doc, doc_rank, text in rows]
+
+    # --- Content-addressed blobs ---
+    @staticmethod
+    def get_blob(sha256):
+        return DocumentBlob.query.get(sha256)
+
+    @staticmethod
+    def get_or_create_blob(sha256, file_path, size_bytes):
+        blob = DocumentBlob.query.get(sha256)
+        if blob:
+            return blob
+
+        blob = DocumentBlob(sha256=sha256, file_path=file_path, size_bytes=size_bytes)
+        db.session.add(blob)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Same file uploaded concurrently: the other request created it first
+            db.session.rollback()
+            blob = DocumentBlob.query.get(sha256)
+        return blob
+
+    @staticmethod
+    def save_blob_text(blob, extracted_text, page_count=None, boilerplate_chars=None):
+        blob.extracted_text = extracted_text
+        blob.page_count = page_count
+        blob.boilerplate_chars = boilerplate_chars
+        blob.extracted_at = datetime.utcnow()
+        db.session.commit()
+        return blob
+
+    # --- Chunks ---
+    @staticmethod
+    def save_chunks(content_hash, spans, token_counts):
+        """Replaces the chunks of a blob in one multi-row INSERT."""
+        DocumentChunk.query.filter_by(content_hash=content_hash).delete()
+        if spans:
+            db.session.execute(db.insert(DocumentChunk), [
+                {
+                    "content_hash": content_hash,
+                    "position": position,
+                    "char_start": start,
+                    "char_end": end,
+                    "token_estimate": tokens,
+                }
+                for position, ((start, end), tokens) in enumerate(zip(spans, token_counts))
+            ])
+        db.session.commit()
+
+    @staticmethod
+    def get_chunks(content_hash, char_start=0, char_end=None):
+        """Chunks of a blob, optionally only those overlapping [char_start, char_end)."""
+        query = DocumentChunk.query.filter(
+            DocumentChunk.content_hash == content_hash,
+            DocumentChunk.char_end > char_start
+        )
+        if char_end is not None:
+            query = query.filter(DocumentChunk.char_start < char_end)
+        return query.order_by(DocumentChunk.position).all()
+
+    # --- Page and chapter index ---
+    @staticmethod
+    def save_outline(content_hash, pages, chapters):
+        """Replaces the page offsets and chapters of a blob."""
+        DocumentPage.query.filter_by(content_hash=content_hash).delete()
+        DocumentChapter.query.filter_by(content_hash=content_hash).delete()
+        if pages:
+            db.session.execute(db.insert(DocumentPage), [
+                {"content_hash": content_hash, "page_number": number, "char_start": start, "char_end": end}
+                for number, start, end in pages
+            ])
+        if chapters:
+            db.session.execute(db.insert(DocumentChapter), [
+                {"content_hash": content_hash, "number": number, "title": title or None,
+                 "char_start": start, "char_end": end}
+                for number, title, start, end in chapters
+            ])
+        db.session.commit()
+
+    @staticmethod
+    def get_chapters(content_hash):
+        return DocumentChapter.query.filter_by(content_hash=content_hash)\
+            .order_by(DocumentChapter.number).all()
+
+    @staticmethod
+    def get_page_span(content_hash, first_page, last_page):
+        """(char_start, char_end) covering pages first..last, or None if none of them has text."""
+        return db.session.query(func.min(DocumentPage.char_start), func.max(DocumentPage.char_end))\
+            .filter(
+                DocumentPage.content_hash == content_hash,
+                DocumentPage.page_number.between(first_page, last_page)
+            ).one_or_none()
+
+    @staticmethod
+    def get_chapter_span(content_hash, first_chapter, last_chapter):
+        return db.session.query(func.min(DocumentChapter.char_start), func.max(DocumentChapter.char_end))\
+            .filter(
+                DocumentChapter.content_hash == content_hash,
+                DocumentChapter.number.between(first_chapter, last_chapter)
+            ).one_or_none()
+
+    @staticmethod
+    def get_text_slice(doc_id, char_start, char_end):
+        """Only the requested part of extracted_text leaves the database (SQL substr is 1-based)."""
+        return db.session.query(
+            func.substr(Document.extracted_text, char_start + 1, char_end - char_start)
+        ).filter(Document.id == doc_id).scalar()
+
     @staticmethod
     def archive(doc_id):
         doc = Document.query.get(doc_id)
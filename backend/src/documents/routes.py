@@ -1,4 +1,4 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flasgger import swag_from
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from . import documents_bp
@@ -28,7 +28,8 @@ from .service import DocumentService
         'required': False,
     }],
     'responses': {
-        201: {'description': 'Document processed'},
+        201: {'description': 'Document processed (identical content already extracted)'},
+        202: {'description': 'Document accepted, extraction pending'},
         400: {'description': 'Validation or processing error'},
     },
 })
@@ -46,10 +47,70 @@ def upload():
     if error:
         return jsonify({"error": error}), 400
         
+    if doc.is_ready:
+        # Identical file already processed: no extraction needed
+        return jsonify({
+            "message": "Document processed", 
+            "document": doc.to_dict()
+        }), 201
+
+    return jsonify({
+        "message": "Document uploaded, text extraction in progress", 
+        "document": doc.to_dict(),
+        "status_url": f"/documents/{doc.id}/status"
+    }), 202
+
+@documents_bp.route('/upload/bulk', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'tags': ['Documents'],
+    'summary': 'Upload several documents or a ZIP archive at once',
+    'consumes': ['multipart/form-data'],
+    'security': [{'BearerAuth': []}],
+    'parameters': [{
+        'in': 'formData',
+        'name': 'files',
+        'type': 'file',
+        'required': True,
+        'description': 'One or more PDF/DOCX/TXT files, or ZIP archives containing them',
+    }, {
+        'in': 'formData',
+        'name': 'branch_id',
+        'type': 'integer',
+        'required': True,
+    }, {
+        'in': 'formData',
+        'name': 'module',
+        'type': 'string',
+        'required': False,
+    }],
+    'responses': {
+        201: {'description': 'Every file was accepted'},
+        207: {'description': 'Some files were rejected (see per-file errors)'},
+        400: {'description': 'Validation error'},
+    },
+})
+def upload_bulk():
+    # Expects form-data: { "files": [...], "branch_id": 1, "module": "Java" }
+    files = request.files.getlist('files') or request.files.getlist('file')
+    user_id = get_jwt_identity()
+
+    results, error = DocumentService.upload_many(
+        files,
+        request.form,
+        user_id,
+        max_files=current_app.config.get('BULK_UPLOAD_MAX_FILES', 100),
+        max_entry_bytes=current_app.config.get('BULK_UPLOAD_MAX_ENTRY_MB', 100) * 1024 * 1024
+    )
+
+    if error:
+        return jsonify({"error": error}), 400
+
+    failed = sum(1 for r in results if r["error"])
     return jsonify({
-        "message": "Document processed", 
-        "document": doc.to_dict()
-    }), 201
+        "message": f"{len(results) - failed} document(s) uploaded, {failed} rejected",
+        "results": results
+    }), 207 if failed else 201
 
 @documents_bp.route('/', methods=['GET'])
 @jwt_required()
@@ -67,4 +128,92 @@ def list_documents():
     """
     user_id = get_jwt_identity()
     docs = DocumentService.get_documents_for_user(user_id)
-    return jsonify([d.to_dict() for d in docs]), 200
\ No newline at end of file
+    return jsonify([d.to_dict() for d in docs]), 200
+
+@documents_bp.route('/search', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Documents'],
+    'summary': 'Full-text search over the documents available to the current user',
+    'security': [{'BearerAuth': []}],
+    'parameters': [{
+        'in': 'query',
+        'name': 'q',
+        'type': 'string',
+        'required': True,
+        'description': 'Search terms (supports "quoted phrases", OR and -exclusion)',
+    }, {
+        'in': 'query',
+        'name': 'limit',
+        'type': 'integer',
+        'required': False,
+    }],
+    'responses': {
+        200: {'description': 'Ranked documents. Each "snippet" is HTML: the document text, escaped, with the matched words wrapped in <mark>...</mark>'},
+        400: {'description': 'Missing query'},
+    },
+})
+def search_documents():
+    user_id = get_jwt_identity()
+    results, error = DocumentService.search_documents(
+        user_id,
+        request.args.get('q'),
+        request.args.get('limit', 20, type=int)
+    )
+
+    if error:
+        return jsonify({"error": error}), 400
+
+    return jsonify(results), 200
+
+@documents_bp.route('/<int:doc_id>/status', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Documents'],
+    'summary': 'Get the extraction status of a document',
+    'security': [{'BearerAuth': []}],
+    'parameters': [{
+        'in': 'path',
+        'name': 'doc_id',
+        'type': 'integer',
+        'required': True,
+    }],
+    'responses': {
+        200: {'description': 'Extraction status (pending, processing, ready or failed)'},
+        404: {'description': 'Document not found'},
+    },
+})
+def document_status(doc_id):
+    user_id = get_jwt_identity()
+    doc, error = DocumentService.get_document_status(user_id, doc_id)
+
+    if error:
+        return jsonify({"error": error}), 404
+
+    return jsonify(doc.status_dict()), 200
+
+@documents_bp.route('/<int:doc_id>/outline', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Documents'],
+    'summary': 'Get the page count and detected chapters of a document',
+    'security': [{'BearerAuth': []}],
+    'parameters': [{
+        'in': 'path',
+        'name': 'doc_id',
+        'type': 'integer',
+        'required': True,
+    }],
+    'responses': {
+        200: {'description': 'Page count and chapters'},
+        404: {'description': 'Document not found'},
+    },
+})
+def document_outline(doc_id):
+    user_id = get_jwt_identity()
+    outline, error = DocumentService.get_document_outline(user_id, doc_id)
+
+    if error:
+        return jsonify({"error": error}), 404
+
+    return jsonify(outline), 200
@@ -1,8 +1,12 @@
 import os
+import zipfile
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
-from .extractor import extract_text_from_file, allowed_file
+from .extractor import allowed_file
 from .repository import DocumentRepository
-from .models import Document
+from .models import Document, DocumentStatus
+from .tasks import enqueue_extraction
+from .storage import store_stream
 from src.users.models import User, UserRole
 
 UPLOAD_DIR = os.path.join(os.getcwd(), 'uploads')
@@ -21,50 +25,176 @@ class DocumentService:
         if not branch_id:
             return None, "Branch ID is required."
 
-        # 2. Secure Save
+        # 2. Secure Save (content-addressed: identical files share one blob on disk)
         filename = secure_filename(file.filename)
-        save_name = f"{user_id}_{filename}" 
-        file_path = os.path.join(UPLOAD_DIR, save_name)
+        ext = file.filename.rsplit('.', 1)[1].lower()
         
         try:
-            file.save(file_path)
+            sha256, file_path, size = store_stream(file.stream, UPLOAD_DIR, ext)
+            blob = DocumentRepository.get_or_create_blob(sha256, file_path, size)
             
-            # 3. Text Extraction
-            extracted_text = extract_text_from_file(file_path) or ""
-            
-            # 4. Create Record with Foreign Key
+            # 3. Create Record with Foreign Key
             new_doc = Document(
                 filename=filename,
-                file_path=file_path,
+                file_path=blob.file_path,
+                content_hash=sha256,
                 module=data.get('module', 'General'),
                 year=data.get('year', ''),
-                extracted_text=extracted_text,
+                status=DocumentStatus.PENDING,
                 user_id=user_id,
                 branch_id=branch_id
             )
+            DocumentRepository.create(new_doc)
+
+            # 4. Duplicate content: reuse the text extracted for the first upload
+            if blob.is_extracted:
+                DocumentRepository.mark_ready(
+                    new_doc, blob.extracted_text, blob.page_count, blob.boilerplate_chars
+                )
+                return new_doc, None
+
+            # 5. New content: hand the extraction over to the worker pool
+            enqueue_extraction(new_doc.id)
             
-            return DocumentRepository.create(new_doc), None
+            return new_doc, None
 
         except Exception as e:
+            DocumentRepository.rollback()
             return None, str(e)
 
     @staticmethod
-    def get_documents_for_user(user_id):
+    def upload_many(files, data, user_id, max_files=100, max_entry_bytes=None):
+        """
+        Bulk upload: several files and/or ZIP archives in one request.
+        Archive entries are streamed straight from the (spooled) upload to the
+        blob store, one at a time, without loading the archive in memory.
+        Extraction is queued on the same bounded worker pool as single uploads.
+        Returns: ([{"filename", "document", "error"}, ...], error)
+        """
+        if not data.get('branch_id'):
+            return None, "Branch ID is required."
+        if not files:
+            return None, "No files provided."
+
+        results = []
+
+        def add(filename, doc, error):
+            results.append({
+                "filename": filename,
+                "document": doc.to_dict() if doc else None,
+                "error": error
+            })
+
+        for file in files:
+            if len(results) >= max_files:
+                add(file.filename, None, f"Skipped: a bulk upload is limited to {max_files} files.")
+                continue
+
+            if not file.filename.lower().endswith('.zip'):
+                doc, error = DocumentService.upload_document(file, data, user_id)
+                add(file.filename, doc, error)
+                continue
+
+            try:
+                with zipfile.ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        name = os.path.basename(info.filename)
+                        # Folders, macOS metadata and hidden files are not course material
+                        if info.is_dir() or not name or name.startswith('.') or '__MACOSX' in info.filename:
+                            continue
+                        if len(results) >= max_files:
+                            add(name, None, f"Skipped: a bulk upload is limited to {max_files} files.")
+                            continue
+                        if not allowed_file(name):
+                            add(name, None, "Invalid file format.")
+                            continue
+                        if max_entry_bytes and info.file_size > max_entry_bytes:
+                            add(name, None, "File too large.")
+                            continue
+
+                        with archive.open(info) as entry:
+                            doc, error = DocumentService.upload_document(
+                                FileStorage(stream=entry, filename=name), data, user_id
+                            )
+                        add(name, doc, error)
+            except zipfile.BadZipFile:
+                add(file.filename, None, "Invalid or corrupted ZIP archive.")
+
+        return results, None
+
+    @staticmethod
+    def _visibility_scope(user):
         """
         Smart Listing Logic:
         - Students -> See documents for their BRANCH.
         - Professors -> See documents THEY uploaded.
+        Returns: {"branch_id": ...} or {"user_id": ...}, or None if nothing is visible.
         """
-        user = User.query.get(user_id)
         if not user:
-            return []
+            return None
 
         if user.role == UserRole.STUDENT:
             # SAFETY CHECK: If student has no branch, they see nothing
             if not user.branch_id:
-                return []
-            return DocumentRepository.get_by_branch(user.branch_id)
-        
-        else:
-            # Professors/Managers see what they created
-            return DocumentRepository.get_by_uploader(user_id)
\ No newline at end of file
+                return None
+            return {"branch_id": user.branch_id}
+
+        # Professors/Managers see what they created
+        return {"user_id": user.id}
+
+    @staticmethod
+    def get_documents_for_user(user_id):
+        scope = DocumentService._visibility_scope(User.query.get(user_id))
+        if scope is None:
+            return []
+
+        if "branch_id" in scope:
+            return DocumentRepository.get_by_branch(scope["branch_id"])
+        return DocumentRepository.get_by_uploader(scope["user_id"])
+
+    @staticmethod
+    def search_documents(user_id, query, limit=20):
+        query = (query or '').strip()
+        if not query:
+            return None, "Search query is required."
+
+        scope = DocumentService._visibility_scope(User.query.get(user_id))
+        if scope is None:
+            return [], None
+
+        limit = max(1, min(int(limit), 50))
+        results = DocumentRepository.search(query, limit=limit, **scope)
+        return [
+            {**doc.to_dict(), "rank": round(float(rank), 4), "snippet": snippet}
+            for doc, rank, snippet in results
+        ], None
+
+    @staticmethod
+    def can_access(user, doc):
+        """Same visibility rules as the listing: students see their branch, others their uploads."""
+        scope = DocumentService._visibility_scope(user)
+        if scope is None or not doc or doc.is_archived:
+            return False
+        return all(int(getattr(doc, field)) == int(value) for field, value in scope.items())
+
+    @staticmethod
+    def get_document_status(user_id, doc_id):
+        user = User.query.get(user_id)
+        doc = DocumentRepository.get_by_id(doc_id)
+        if not DocumentService.can_access(user, doc):
+            return None, "Document not found"
+        return doc, None
+
+    @staticmethod
+    def get_document_outline(user_id, doc_id):
+        """Page count and detected chapters, used to pick a range for generation."""
+        doc, error = DocumentService.get_document_status(user_id, doc_id)
+        if error:
+            return None, error
+
+        chapters = DocumentRepository.get_chapters(doc.content_hash) if doc.content_hash else []
+        return {
+            "id": doc.id,
+            "page_count": doc.page_count,
+            "chapters": [c.to_dict() for c in chapters]
+        }, None
@@ -0,0 +1,66 @@
+"""
+Content-addressed storage for uploaded files.
+
+Files are stored once per distinct content, under their SHA-256:
+    uploads/ab/cd/abcd1234...ef.pdf
+The hash is computed while the upload is streamed to disk, so the file is
+read exactly once and never held in memory. The extension is only kept so
+the extractor knows the format: the same bytes uploaded again under another
+extension reuse the first blob.
+"""
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+def blob_path(upload_dir, sha256, ext):
+    """Sharded location of a blob (two directory levels keep folders small)."""
+    return os.path.join(upload_dir, sha256[:2], sha256[2:4], f"{sha256}.{ext}")
+
+def find_blob(upload_dir, sha256):
+    """Path of the stored blob with this hash, whatever its extension, or None."""
+    folder = os.path.dirname(blob_path(upload_dir, sha256, ''))
+    try:
+        names = sorted(name for name in os.listdir(folder) if name.startswith(f"{sha256}."))
+    except FileNotFoundError:
+        return None
+    return os.path.join(folder, names[0]) if names else None
+
+def store_stream(stream, upload_dir, ext):
+    """
+    Copies a readable binary stream into the store.
+    Returns: (sha256, file_path, size_in_bytes). If the same content is
+    already stored, the new copy is discarded and the existing path returned.
+    """
+    tmp_dir = os.path.join(upload_dir, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        sha256 = hasher.hexdigest()
+        existing_path = find_blob(upload_dir, sha256)
+        if existing_path:
+            os.remove(tmp_path)
+            return sha256, existing_path, size
+
+        final_path = blob_path(upload_dir, sha256, ext)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        # Atomic: concurrent uploads of the same file simply replace identical bytes
+        os.replace(tmp_path, final_path)
+        return sha256, final_path, size
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
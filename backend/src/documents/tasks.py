@@ -0,0 +1,93 @@
+"""
+Background text extraction.
+
+Uploads only save the file and create a PENDING document; the heavy work
+(opening the PDF/DOCX and extracting its text) runs here, in a small
+process-wide thread pool, so request workers are never blocked by it.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from src.extensions import db
+from .extractor import extract_document, count_pages, ExtractionError
+from .chunking import chunk_text, estimate_tokens, DEFAULT_CHUNK_TOKENS
+from .outline import detect_chapters
+from .models import DocumentStatus
+from .repository import DocumentRepository
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(app):
+    """Lazily creates the shared pool, sized by EXTRACTION_WORKERS."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('EXTRACTION_WORKERS', 2),
+                thread_name_prefix='doc-extract'
+            )
+    return _executor
+
+def enqueue_extraction(doc_id):
+    """Schedules text extraction for a document. Must be called inside an app context."""
+    app = current_app._get_current_object()
+    return _get_executor(app).submit(_run_extraction, app, doc_id)
+
+def _run_extraction(app, doc_id):
+    with app.app_context():
+        try:
+            process_document(doc_id)
+        except Exception:
+            app.logger.exception(f"Extraction worker crashed for document {doc_id}")
+        finally:
+            db.session.remove()
+
+def extraction_options():
+    """Extractor settings taken from the app config."""
+    config = current_app.config
+    return {
+        "parallel_threshold": config.get('PDF_PARALLEL_PAGE_THRESHOLD'),
+        "max_workers": config.get('PDF_PARALLEL_WORKERS'),
+        "pages_per_task": config.get('PDF_PAGES_PER_TASK'),
+    }
+
+def process_document(doc_id):
+    """Extracts the text of one document and moves it to READY or FAILED."""
+    doc = DocumentRepository.get_by_id(doc_id)
+    if not doc or doc.status == DocumentStatus.READY:
+        return doc
+
+    # Same content already extracted (duplicate upload finished first): reuse it
+    blob = doc.blob
+    if blob and blob.is_extracted:
+        return DocumentRepository.mark_ready(doc, blob.extracted_text, blob.page_count, blob.boilerplate_chars)
+
+    DocumentRepository.set_status(doc, DocumentStatus.PROCESSING)
+
+    try:
+        extracted_text, pages, boilerplate_chars = extract_document(doc.file_path, **extraction_options())
+        page_count = count_pages(doc.file_path)
+    except ExtractionError as e:
+        current_app.logger.warning(f"Extraction failed for document {doc_id}: {e}")
+        return DocumentRepository.set_status(doc, DocumentStatus.FAILED, f"Extraction Error: {e}")
+
+    if not extracted_text:
+        return DocumentRepository.set_status(
+            doc, DocumentStatus.FAILED, "No text could be extracted (scanned or empty document?)"
+        )
+
+    if boilerplate_chars:
+        current_app.logger.info(
+            f"Document {doc_id}: removed {boilerplate_chars} characters of repeated headers/footers"
+        )
+
+    if blob:
+        DocumentRepository.save_blob_text(blob, extracted_text, page_count, boilerplate_chars)
+        spans = chunk_text(extracted_text, current_app.config.get('CHUNK_TARGET_TOKENS', DEFAULT_CHUNK_TOKENS))
+        DocumentRepository.save_chunks(
+            blob.sha256, spans, [estimate_tokens(end - start) for start, end in spans]
+        )
+        DocumentRepository.save_outline(blob.sha256, pages, detect_chapters(extracted_text))
+
+    return DocumentRepository.mark_ready(doc, extracted_text, page_count, boilerplate_chars)
@@ -0,0 +1,158 @@
+"""
+Write-behind buffer for exam autosaves.
+
+POST /exams/save-answer only records the answer in this process's buffer;
+repeated clicks on the same question overwrite each other there. A
+background thread writes the buffer every AUTOSAVE_FLUSH_SECONDS in one
+transaction (see ExamRepository.save_buffered_answers). Submitting an
+attempt writes its pending answers first, and the buffer is written when the
+process exits normally.
+
+Durability: while the database is reachable, an answer acknowledged to the
+student is stored at most AUTOSAVE_FLUSH_SECONDS later (a failed flush keeps
+its answers for the next one). A process killed without running its exit
+handlers (SIGKILL, OOM, power loss) loses at most that window of autosaves;
+the final submission carries every answer anyway.
+
+Several workers: each process has its own buffer, and submit only writes
+the buffer of the process that handles it. That is enough because:
+- grading uses the answers sent with the submission, never the buffers;
+- submit marks the attempt finished while holding its row lock, and every
+  autosave write takes that lock and skips finished attempts
+  (ExamRepository.lock_open_attempts), so once an attempt is submitted no
+  buffer anywhere can write to it;
+- writes carry the time they were received, so a late flush from one worker
+  never overwrites a newer answer flushed by another.
+A worker that has not yet noticed the submission still acknowledges
+autosaves for that attempt (and then drops them) until its next flush or
+OPEN_ATTEMPT_TTL, whichever comes first.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+from src.extensions import db
+from .repository import ExamRepository
+
+# Attempts known to be in progress, with the question ids of their exam
+OPEN_ATTEMPT_TTL = 60
+
+_pending = {}   # (attempt_id, question_id) -> (selected_index, saved_at)
+_open_attempts = TTLCache(maxsize=4096, ttl=OPEN_ATTEMPT_TTL)
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flusher = None
+
+def is_enabled(app):
+    return app.config.get('AUTOSAVE_FLUSH_SECONDS', 2) > 0
+
+def get_open_attempt(attempt_id, load):
+    """
+    load(attempt_id) returns the question ids of an unfinished attempt, or None.
+    Returns: frozenset of question ids, or None if the attempt is unknown or finished.
+    """
+    with _lock:
+        question_ids = _open_attempts.get(attempt_id)
+    if question_ids is None:
+        question_ids = load(attempt_id)
+        if question_ids is not None:
+            with _lock:
+                _open_attempts[attempt_id] = question_ids
+    return question_ids
+
+def put(app, attempt_id, question_id, selected_index):
+    _ensure_flusher(app)
+    with _lock:
+        _pending[(attempt_id, question_id)] = (selected_index, datetime.now())
+
+def pending_answers(attempt_id):
+    """{question_id: selected_index} received by this process but not yet written."""
+    with _lock:
+        return {q: value[0] for (a, q), value in _pending.items() if a == attempt_id}
+
+def close_attempt(attempt_id):
+    with _lock:
+        _open_attempts.pop(attempt_id, None)
+
+def clear():
+    """Forgets the buffered answers and known attempts without writing them."""
+    with _lock:
+        _pending.clear()
+        _open_attempts.clear()
+
+def flush(app, attempt_id=None):
+    """Writes the buffered answers (of one attempt, or all). Must run inside an app context."""
+    with _flush_lock:
+        with _lock:
+            keys = [k for k in _pending if attempt_id is None or k[0] == attempt_id]
+            batch = {k: _pending.pop(k) for k in keys}
+        if not batch:
+            return 0
+
+        entries = [(a, q, index, saved_at) for (a, q), (index, saved_at) in batch.items()]
+        try:
+            return _write(entries)
+        except IntegrityError:
+            db.session.rollback()
+            app.logger.warning(f"Autosave flush of {len(entries)} answers rejected, retrying one by one")
+        except Exception:
+            # Database unreachable: keep the answers for the next flush
+            db.session.rollback()
+            _requeue(batch)
+            raise
+
+        # One bad row (e.g. a deleted question) must not drop the rest of the batch
+        written = 0
+        for entry in entries:
+            try:
+                written += _write([entry])
+            except IntegrityError:
+                db.session.rollback()
+                app.logger.exception(f"Autosave dropped for attempt {entry[0]}, question {entry[1]}")
+        return written
+
+def _write(entries):
+    written, finished = ExamRepository.save_buffered_answers(entries)
+    # Submitted on another worker: refuse the next autosaves here instead of buffering them
+    with _lock:
+        for attempt_id in finished:
+            _open_attempts.pop(attempt_id, None)
+    return written
+
+def _requeue(batch):
+    with _lock:
+        for key, value in batch.items():
+            # A newer answer received during the flush wins
+            _pending.setdefault(key, value)
+
+def _ensure_flusher(app):
+    """Starts the flush thread on first use, i.e. in each worker process after any fork."""
+    global _flusher
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        if _flusher is None:
+            atexit.register(_flush_at_exit, app)
+        _flusher = threading.Thread(target=_run_flusher, args=(app,), name='autosave-flush', daemon=True)
+        _flusher.start()
+
+def _run_flusher(app):
+    interval = app.config.get('AUTOSAVE_FLUSH_SECONDS', 2)
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                flush(app)
+            except Exception:
+                app.logger.exception("Autosave flush failed")
+            finally:
+                db.session.remove()
+
+def _flush_at_exit(app):
+    with app.app_context():
+        try:
+            flush(app)
+        finally:
+            db.session.remove()
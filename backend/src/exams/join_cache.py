@@ -0,0 +1,86 @@
+"""
+In-process caches for /exams/join.
+
+When an exam opens, every student of the class joins within a few seconds.
+Everything a join needs that is the same for all of them is kept here:
+
+- the session looked up by code (a plain dict, never an ORM object), for
+  EXAM_SESSION_CACHE_TTL seconds. Editing, closing or deleting a session
+  drops its entries in the current process; other workers see the change
+  after at most the TTL;
+- the shared part of the join response per (session, version, duration):
+  the student payload (no correct answers) and the per-question timing.
+  Everything it is built from is in its key, so an entry is never stale,
+  only unused once the session changes.
+
+A cold entry is built by one request while concurrent joins for the same key
+wait for it, instead of all hitting the database at once.
+"""
+import threading
+from cachetools import LRUCache, TTLCache
+
+SESSION_CACHE_SIZE = 1024
+PAYLOAD_CACHE_SIZE = 256
+
+_sessions = None
+_payloads = LRUCache(maxsize=PAYLOAD_CACHE_SIZE)
+_lock = threading.Lock()
+_key_locks = {}
+
+def _key_lock(key):
+    with _lock:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+def _get_or_build(cache, key, build):
+    with _lock:
+        value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = _key_lock(key)
+    with lock:
+        # Another request may have built it while we waited
+        with _lock:
+            value = cache.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                with _lock:
+                    cache[key] = value
+    with _lock:
+        _key_locks.pop(key, None)
+    return value
+
+def _session_cache(ttl):
+    global _sessions
+    with _lock:
+        if _sessions is None:
+            _sessions = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=ttl)
+        return _sessions
+
+def get_session(code, load, ttl):
+    """
+    load(code) returns the active session as a dict, or None (not cached).
+    Returns: the cached dict; callers must not mutate it.
+    """
+    return _get_or_build(_session_cache(ttl), ("code", code), lambda: load(code))
+
+def get_join_payload(session_id, version_id, duration_minutes, build):
+    """build() returns the shared join data of this session, version and duration."""
+    return _get_or_build(_payloads, (session_id, version_id, duration_minutes), build)
+
+def invalidate_session(code, session_id):
+    with _lock:
+        if _sessions is not None:
+            _sessions.pop(("code", code), None)
+        for key in [k for k in _payloads if k[0] == session_id]:
+            del _payloads[key]
+
+def clear():
+    with _lock:
+        if _sessions is not None:
+            _sessions.clear()
+        _payloads.clear()
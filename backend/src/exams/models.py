@@ -18,9 +18,12 @@ class ExamSession(db.Model):
 
     # Relationships
     qcm_id = db.Column(db.Integer, db.ForeignKey('qcms.id'), nullable=False)
+    # Snapshot of the QCM taken at creation: joins and grading read it, not the live questions
+    qcm_version_id = db.Column(db.Integer, db.ForeignKey('qcm_versions.id'), nullable=True)
     professor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.id'), nullable=False)
     qcm = db.relationship('QCM', backref='sessions', lazy=True)
+    qcm_version = db.relationship('QCMVersion', lazy=True)
     professor = db.relationship('User', backref='exam_sessions', lazy=True)
     branch = db.relationship('Branch', backref='exam_sessions', lazy=True)
     attempts = db.relationship('StudentAttempt', backref='session', lazy=True, cascade="all, delete-orphan")
@@ -48,10 +51,16 @@ class StudentAnswer(db.Model):
     Stores exactly what the student clicked for each question.
     """
     __tablename__ = 'student_answers'
+    __table_args__ = (
+        # One row per answered question; saves upsert on it (also the index for lookups by attempt)
+        db.UniqueConstraint('attempt_id', 'question_id', name='uq_student_answers_attempt_question'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
     attempt_id = db.Column(db.Integer, db.ForeignKey('student_attempts.id'), nullable=False)
     
     selected_choice_index = db.Column(db.Integer, nullable=False) # 0, 1, 2, or 3
-    is_correct = db.Column(db.Boolean, default=False) # Calculated at submission
\ No newline at end of file
+    is_correct = db.Column(db.Boolean, default=False) # Calculated at submission
+    # When the server received the autosave: an older buffered write never overwrites a newer one
+    saved_at = db.Column(db.DateTime, nullable=True)
\ No newline at end of file
@@ -1,9 +1,14 @@
 from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from src.extensions import db
 from .models import ExamSession, StudentAttempt, StudentAnswer
 import random
 import string
 
+# Rows per INSERT ... ON CONFLICT statement (stays far below the bind parameter limit)
+ANSWER_BATCH_SIZE = 1000
+
 class ExamRepository:
     @staticmethod
     def generate_code():
@@ -20,6 +25,7 @@ class ExamRepository:
             duration_minutes=data['duration_minutes'],
             total_grade=data['total_grade'],
             qcm_id=data['qcm_id'],
+            qcm_version_id=data.get('qcm_version_id'),
             professor_id=data['professor_id'],
             branch_id=data['branch_id']
         )
@@ -27,6 +33,13 @@ class ExamRepository:
         db.session.commit()
         return session
 
+    @staticmethod
+    def update_session(session, changes):
+        for field, value in changes.items():
+            setattr(session, field, value)
+        db.session.commit()
+        return session
+
     @staticmethod
     def delete_session(session):
         db.session.delete(session)
@@ -37,6 +50,25 @@ class ExamRepository:
         """Returns ALL exams (active & finished) for the professor"""
         return ExamSession.query.filter_by(professor_id=professor_id).order_by(ExamSession.start_time.desc()).all()
 
+    @staticmethod
+    def set_session_version(session, version):
+        session.qcm_version_id = version.id
+        db.session.commit()
+        return session
+
+    @staticmethod
+    def user_has_version(user_id, version_id):
+        """True if the user created a session on this version or has an attempt in one"""
+        sessions = ExamSession.query.filter(ExamSession.qcm_version_id == version_id)
+        if sessions.filter(ExamSession.professor_id == user_id).first():
+            return True
+        return db.session.query(StudentAttempt.id).join(
+            ExamSession, StudentAttempt.session_id == ExamSession.id
+        ).filter(
+            ExamSession.qcm_version_id == version_id,
+            StudentAttempt.user_id == user_id
+        ).first() is not None
+
     @staticmethod
     def get_session_by_id(session_id):
         return ExamSession.query.get(session_id)
@@ -53,14 +85,36 @@ class ExamRepository:
         return attempt
 
     @staticmethod
-    def get_attempt(attempt_id):
-        return StudentAttempt.query.get(attempt_id)
+    def get_attempt(attempt_id, for_update=False):
+        """for_update: lock the attempt row until the caller commits (see lock_open_attempts)."""
+        if not for_update:
+            return StudentAttempt.query.get(attempt_id)
+        return StudentAttempt.query.filter_by(id=attempt_id).with_for_update().populate_existing().first()
+
+    @staticmethod
+    def lock_open_attempts(attempt_ids):
+        """
+        Locks the unfinished attempts among attempt_ids until the caller commits.
+        submit_exam holds the same row lock while it marks an attempt finished, so an
+        answer written under this lock can never land after the submission.
+        Rows are locked in id order: concurrent flushes cannot deadlock each other.
+        Returns: set of the open attempt ids
+        """
+        rows = db.session.query(StudentAttempt.id).filter(
+            StudentAttempt.id.in_(attempt_ids),
+            StudentAttempt.finished_at.is_(None)
+        ).order_by(StudentAttempt.id).with_for_update()
+        return {row.id for row in rows}
     
     @staticmethod
     def save_answers_and_score(attempt, answers_list, total_score):
-        # 1. Save all answers
-        for ans in answers_list:
-            db.session.add(ans)
+        """answers_list: dicts with question_id, selected_choice_index and is_correct."""
+        # 1. Save all answers (overwrites the autosaved ones)
+        now = datetime.now()
+        rows = [dict(ans, attempt_id=attempt.id, saved_at=now) for ans in answers_list]
+        ExamRepository.upsert_answers(
+            rows, ['selected_choice_index', 'is_correct', 'saved_at'], only_newer=False
+        )
         
         # 2. Update Attempt status
         attempt.score = total_score
@@ -78,31 +132,73 @@ class ExamRepository:
         return ExamSession.query.order_by(ExamSession.start_time.desc()).all()
     
     @staticmethod
-    def save_individual_answer(attempt_id, question_id, selected_index):
-        """Save or update a single answer for a question"""
-        # Check if answer already exists
-        existing_answer = StudentAnswer.query.filter_by(
-            attempt_id=attempt_id,
-            question_id=question_id
-        ).first()
-        
-        if existing_answer:
-            # Update existing answer
-            existing_answer.selected_choice_index = selected_index
-        else:
-            # Create new answer
-            new_answer = StudentAnswer(
-                attempt_id=attempt_id,
-                question_id=question_id,
-                selected_choice_index=selected_index,
-                is_correct=False  # Will be calculated on final submission
+    def upsert_answers(rows, columns, only_newer=True):
+        """
+        INSERT ... ON CONFLICT (attempt_id, question_id) DO UPDATE, one statement per batch.
+        rows: dicts with attempt_id, question_id and the values to store (one per pair).
+        columns: what an existing answer gets overwritten with.
+        only_newer: keep the stored answer when its saved_at is more recent.
+        The caller commits. Returns: number of rows inserted or updated
+        """
+        written = 0
+        for start in range(0, len(rows), ANSWER_BATCH_SIZE):
+            stmt = pg_insert(StudentAnswer).values(rows[start:start + ANSWER_BATCH_SIZE])
+            where = None
+            if only_newer:
+                where = or_(StudentAnswer.saved_at.is_(None), StudentAnswer.saved_at < stmt.excluded.saved_at)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['attempt_id', 'question_id'],
+                set_={column: stmt.excluded[column] for column in columns},
+                where=where
             )
-            db.session.add(new_answer)
-        
+            written += db.session.execute(stmt).rowcount
+        return written
+
+    @staticmethod
+    def save_individual_answer(attempt_id, question_id, selected_index, saved_at=None):
+        """
+        Save or update a single answer for a question (one statement, safe under concurrent saves).
+        Returns: False if the attempt was submitted meanwhile (nothing written)
+        """
+        if not ExamRepository.lock_open_attempts([attempt_id]):
+            db.session.rollback()
+            return False
+        ExamRepository.upsert_answers([{
+            "attempt_id": attempt_id,
+            "question_id": question_id,
+            "selected_choice_index": selected_index,
+            "is_correct": False,  # Will be calculated on final submission
+            "saved_at": saved_at or datetime.now()
+        }], ['selected_choice_index', 'saved_at'])
         db.session.commit()
-        return existing_answer if existing_answer else new_answer
+        return True
     
     @staticmethod
     def get_saved_answers(attempt_id):
         """Get all saved answers for an attempt"""
-        return StudentAnswer.query.filter_by(attempt_id=attempt_id).all()
\ No newline at end of file
+        return StudentAnswer.query.filter_by(attempt_id=attempt_id).all()
+
+    @staticmethod
+    def save_buffered_answers(entries):
+        """
+        Writes a batch of buffered autosaves in one transaction.
+        entries: [(attempt_id, question_id, selected_index, saved_at)], one per (attempt, question).
+        Answers of finished attempts and writes older than the stored one are skipped.
+        Returns: (number of rows written, ids of the attempts already finished or deleted)
+        """
+        attempt_ids = {e[0] for e in entries}
+        open_ids = ExamRepository.lock_open_attempts(attempt_ids)
+        entries = [e for e in entries if e[0] in open_ids]
+        if not entries:
+            db.session.rollback()
+            return 0, attempt_ids
+
+        written = ExamRepository.upsert_answers([{
+            "attempt_id": attempt_id,
+            "question_id": question_id,
+            "selected_choice_index": selected_index,
+            "is_correct": False,
+            "saved_at": saved_at
+        } for attempt_id, question_id, selected_index, saved_at in entries], ['selected_choice_index', 'saved_at'])
+        db.session.commit()
+        return written, attempt_ids - open_ids
@@ -89,6 +89,61 @@ def delete_session(session_id):
         
     return jsonify({"message": message}), 200
 
+# 2b. EDIT OR CLOSE EXAM
+@exams_bp.route('/<int:session_id>', methods=['PATCH'])
+@jwt_required()
+@swag_from({
+    'tags': ['Exams'],
+    'summary': 'Edit or close an exam session',
+    'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'in': 'path',
+            'name': 'session_id',
+            'type': 'integer',
+            'required': True,
+        },
+        {
+            'in': 'body',
+            'name': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'description': {'type': 'string'},
+                    'start_time': {'type': 'string'},
+                    'duration_minutes': {'type': 'integer'},
+                    'total_grade': {'type': 'number'},
+                    'is_active': {'type': 'boolean', 'description': 'false closes the session to new joins'},
+                },
+            },
+        },
+    ],
+    'responses': {
+        200: {'description': 'Session updated'},
+        400: {'description': 'Invalid payload'},
+        403: {'description': 'Forbidden'},
+        404: {'description': 'Session not found'},
+    },
+})
+def update_session(session_id):
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    session, error, code = ExamService.update_exam_session(user_id, session_id, data)
+
+    if error:
+        return jsonify({"error": error}), code
+
+    return jsonify({
+        "message": "Session updated successfully",
+        "code": session.code,
+        "session_id": session.id,
+        "start_time": session.start_time.isoformat(),
+        "end_time": session.end_time.isoformat(),
+        "is_active": session.is_active
+    }), 200
+
 # 3. PROFESSOR DASHBOARD (List all exams, even finished ones)
 @exams_bp.route('/professor/list', methods=['GET'])
 @jwt_required()
@@ -165,6 +220,38 @@ def join_session():
         "saved_answers": result.get('saved_answers', {})  # Include saved answers
     }), 200
 
+@exams_bp.route('/versions/<content_hash>', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Exams'],
+    'summary': 'Exam questions of a QCM version (immutable, cacheable)',
+    'description': 'The hash is qcm.version from /exams/join. The body never changes for a given hash, '
+                   'so it is served with a strong ETag and cached for a year.',
+    'security': [{'BearerAuth': []}],
+    'parameters': [{
+        'in': 'path',
+        'name': 'content_hash',
+        'type': 'string',
+        'required': True,
+    }],
+    'responses': {
+        200: {'description': 'Questions without the correct answers'},
+        304: {'description': 'Not modified (If-None-Match matched)'},
+        403: {'description': 'Not a participant of a session using this version'},
+        404: {'description': 'Version not found'},
+    },
+})
+def get_version(content_hash):
+    user_id = get_jwt_identity()
+    payload, error, code = ExamService.get_version_payload(user_id, content_hash)
+    if error:
+        return jsonify({"error": error}), code
+
+    response = jsonify(payload)
+    response.set_etag(content_hash)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response.make_conditional(request)
+
 @exams_bp.route('/submit', methods=['POST'])
 @jwt_required()
 @swag_from({
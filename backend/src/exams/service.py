@@ -1,10 +1,12 @@
 from src.users.repository import UserRepository
 from src.users.models import UserRole, User
 from .repository import ExamRepository
-from .models import ExamSession, StudentAnswer
+from .models import ExamSession
 from src.qcm.repository import QCMRepository 
-from src.qcm.models import Question
+from src.qcm.versions import snapshot_qcm, student_payload, correct_indexes
+from flask import current_app
 from datetime import datetime, timedelta
+from . import autosave, join_cache
 
 class ExamService:
     @staticmethod
@@ -37,9 +39,32 @@ class ExamService:
 
         data['total_grade'] = data.get('total_grade', 20)
         data['professor_id'] = professor_id
+
+        # Freeze the questions: later edits of the QCM do not affect this session
+        content_hash, payload = snapshot_qcm(qcm)
+        data['qcm_version_id'] = QCMRepository.get_or_create_version(qcm.id, content_hash, payload).id
         
         return ExamRepository.create_session(data), None
 
+    @staticmethod
+    def get_session_version(session):
+        """The session's QCM snapshot (sessions created before versions get one on first use)."""
+        if session.qcm_version is None:
+            content_hash, payload = snapshot_qcm(session.qcm)
+            version = QCMRepository.get_or_create_version(session.qcm_id, content_hash, payload)
+            ExamRepository.set_session_version(session, version)
+        return session.qcm_version
+
+    @staticmethod
+    def get_version_payload(user_id, content_hash):
+        """Returns: (student payload, error, status_code)"""
+        version = QCMRepository.get_version_by_hash(content_hash)
+        if not version:
+            return None, "Version not found", 404
+        if not ExamRepository.user_has_version(user_id, version.id):
+            return None, "Unauthorized", 403
+        return student_payload(version), None, 200
+
     @staticmethod
     def delete_exam_session(professor_id, session_id):
         session = ExamRepository.get_session_by_id(session_id)
@@ -55,8 +80,46 @@ class ExamService:
         # ----------------------------------------------------------------
             
         ExamRepository.delete_session(session)
+        join_cache.invalidate_session(session.code, session.id)
         return "Exam deleted successfully", None
 
+    @staticmethod
+    def update_exam_session(professor_id, session_id, data):
+        """
+        Edits the schedule, description or grade of a session, or closes it (is_active: false).
+        Returns: (session, error, status_code)
+        """
+        session = ExamRepository.get_session_by_id(session_id)
+        if not session:
+            return None, "Exam session not found", 404
+
+        if int(session.professor_id) != int(professor_id):
+            return None, "Unauthorized: You can only edit your own exams.", 403
+
+        changes = {}
+        try:
+            start_dt = datetime.fromisoformat(data['start_time']) if 'start_time' in data else session.start_time
+            duration = int(data.get('duration_minutes', session.duration_minutes))
+            if 'total_grade' in data:
+                changes['total_grade'] = int(data['total_grade'])
+        except (TypeError, ValueError):
+            return None, "Invalid Date Format or number. Use ISO format (YYYY-MM-DDTHH:MM)", 400
+        if duration <= 0:
+            return None, "duration_minutes must be positive", 400
+
+        changes['start_time'] = start_dt
+        changes['duration_minutes'] = duration
+        changes['end_time'] = start_dt + timedelta(minutes=duration)
+        if 'description' in data:
+            changes['description'] = data['description']
+        if 'is_active' in data:
+            changes['is_active'] = bool(data['is_active'])
+
+        ExamRepository.update_session(session, changes)
+        # Joins in this process see the change at once, other workers within EXAM_SESSION_CACHE_TTL
+        join_cache.invalidate_session(session.code, session.id)
+        return session, None, 200
+
     @staticmethod
     def get_professor_exams(professor_id):
         """Get list of ALL exams created by this professor"""
@@ -64,33 +127,68 @@ class ExamService:
         return sessions
 
     @staticmethod
-    def join_exam(student_id, code):
+    def _load_session_for_join(code):
+        """What join_exam needs from a session, detached from the ORM (cached by code)."""
         session = ExamRepository.get_session_by_code(code)
+        if not session:
+            return None
+        version = ExamService.get_session_version(session)
+        return {
+            "id": session.id,
+            "start_time": session.start_time,
+            "end_time": session.end_time,
+            "duration_minutes": session.duration_minutes,
+            "qcm_version_id": version.id
+        }
+
+    @staticmethod
+    def _build_join_payload(session):
+        """The part of the join response shared by every student of a session."""
+        qcm_payload = student_payload(QCMRepository.get_version(session["qcm_version_id"]))
+
+        # Time per question
+        question_count = qcm_payload["question_count"]
+        total_seconds = session["duration_minutes"] * 60
+        seconds_per_question = int(total_seconds / question_count) if question_count > 0 else 0
+        return {
+            "qcm": qcm_payload,
+            "question_count": question_count,
+            "seconds_per_question": seconds_per_question
+        }
+
+    @staticmethod
+    def join_exam(student_id, code):
+        session = join_cache.get_session(
+            code, ExamService._load_session_for_join, current_app.config.get('EXAM_SESSION_CACHE_TTL', 30)
+        )
         if not session:
             return None, "Invalid or inactive session code."
 
         now = datetime.now()
-        if now < session.start_time or now > session.end_time:
+        if now < session["start_time"] or now > session["end_time"]:
             return None, "Exam is not currently open."
 
         # --- GET OR CREATE ATTEMPT ---
-        attempt = ExamRepository.get_student_attempt(student_id, session.id)
-        if not attempt:
+        attempt = ExamRepository.get_student_attempt(student_id, session["id"])
+        is_new_attempt = attempt is None
+        if is_new_attempt:
             # First time joining: Create attempt but timer is based on exam start time
-            attempt = ExamRepository.create_attempt(student_id, session.id)
+            attempt = ExamRepository.create_attempt(student_id, session["id"])
         
         if attempt.finished_at:
              return None, "You have already submitted this exam."
 
-        
-        # 1. Calculate time per question
-        question_count = len(session.qcm.questions)
-        total_seconds = session.duration_minutes * 60
-        seconds_per_question = int(total_seconds / question_count) if question_count > 0 else 0
+        # 1. Questions and time per question: built once per session, shared by all joins
+        shared = join_cache.get_join_payload(
+            session["id"], session["qcm_version_id"], session["duration_minutes"],
+            lambda: ExamService._build_join_payload(session)
+        )
+        question_count = shared["question_count"]
+        seconds_per_question = shared["seconds_per_question"]
 
         # 2. Calculate how much time has passed since EXAM STARTED (not when student joined)
         # This ensures all students see the same question at the same time
-        elapsed_time = (now - session.start_time).total_seconds()
+        elapsed_time = (now - session["start_time"]).total_seconds()
         
         # 3. Determine which question they should be on based on exam start time
         # Example: 300 seconds passed / 60 sec per question = Index 5 (Question 6)
@@ -109,20 +207,23 @@ class ExamService:
             # Time is up for all questions
             return None, "Time is up! The exam duration has passed."
 
-        # 6. Get saved answers for this attempt
-        saved_answers = ExamRepository.get_saved_answers(attempt.id)
-        saved_answers_dict = {ans.question_id: ans.selected_choice_index for ans in saved_answers}
+        # 6. Get saved answers for this attempt (a new attempt has none), including autosaves not written yet
+        saved_answers_dict = {}
+        if not is_new_attempt:
+            saved_answers = ExamRepository.get_saved_answers(attempt.id)
+            saved_answers_dict = {ans.question_id: ans.selected_choice_index for ans in saved_answers}
+            saved_answers_dict.update(autosave.pending_answers(attempt.id))
 
         return {
             "attempt_id": attempt.id, # Ensure this matches your route expectation
-            "qcm": session.qcm.to_dict(), 
+            "qcm": shared["qcm"], # Snapshot without the answers; cacheable under qcm["version"]
             "exam_config": {
-                "total_duration": session.duration_minutes,
+                "total_duration": session["duration_minutes"],
                 "seconds_per_question": seconds_per_question,
                 "start_at_index": current_index,
                 "initial_question_time": time_left_in_current_question,
-                "exam_start_time": session.start_time.isoformat(),  # Use exam start time, not attempt start time
-                "started_at": session.start_time.isoformat()  # Keep for backward compatibility
+                "exam_start_time": session["start_time"].isoformat(),  # Use exam start time, not attempt start time
+                "started_at": session["start_time"].isoformat()  # Keep for backward compatibility
             },
             "saved_answers": saved_answers_dict  # Include saved answers
         }, None
@@ -162,54 +263,54 @@ class ExamService:
         # --- DYNAMIC SCORING ENGINE ---
         # Note: Submission is allowed at any time, but questions auto-advance based on exam start time
         
-        # 1. Get total questions count
-        total_questions = len(attempt.session.qcm.questions)
+        # 1. Grade against the snapshot the student was shown
+        correct_by_question = correct_indexes(ExamService.get_session_version(attempt.session))
+        total_questions = len(correct_by_question)
         if total_questions == 0:
             return None, "Error: Exam has 0 questions."
 
+        # Autosaves buffered by this process go to the database first
+        autosave.close_attempt(attempt.id)
+        autosave.flush(current_app._get_current_object(), attempt.id)
+
+        # Locked until the grade is committed: a flush from another worker waits,
+        # then finds the attempt finished and writes nothing (see lock_open_attempts)
+        attempt = ExamRepository.get_attempt(attempt_id, for_update=True)
+        if attempt.finished_at:
+            db.session.rollback()
+            return None, "Exam already submitted."
+
         # 2. Calculate weight per question (e.g., 20 / 10 = 2 points each)
         points_per_question = attempt.session.total_grade / total_questions
 
         correct_count = 0
-        answers_to_save = []
-        
-        # Get existing saved answers
-        existing_answers = {ans.question_id: ans for ans in attempt.answers}
+        answers_to_save = {}
         
         for ans_data in student_answers_payload:
             q_id = ans_data.get('question_id')
             idx = ans_data.get('selected_index')
             
-            question = Question.query.get(q_id)
-            if not question: 
+            correct_idx = correct_by_question.get(q_id)
+            if correct_idx is None or q_id in answers_to_save:
                 continue 
 
-            correct_idx = question.get_correct_choice_index()
             is_correct = (idx == correct_idx)
             
             if is_correct:
                 correct_count += 1
             
-            # Use existing answer if available, otherwise create new one
-            if q_id in existing_answers:
-                existing_ans = existing_answers[q_id]
-                existing_ans.selected_choice_index = idx
-                existing_ans.is_correct = is_correct
-                answers_to_save.append(existing_ans)
-            else:
-                new_ans = StudentAnswer(
-                    question_id=q_id,
-                    attempt_id=attempt.id,
-                    selected_choice_index=idx,
-                    is_correct=is_correct
-                )
-                answers_to_save.append(new_ans)
+            # Upserted: replaces the autosaved answer if there is one
+            answers_to_save[q_id] = {
+                "question_id": q_id,
+                "selected_choice_index": idx,
+                "is_correct": is_correct
+            }
 
         # 3. Final Score Calculation
         final_score = correct_count * points_per_question
         
         # Save everything
-        ExamRepository.save_answers_and_score(attempt, answers_to_save, final_score)
+        ExamRepository.save_answers_and_score(attempt, list(answers_to_save.values()), final_score)
         
         return {
             "score": final_score,
@@ -298,17 +399,40 @@ class ExamService:
                 
         return live_data, None
     
+    @staticmethod
+    def _load_open_attempt(attempt_id):
+        """Question ids of an attempt still in progress (None if unknown or submitted)."""
+        attempt = ExamRepository.get_attempt(attempt_id)
+        if not attempt or attempt.finished_at:
+            return None
+        return frozenset(correct_indexes(ExamService.get_session_version(attempt.session)))
+
     @staticmethod
     def save_answer(attempt_id, question_id, selected_index):
         """Save or update a single answer for a question"""
-        attempt = ExamRepository.get_attempt(attempt_id)
-        if not attempt:
-            return None, "Attempt not found"
-        
-        if attempt.finished_at:
-            return None, "Exam already submitted."
-        
-        # Save the answer
-        ExamRepository.save_individual_answer(attempt_id, question_id, selected_index)
-        
-        return {"message": "Answer saved successfully"}, None
\ No newline at end of file
+        app = current_app._get_current_object()
+        if not autosave.is_enabled(app):
+            attempt = ExamRepository.get_attempt(attempt_id)
+            if not attempt:
+                return None, "Attempt not found"
+            
+            if attempt.finished_at:
+                return None, "Exam already submitted."
+            
+            # Save the answer
+            if not ExamRepository.save_individual_answer(attempt_id, question_id, selected_index):
+                return None, "Exam already submitted."
+            
+            return {"message": "Answer saved successfully"}, None
+
+        # Buffered: no database write here, see autosave.py
+        if not isinstance(selected_index, int) or isinstance(selected_index, bool):
+            return None, "selected_index must be an integer"
+        question_ids = autosave.get_open_attempt(attempt_id, ExamService._load_open_attempt)
+        if question_ids is None:
+            return None, "Attempt not found or already submitted."
+        if question_id not in question_ids:
+            return None, "Question is not part of this exam."
+
+        autosave.put(app, attempt_id, question_id, selected_index)
+        return {"message": "Answer saved successfully"}, None
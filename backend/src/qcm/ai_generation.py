@@ -1,33 +1,24 @@
-import os
 import json
 import random
-import google.generativeai as genai
+from .providers import get_provider
+from .resilience import ProviderUnavailable
+
+# Bump whenever the prompt below changes: cached results are keyed on it
+PROMPT_VERSION = 1
 
 class AIGenerator:
     @staticmethod
     def generate(text_content, num_questions=5, level="medium", mode="professor"):
         """
         mode: 'professor' (Official, Hard, Analytic) vs 'student' (Practice, Varied, Basic)
+        text_content: the passages to quiz on, already trimmed to the token budget
+        (see QCMService.build_source_text).
         """
-        api_key = os.environ.get("GOOGLE_API_KEY")
-        if not api_key:
-            return None, "Google API Key is missing in .env"
-
-        genai.configure(api_key=api_key)
-        
         # STRATEGY 1: TEMPERATURE
         # Professor = Lower (0.3) -> More deterministic, precise, formal.
         # Student = Higher (0.9) -> More random, ensures different questions every time they click generate.
         temperature = 0.3 if mode == "professor" else 0.9
 
-        model = genai.GenerativeModel(
-            model_name="gemini-flash-latest",
-            generation_config={
-                "response_mime_type": "application/json",
-                "temperature": temperature,
-            }
-        )
-
         # STRATEGY 2: PROMPT ENGINEERING (The "Anti-Overlap" Logic)
         if mode == "professor":
             role_instruction = """
@@ -71,12 +62,13 @@ class AIGenerator:
         ]
 
         SOURCE TEXT:
-        {text_content[:50000]} 
+        {text_content} 
         """
 
         try:
-            response = model.generate_content(prompt)
-            questions_data = json.loads(response.text)
+            # The provider (Gemini, or the offline fake) is shared across requests
+            raw = get_provider().generate(prompt, num_questions, temperature)
+            questions_data = json.loads(raw)
 
             # Python-side shuffling
             for q in questions_data:
@@ -84,5 +76,8 @@ class AIGenerator:
             
             return questions_data, None
 
+        except ProviderUnavailable:
+            # Already retried (or circuit open): the caller reports it as such
+            raise
         except Exception as e:
             return None, f"AI Error: {str(e)}"
\ No newline at end of file
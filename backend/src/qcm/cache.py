@@ -0,0 +1,95 @@
+"""
+In-process cache of AI generation results.
+
+Professors often regenerate the same document with the same level and
+count; at temperature 0.3 the answer barely changes, yet every call is paid
+and slow. Results are cached under a hash of the exact source text plus
+num_questions, level, mode and PROMPT_VERSION, with TTL expiry and LRU
+eviction (cachetools.TTLCache). Student mode is not cached by default:
+practice runs are meant to differ (GENERATION_CACHE_MODES).
+"""
+import copy
+import hashlib
+import threading
+from cachetools import TTLCache
+from .ai_generation import PROMPT_VERSION
+
+class GenerationCache:
+    def __init__(self, maxsize=256, ttl=86400, modes=("professor",)):
+        self.modes = set(modes)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def make_key(text_content, num_questions, level, mode):
+        digest = hashlib.sha256(text_content.encode('utf-8')).hexdigest()
+        return f"{PROMPT_VERSION}:{mode}:{level}:{num_questions}:{digest}"
+
+    def wrap(self, generate, fresh=False):
+        """
+        Returns a function with the signature of AIGenerator.generate that
+        answers from the cache when possible. fresh=True skips the lookup but
+        still stores the new result. Errors are never cached.
+        """
+        if self._cache.maxsize <= 0:
+            return generate
+
+        def cached_generate(text_content, num_questions, level, mode):
+            if mode not in self.modes:
+                with self._lock:
+                    self.bypassed += 1
+                return generate(text_content, num_questions, level, mode)
+
+            key = self.make_key(text_content, num_questions, level, mode)
+            if not fresh:
+                with self._lock:
+                    questions = self._cache.get(key)
+                    if questions is not None:
+                        self.hits += 1
+                        return copy.deepcopy(questions), None
+                    self.misses += 1
+            else:
+                with self._lock:
+                    self.bypassed += 1
+
+            questions, error = generate(text_content, num_questions, level, mode)
+            if not error and questions:
+                with self._lock:
+                    self._cache[key] = copy.deepcopy(questions)
+            return questions, error
+
+        return cached_generate
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_generation_cache(config):
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GenerationCache(
+                maxsize=config.get('GENERATION_CACHE_SIZE', 256),
+                ttl=config.get('GENERATION_CACHE_TTL', 86400),
+                modes=config.get('GENERATION_CACHE_MODES', ('professor',))
+            )
+        return _cache
@@ -0,0 +1,205 @@
+"""
+Semantic near-duplicate detection over a professor's question bank.
+
+Question texts are encoded on CPU by a multilingual sentence-transformer
+(EMBEDDING_MODEL, loaded lazily through `transformers`) in batches, and the
+L2-normalized vectors are cached in question_embeddings by text hash, so a
+text is only encoded once. For lookups each user's bank is kept in memory as
+one float32 matrix; comparing new questions is a single matrix product,
+which stays well under a second for 100k stored questions.
+"""
+import hashlib
+import logging
+import threading
+import numpy as np
+from .repository import QCMRepository
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 64
+MAX_TOKENS = 128            # Questions are short; longer texts are truncated
+MAX_MATCHES = 5             # Matches reported per question
+
+class EmbeddingUnavailable(Exception):
+    """torch/transformers are not installed or the model cannot be loaded."""
+
+def text_hash(text):
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+class Encoder:
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._tokenizer = None
+        self._model = None
+        self._torch = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            try:
+                import torch
+                from transformers import AutoModel, AutoTokenizer
+            except ImportError as e:
+                raise EmbeddingUnavailable(f"Embeddings need torch and transformers: {e}")
+            try:
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self._model = AutoModel.from_pretrained(self.model_name).eval()
+            except Exception as e:
+                raise EmbeddingUnavailable(f"Cannot load embedding model {self.model_name}: {e}")
+            self._torch = torch
+
+    def encode(self, texts):
+        """Returns: (len(texts), dim) float32 array of unit vectors."""
+        with self._lock:
+            self._load()
+            torch = self._torch
+            batches = []
+            with torch.inference_mode():
+                for i in range(0, len(texts), BATCH_SIZE):
+                    encoded = self._tokenizer(
+                        texts[i:i + BATCH_SIZE], padding=True, truncation=True,
+                        max_length=MAX_TOKENS, return_tensors='pt'
+                    )
+                    hidden = self._model(**encoded).last_hidden_state
+                    # Mean pooling over real tokens (sentence-transformers convention)
+                    mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                    pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                    pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+                    batches.append(pooled.cpu().numpy().astype(np.float32))
+            return np.vstack(batches)
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+def get_encoder(model_name):
+    with _encoders_lock:
+        if model_name not in _encoders:
+            _encoders[model_name] = Encoder(model_name)
+        return _encoders[model_name]
+
+def embed_texts(texts, model_name):
+    """Vectors for `texts` (one row each), encoding only the texts not cached yet."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    hashes = [text_hash(t) for t in texts]
+    cached = QCMRepository.get_embeddings(model_name, set(hashes))
+
+    missing = {}
+    for h, t in zip(hashes, texts):
+        if h not in cached and h not in missing:
+            missing[h] = t
+    if missing:
+        vectors = get_encoder(model_name).encode(list(missing.values()))
+        new = {h: vectors[i].tobytes() for i, h in enumerate(missing)}
+        QCMRepository.save_embeddings(model_name, vectors.shape[1], new)
+        cached.update(new)
+
+    return np.vstack([np.frombuffer(cached[h], dtype=np.float32) for h in hashes])
+
+class BankIndex:
+    """All question vectors of one user, plus the metadata needed to report a match."""
+    def __init__(self, signature, rows, matrix):
+        self.signature = signature
+        self.question_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.qcm_ids = np.array([r[1] for r in rows], dtype=np.int64)
+        self.rows = rows
+        self.matrix = matrix
+
+    def search(self, vectors, threshold, exclude_qcm_id=None):
+        """
+        vectors: (k, dim) unit vectors. Returns, for each of them, up to
+        MAX_MATCHES (row, similarity) pairs above threshold, best first.
+        exclude_qcm_id: ignore the questions of this QCM (e.g. the one being checked).
+        """
+        if len(self.rows) == 0 or len(vectors) == 0:
+            return [[] for _ in range(len(vectors))]
+        similarities = vectors @ self.matrix.T
+        if exclude_qcm_id is not None:
+            similarities[:, self.qcm_ids == exclude_qcm_id] = -1.0
+
+        results = []
+        for row in similarities:
+            candidates = np.nonzero(row >= threshold)[0]
+            best = candidates[np.argsort(row[candidates])[::-1][:MAX_MATCHES]]
+            results.append([(self.rows[j], float(row[j])) for j in best])
+        return results
+
+    def updated(self, signature, changed_rows, model_name):
+        """
+        Index with added/edited rows merged in (only their texts are embedded).
+        Returns None when rows were deleted too: the caller rebuilds from scratch.
+        """
+        known = {question_id: i for i, question_id in enumerate(self.question_ids.tolist())}
+        added = [r for r in changed_rows if r[0] not in known]
+        if len(self.rows) + len(added) != signature[0]:
+            return None
+
+        rows = list(self.rows)
+        for r in changed_rows:
+            if r[0] in known:
+                rows[known[r[0]]] = r
+        rows.extend(added)
+
+        vectors = embed_texts([r[3] for r in changed_rows], model_name)
+        matrix = self.matrix.copy() if len(self.matrix) else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        edited = [(known[r[0]], vectors[i]) for i, r in enumerate(changed_rows) if r[0] in known]
+        for position, vector in edited:
+            matrix[position] = vector
+        appended = [vectors[i] for i, r in enumerate(changed_rows) if r[0] not in known]
+        if appended:
+            matrix = np.vstack([matrix, np.array(appended)])
+        return BankIndex(signature, rows, matrix)
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+def get_bank_index(user_id, model_name):
+    """
+    Cached per (user, model) and checked against the bank signature on every
+    call: additions and edits, including from other processes, are merged
+    into the cached matrix; deletions trigger a full rebuild.
+    """
+    signature = QCMRepository.get_bank_signature(user_id)
+    with _banks_lock:
+        index = _banks.get((user_id, model_name))
+    if index and index.signature == signature:
+        return index
+
+    new_index = None
+    if index and index.rows:
+        _, max_id, last_update = index.signature
+        changed = QCMRepository.get_bank(user_id, after_id=max_id, updated_after=last_update)
+        new_index = index.updated(signature, changed, model_name) if changed else None
+    if new_index is None:
+        rows = QCMRepository.get_bank(user_id)
+        matrix = embed_texts([r[3] for r in rows], model_name) if rows else np.zeros((0, 0), dtype=np.float32)
+        new_index = BankIndex(signature, rows, matrix)
+
+    with _banks_lock:
+        _banks[(user_id, model_name)] = new_index
+    return new_index
+
+def invalidate_bank(user_id):
+    with _banks_lock:
+        for key in [k for k in _banks if k[0] == user_id]:
+            del _banks[key]
+
+def filter_new_questions(questions, user_id, model_name, threshold):
+    """
+    Drops generated questions that paraphrase one already in the user's bank
+    or an earlier question of the same batch. Returns: (kept, dropped_count)
+    """
+    if not questions:
+        return questions, 0
+    vectors = embed_texts([q['text'] for q in questions], model_name)
+    bank_matches = get_bank_index(user_id, model_name).search(vectors, threshold)
+
+    kept_rows = []
+    for i, matches in enumerate(bank_matches):
+        if matches:
+            continue
+        if kept_rows and float(np.max(vectors[kept_rows] @ vectors[i])) >= threshold:
+            continue
+        kept_rows.append(i)
+    return [questions[i] for i in kept_rows], len(questions) - len(kept_rows)
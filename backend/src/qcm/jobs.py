@@ -0,0 +1,123 @@
+"""
+Background QCM generation.
+
+POST /qcm/generate only records a GenerationJob and returns 202; the model
+call (often 20-60 s) runs here, in a process-wide thread pool sized by
+GENERATION_WORKERS, so API workers stay free for other requests.
+
+Jobs only live in that pool, so a restart loses the ones queued or running.
+Each process refreshes the heartbeat of the jobs it holds; a queued/running
+job whose heartbeat is older than GENERATION_JOB_LEASE_SECONDS belongs to no
+process any more and is marked FAILED (fail_lost_jobs) instead of staying
+"queued" forever.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from src.extensions import db
+from .models import JobStatus
+from .resilience import ProviderUnavailable
+from .repository import QCMRepository
+
+_executor = None
+_executor_lock = threading.Lock()
+# Ids of the jobs queued or running in this process
+_held = set()
+_heartbeat = None
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('GENERATION_WORKERS', 4),
+                thread_name_prefix='qcm-generate'
+            )
+    return _executor
+
+def enqueue_generation(job_id):
+    """Schedules a generation job. Must be called inside an app context."""
+    app = current_app._get_current_object()
+    with _executor_lock:
+        _held.add(job_id)
+    _ensure_heartbeat(app)
+    return _get_executor(app).submit(_run_job, app, job_id)
+
+def fail_lost_jobs(user_id=None, job_id=None):
+    """Marks FAILED the queued/running jobs no process holds any more. Must be called inside an app context."""
+    lease = current_app.config.get('GENERATION_JOB_LEASE_SECONDS', 120)
+    return QCMRepository.fail_lost_jobs(datetime.utcnow() - timedelta(seconds=lease), user_id=user_id, job_id=job_id)
+
+def _ensure_heartbeat(app):
+    """Starts the heartbeat thread on first use, i.e. in each worker process after any fork."""
+    global _heartbeat
+    with _executor_lock:
+        if _heartbeat is not None and _heartbeat.is_alive():
+            return
+        _heartbeat = threading.Thread(target=_run_heartbeat, args=(app,), name='qcm-heartbeat', daemon=True)
+        _heartbeat.start()
+
+def _run_heartbeat(app):
+    interval = app.config.get('GENERATION_JOB_HEARTBEAT_SECONDS', 30)
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                with _executor_lock:
+                    held = list(_held)
+                QCMRepository.touch_jobs(held)
+                fail_lost_jobs()
+            except Exception:
+                app.logger.exception("Generation job heartbeat failed")
+            finally:
+                db.session.remove()
+
+def _run_job(app, job_id):
+    with app.app_context():
+        try:
+            run_generation_job(job_id)
+        except Exception as e:
+            app.logger.exception(f"Generation job {job_id} crashed")
+            db.session.rollback()
+            job = QCMRepository.get_job(job_id)
+            if job and not job.is_finished:
+                QCMRepository.update_job(job, JobStatus.FAILED, error=f"Internal error: {e}")
+        finally:
+            db.session.remove()
+            with _executor_lock:
+                _held.discard(job_id)
+
+def run_generation_job(job_id):
+    # Imported here: the service module imports this one to enqueue jobs
+    from .service import QCMService
+
+    job = QCMRepository.get_job(job_id)
+    if not job or job.status != JobStatus.QUEUED:
+        return job
+
+    QCMRepository.update_job(job, JobStatus.RUNNING)
+    params = job.params or {}
+
+    try:
+        qcm, error = QCMService.generate_exam(
+            job.user_id,
+            job.document_id,
+            params.get('num_questions', 5),
+            params.get('level', 'medium'),
+            params.get('topic'),
+            pages=params.get('pages'),
+            chapter=params.get('chapter'),
+            job=job,
+            fresh=params.get('fresh', False),
+            skip_duplicates=params.get('skip_duplicates')
+        )
+    except ProviderUnavailable as e:
+        return QCMRepository.update_job(job, JobStatus.UNAVAILABLE, error=str(e))
+
+    if error:
+        return QCMRepository.update_job(job, JobStatus.FAILED, error=error)
+    # Shards that gave up and dropped duplicates leave the QCM short: say so in the final status
+    missing = max(0, params.get('num_questions', 5) - len(qcm.questions))
+    return QCMRepository.update_job(job, JobStatus.SUCCEEDED, qcm_id=qcm.id, missing_questions=missing)
@@ -1,8 +1,14 @@
+import enum
+import uuid
 from src.extensions import db
 from datetime import datetime
 
 class QCM(db.Model):
     __tablename__ = 'qcms'
+    __table_args__ = (
+        # Keyset pagination of a user's list (newest first)
+        db.Index('ix_qcms_user_created', 'user_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -27,6 +33,18 @@ class QCM(db.Model):
             "questions": [q.to_dict() for q in self.questions] 
         }
 
+    @staticmethod
+    def summary_dict(row):
+        """List view of a QCM: a (QCM columns + question_count) row, no question payloads"""
+        return {
+            "id": row.id,
+            "title": row.title,
+            "level": row.level,
+            "document_id": row.document_id,
+            "created_at": row.created_at.isoformat(),
+            "question_count": row.question_count
+        }
+
 class Question(db.Model):
     __tablename__ = 'questions'
 
@@ -36,8 +54,25 @@ class Question(db.Model):
     # Store choices as JSON: [{"text": "A", "is_correct": false}, ...]
     choices = db.Column(db.JSON, nullable=False) 
     
-    qcm_id = db.Column(db.Integer, db.ForeignKey('qcms.id'), nullable=False)
+    qcm_id = db.Column(db.Integer, db.ForeignKey('qcms.id'), nullable=False, index=True)
     duration = db.Column(db.Integer, default=30) # Duration in seconds
+    # Lets cached per-user indexes (duplicate detection) notice edits made in other processes
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def validate_data(q_data):
+        """Checks one question payload ({"text", "choices": [{"text", "is_correct"}]}). Returns an error or None."""
+        if not isinstance(q_data, dict) or not isinstance(q_data.get('text'), str) or not q_data['text'].strip():
+            return "question text is missing"
+        choices = q_data.get('choices')
+        if not isinstance(choices, list) or len(choices) < 2:
+            return "at least two choices are required"
+        for choice in choices:
+            if not isinstance(choice, dict) or not isinstance(choice.get('text'), str):
+                return "every choice needs a text"
+        if not any(choice.get('is_correct') is True for choice in choices):
+            return "no choice is marked correct"
+        return None
 
     def get_correct_choice_index(self):
         """Helper to find which index (0, 1, 2, 3) is the correct one"""
@@ -53,4 +88,113 @@ class Question(db.Model):
             "id": self.id,
             "text": self.text,
             "choices": self.choices
-        }
\ No newline at end of file
+        }
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    UNAVAILABLE = "unavailable"  # AI provider down or over quota; worth retrying later
+
+class GenerationJob(db.Model):
+    """
+    One asynchronous QCM generation request. The HTTP request only creates
+    the job; a background worker calls the AI and fills qcm_id when done.
+    """
+    __tablename__ = 'generation_jobs'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False)
+    # Request payload: num_questions, level, topic, pages, chapter
+    params = db.Column(db.JSON, nullable=False)
+
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    qcm_id = db.Column(db.Integer, db.ForeignKey('qcms.id', ondelete='SET NULL'), nullable=True)
+    # Requested questions the QCM lacks (shards that gave up, duplicates dropped)
+    missing_questions = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Refreshed by the process holding the job; a stale one means the job was lost (restart, crash)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.UNAVAILABLE)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "error": self.error,
+            "qcm_id": self.qcm_id,
+            "missing_questions": self.missing_questions or 0,
+            "document_id": self.document_id,
+            "params": self.params,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class QuestionEmbedding(db.Model):
+    """
+    Sentence embedding of a question text, cached by the hash of the
+    normalized text so identical questions are only encoded once.
+    """
+    __tablename__ = 'question_embeddings'
+
+    text_hash = db.Column(db.String(64), primary_key=True)
+    model = db.Column(db.String(200), primary_key=True)
+    dim = db.Column(db.Integer, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)   # float32, L2-normalized
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class PracticeQuestion(db.Model):
+    """
+    Pre-generated student-mode question for a document. Practice QCMs are
+    assembled from this pool, so most student requests never reach the AI.
+    """
+    __tablename__ = 'practice_questions'
+    __table_args__ = (
+        db.Index('ix_practice_questions_document_level', 'document_id', 'level'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+    level = db.Column(db.String(50), nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    choices = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PracticeServed(db.Model):
+    """Which pool questions a student has already been given (never served twice)."""
+    __tablename__ = 'practice_served'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    practice_question_id = db.Column(
+        db.Integer, db.ForeignKey('practice_questions.id', ondelete='CASCADE'), primary_key=True
+    )
+    served_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class QCMVersion(db.Model):
+    """
+    Immutable snapshot of a QCM (title, level, questions with their answers)
+    taken when an exam session is created. Sessions are joined and graded
+    from the snapshot, so the live QCM stays editable.
+    """
+    __tablename__ = 'qcm_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    qcm_id = db.Column(db.Integer, db.ForeignKey('qcms.id', ondelete='CASCADE'), nullable=False, index=True)
+    # sha256 of the canonical JSON; also the ETag of the exam payload
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    # zlib-compressed canonical JSON (see src/qcm/versions.py)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,137 @@
+"""
+Picks the passages of a document that are sent to the model.
+
+Instead of cutting the text after N characters (which only ever covers the
+first chapters), every chunk is scored with BM25 against the document's most
+salient terms (or an explicit topic), then a small, diverse subset is chosen
+with Maximal Marginal Relevance until the token budget is filled.
+Everything is plain NumPy: a few milliseconds for a 300-page course.
+"""
+import re
+import numpy as np
+
+# BM25 parameters (standard values)
+K1 = 1.5
+B = 0.75
+
+MAX_VOCABULARY = 5000      # Most frequent terms kept for scoring (bounds memory)
+SALIENT_TERMS = 40         # Terms used as the implicit query when no topic is given
+DIVERSITY = 0.35           # 0 = pure relevance, 1 = pure novelty
+
+_TOKEN_RE = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+STOPWORDS = frozenset("""
+les des une est pour que qui dans par sur avec son ses aux ont pas plus peut sont
+cette ces tout tous mais comme elle ils nous vous leur leurs entre sans sous donc
+fait faire être avoir alors aussi bien car dont elles même chaque autre autres
+lors ainsi très the and for are with that this from which when where have has
+not can will into its their also been were was page chapitre chapter
+""".split())
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def _term_matrix(chunk_texts):
+    """Dense (n_chunks x vocabulary) term-frequency matrix over the most common terms."""
+    tokenized = [tokenize(t) for t in chunk_texts]
+
+    doc_freq = {}
+    for tokens in tokenized:
+        for term in set(tokens):
+            doc_freq[term] = doc_freq.get(term, 0) + 1
+
+    vocabulary = sorted(doc_freq, key=doc_freq.get, reverse=True)[:MAX_VOCABULARY]
+    index = {term: i for i, term in enumerate(vocabulary)}
+
+    tf = np.zeros((len(tokenized), len(vocabulary)), dtype=np.float32)
+    for row, tokens in enumerate(tokenized):
+        for term in tokens:
+            col = index.get(term)
+            if col is not None:
+                tf[row, col] += 1
+    lengths = np.array([len(tokens) for tokens in tokenized], dtype=np.float32)
+    return tf, lengths, index
+
+def bm25_scores(tf, lengths, query_weights):
+    """BM25 score of every chunk for a weighted query vector (same columns as tf)."""
+    n_chunks = tf.shape[0]
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+    avg_len = lengths.mean() if n_chunks and lengths.mean() > 0 else 1.0
+    norm = K1 * (1 - B + B * lengths / avg_len)
+    saturated = tf * (K1 + 1) / (tf + norm[:, None])
+    return saturated @ (idf * query_weights), idf
+
+def select_passages(chunk_texts, token_counts, token_budget, topic=None, randomize=False, rng=None):
+    """
+    chunk_texts: passages in document order; token_counts: their token estimates.
+    topic: optional free text steering relevance (e.g. "héritage, polymorphisme").
+    randomize: adds noise to relevance so repeated calls cover different passages.
+    Returns: indices of the selected chunks, in document order.
+    """
+    n_chunks = len(chunk_texts)
+    if n_chunks == 0:
+        return []
+
+    token_counts = np.asarray(token_counts, dtype=np.float32)
+    if token_counts.sum() <= token_budget:
+        return list(range(n_chunks))
+
+    tf, lengths, index = _term_matrix(chunk_texts)
+    if tf.shape[1] == 0:
+        return _fill_in_order(token_counts, token_budget)
+
+    # 1. Query: explicit topic, otherwise the document's salient terms (frequent but not everywhere)
+    query_weights = np.zeros(tf.shape[1], dtype=np.float32)
+    topic_terms = [index[t] for t in tokenize(topic or "") if t in index]
+    if topic_terms:
+        query_weights[topic_terms] = 1.0
+    else:
+        df = np.count_nonzero(tf, axis=0)
+        salience = np.log1p(tf.sum(axis=0)) * np.log(1 + n_chunks / df)
+        query_weights[np.argsort(salience)[-SALIENT_TERMS:]] = 1.0
+
+    relevance, idf = bm25_scores(tf, lengths, query_weights)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+    if randomize:
+        rng = rng or np.random.default_rng()
+        relevance = relevance * rng.uniform(0.5, 1.5, size=n_chunks)
+
+    # 2. TF-IDF unit vectors for the redundancy term
+    vectors = np.log1p(tf) * idf
+    norms = np.linalg.norm(vectors, axis=1)
+    vectors /= np.where(norms > 0, norms, 1.0)[:, None]
+
+    # 3. Maximal Marginal Relevance under the token budget
+    selected = []
+    used_tokens = 0.0
+    max_similarity = np.zeros(n_chunks, dtype=np.float32)
+    available = np.ones(n_chunks, dtype=bool)
+
+    while available.any():
+        mmr = (1 - DIVERSITY) * relevance - DIVERSITY * max_similarity
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        available[best] = False
+
+        if used_tokens + token_counts[best] > token_budget:
+            continue
+        selected.append(best)
+        used_tokens += token_counts[best]
+        max_similarity = np.maximum(max_similarity, vectors @ vectors[best])
+
+        # Stop once nothing else can fit
+        available &= token_counts <= (token_budget - used_tokens)
+
+    return sorted(selected)
+
+def _fill_in_order(token_counts, token_budget):
+    selected = []
+    used = 0.0
+    for i, tokens in enumerate(token_counts):
+        if used + tokens > token_budget:
+            break
+        selected.append(i)
+        used += tokens
+    return selected
@@ -0,0 +1,95 @@
+"""
+On-disk cache of rendered QCM PDFs.
+
+Files live at PDF_CACHE_DIR/<qcm_id>/<content hash>.pdf, where the hash is
+the QCM's version hash (src/qcm/versions.py): any edit produces a new name,
+and update_question also removes the QCM's old files. QCMs with at least
+PDF_BACKGROUND_THRESHOLD questions are rendered by a small worker pool so
+the request returns at once (202) instead of holding a worker.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from src.extensions import db
+from rendering.pdf import PDFGenerator
+from .repository import QCMRepository
+from .versions import content_hash as compute_content_hash
+
+_executor = None
+_executor_lock = threading.Lock()
+_rendering = set()
+_rendering_lock = threading.Lock()
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('PDF_RENDER_WORKERS', 2),
+                thread_name_prefix='pdf-render'
+            )
+    return _executor
+
+def cache_dir():
+    return current_app.config.get('PDF_CACHE_DIR') or os.path.join(os.getcwd(), 'pdf_cache')
+
+def pdf_path(qcm_id, content_hash):
+    return os.path.join(cache_dir(), str(qcm_id), f"{content_hash}.pdf")
+
+def render_to_cache(qcm, content_hash):
+    """Renders into a temporary file next to the target, then renames it (readers never see half a file)."""
+    path = pdf_path(qcm.id, content_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            PDFGenerator.render(qcm, tmp)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def get_pdf(qcm):
+    """
+    Returns: (path, content_hash) when the file is ready, or (None, content_hash)
+    when it is being rendered in the background.
+    """
+    content_hash = compute_content_hash(qcm)
+    path = pdf_path(qcm.id, content_hash)
+    if os.path.exists(path):
+        return path, content_hash
+
+    if len(qcm.questions) < current_app.config.get('PDF_BACKGROUND_THRESHOLD', 80):
+        return render_to_cache(qcm, content_hash), content_hash
+
+    key = (qcm.id, content_hash)
+    with _rendering_lock:
+        if key not in _rendering:
+            _rendering.add(key)
+            app = current_app._get_current_object()
+            _get_executor(app).submit(_run_render, app, key)
+    return None, content_hash
+
+def _run_render(app, key):
+    qcm_id, content_hash = key
+    with app.app_context():
+        try:
+            qcm = QCMRepository.get_by_id(qcm_id)
+            # Edited since the request: the next download schedules the new version
+            if qcm and compute_content_hash(qcm) == content_hash:
+                render_to_cache(qcm, content_hash)
+        except Exception:
+            app.logger.exception(f"PDF rendering failed for QCM {qcm_id}")
+        finally:
+            with _rendering_lock:
+                _rendering.discard(key)
+            db.session.remove()
+
+def invalidate(qcm_id):
+    """Drops every cached PDF of this QCM."""
+    shutil.rmtree(os.path.join(cache_dir(), str(qcm_id)), ignore_errors=True)
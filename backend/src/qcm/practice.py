@@ -0,0 +1,143 @@
+"""
+Per-document pool of practice (student-mode) questions.
+
+Before exams hundreds of students generate practice QCMs from the same few
+documents; calling the AI for each of them is slow and costs money. The
+first student request for a document and level starts filling its pool
+(PRACTICE_POOL_SIZE questions) in the background, so documents no student
+practices on cost nothing. Later requests sample questions that student has
+never been served, and the AI is only called again (to grow the pool, up to
+PRACTICE_POOL_MAX per level) when the pool runs low for someone.
+
+Fills run in their own small thread pool (PRACTICE_POOL_WORKERS), never on
+the generation workers that interactive jobs wait for. Documents uploaded
+with the same content share the pool of the first one that has questions.
+"""
+import copy
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from src.extensions import db
+from src.documents.repository import DocumentRepository
+from .ai_generation import AIGenerator
+from .repository import QCMRepository
+from .resilience import ProviderUnavailable
+from .sharding import split_count, generate_sharded, remove_near_duplicates
+
+_executor = None
+_executor_lock = threading.Lock()
+# (document id, level) of the fills queued or running in this process
+_filling = set()
+
+def get_pool_executor(app):
+    """Lazily creates the pool-fill threads, sized by PRACTICE_POOL_WORKERS."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('PRACTICE_POOL_WORKERS', 1),
+                thread_name_prefix='practice-pool'
+            )
+    return _executor
+
+def pool_levels():
+    return [level for level in current_app.config.get('PRACTICE_POOL_LEVELS', ()) if level]
+
+def enqueue_pool_fill(doc_id, level):
+    """Schedules a pool top-up unless one is already queued. Must be called inside an app context."""
+    if not current_app.config.get('PRACTICE_POOL_SIZE'):
+        return None
+    key = (doc_id, level)
+    with _executor_lock:
+        if key in _filling:
+            return None
+        _filling.add(key)
+    app = current_app._get_current_object()
+    return get_pool_executor(app).submit(_run_fill, app, doc_id, level)
+
+def _run_fill(app, doc_id, level):
+    with app.app_context():
+        try:
+            fill_pool(doc_id, level)
+        except Exception:
+            app.logger.exception(f"Practice pool fill crashed for document {doc_id}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
+            with _executor_lock:
+                _filling.discard((doc_id, level))
+
+def fill_pool(doc_id, level):
+    """
+    Adds up to PRACTICE_POOL_SIZE questions to the pool of this document and
+    level, without exceeding PRACTICE_POOL_MAX. Returns the number added.
+    """
+    config = current_app.config
+    document = DocumentRepository.get_by_id(doc_id)
+    if not document or not document.is_ready or not document.word_count:
+        return 0
+
+    size = QCMRepository.count_pool(doc_id, level)
+    wanted = min(config.get('PRACTICE_POOL_SIZE', 30), config.get('PRACTICE_POOL_MAX', 300) - size)
+    if wanted <= 0:
+        return 0
+
+    # Imported here to avoid a cycle (the service module imports this one)
+    from .service import QCMService
+    quotas = split_count(wanted, config.get('GENERATION_SHARD_SIZE', 10))
+    try:
+        questions, error = generate_sharded(
+            AIGenerator.generate,
+            QCMService.build_shard_texts(document, "student", len(quotas)),
+            quotas,
+            level,
+            "student",
+            max_workers=config.get('GENERATION_SHARD_CONCURRENCY', 3),
+            max_retries=config.get('GENERATION_SHARD_RETRIES', 2)
+        )
+    except ProviderUnavailable as e:
+        error = str(e)
+    if error:
+        current_app.logger.warning(f"Practice pool fill failed for document {doc_id} ({level}): {error}")
+        return 0
+
+    # Skip questions that repeat ones already in the pool
+    existing = [{"text": text} for text in QCMRepository.get_pool_texts(doc_id, level)]
+    new = remove_near_duplicates(existing + questions)[len(existing):]
+    added = QCMRepository.add_to_pool(doc_id, level, new)
+    current_app.logger.info(f"Practice pool for document {doc_id} ({level}): +{added} questions")
+    return added
+
+def serve_from_pool(user_id, document, num_questions, level):
+    """
+    Builds a practice QCM from questions this student has not seen yet.
+    Returns the QCM, or None when the pool cannot cover the request (the
+    caller then falls back to a generation job). Starts filling the pool on
+    the first request, and tops it up when it gets low for this student.
+    """
+    if level not in pool_levels():
+        return None
+
+    pool_id = QCMRepository.get_pool_document_id(document, level)
+    picked = QCMRepository.sample_unseen(pool_id, level, user_id, num_questions)
+    qcm = None
+    if len(picked) >= num_questions:
+        questions = []
+        for pq in picked:
+            choices = copy.deepcopy(pq.choices)
+            random.shuffle(choices)
+            questions.append({"text": pq.text, "choices": choices})
+
+        qcm = QCMRepository.create_practice_qcm({
+            "title": f"Practice: {document.module} ({level})",
+            "level": level,
+            "user_id": user_id,
+            "document_id": document.id
+        }, questions, [pq.id for pq in picked])
+
+    # Running low: the next request of this student would miss
+    remaining = QCMRepository.count_unseen(pool_id, level, user_id)
+    if remaining < max(num_questions, current_app.config.get('PRACTICE_POOL_LOW_WATER', 10)):
+        enqueue_pool_fill(pool_id, level)
+    return qcm
@@ -0,0 +1,145 @@
+"""
+LLM providers used by AIGenerator.
+
+A provider turns a prompt into the raw JSON text of a question list. One
+instance is built per process (see configure_provider) and reused by every
+request and worker thread, so clients and model handles are set up once
+instead of on every call, and wrapped in ResilientProvider (rate limits,
+retries, circuit breaker). LLM_PROVIDER selects the implementation:
+
+- gemini: Google Gemini (LLM_MODEL, GOOGLE_API_KEY)
+- fake:   offline, deterministic questions with FAKE_LLM_LATENCY_MS of delay
+          and FAKE_LLM_FAILURE_RATE of failed calls, for benchmarks and load tests
+"""
+import abc
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+class ProviderError(Exception):
+    """The model could not be reached or returned nothing usable."""
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+class LLMProvider(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, prompt, num_questions, temperature):
+        """Returns the model output as text (expected: a JSON array of questions)."""
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key, model_name):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, temperature):
+        with self._lock:
+            if self._genai is None:
+                if not self.api_key:
+                    raise ProviderError("Google API Key is missing in .env")
+                # Imported here so the fake provider works without the Google SDK
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+
+            model = self._models.get(temperature)
+            if model is None:
+                model = self._genai.GenerativeModel(
+                    model_name=self.model_name,
+                    generation_config={
+                        "response_mime_type": "application/json",
+                        "temperature": temperature,
+                    }
+                )
+                self._models[temperature] = model
+            return model
+
+    def generate(self, prompt, num_questions, temperature):
+        response = self._get_model(temperature).generate_content(prompt)
+        return response.text
+
+class FakeProvider(LLMProvider):
+    name = "fake"
+
+    def __init__(self, latency_ms=0, failure_rate=0.0, seed=None):
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, num_questions, temperature):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._rng.random() < self.failure_rate
+        if failed:
+            raise ProviderError("Simulated provider failure", retryable=True)
+
+        # Same prompt -> same questions, so runs can be compared
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        questions = []
+        for i in range(num_questions):
+            questions.append({
+                "text": f"Question {i + 1} ({digest}) : quelle affirmation est correcte ?",
+                "choices": [
+                    {"text": f"Affirmation {i + 1}.{c + 1}", "is_correct": c == 0}
+                    for c in range(4)
+                ]
+            })
+        return json.dumps(questions)
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def build_provider(config):
+    name = (config.get('LLM_PROVIDER') or 'gemini').lower()
+    if name == 'fake':
+        return FakeProvider(
+            latency_ms=config.get('FAKE_LLM_LATENCY_MS', 0),
+            failure_rate=config.get('FAKE_LLM_FAILURE_RATE', 0.0),
+            seed=config.get('FAKE_LLM_SEED')
+        )
+    if name == 'gemini':
+        return GeminiProvider(config.get('GOOGLE_API_KEY'), config.get('LLM_MODEL', 'gemini-flash-latest'))
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
+
+def build_resilient_provider(config):
+    """The configured provider behind rate limiting, retries and a circuit breaker."""
+    from .resilience import ResilientProvider
+    return ResilientProvider(
+        build_provider(config),
+        requests_per_minute=config.get('LLM_REQUESTS_PER_MINUTE', 60),
+        tokens_per_minute=config.get('LLM_TOKENS_PER_MINUTE', 1000000),
+        max_retries=config.get('LLM_MAX_RETRIES', 3),
+        backoff_base=config.get('LLM_BACKOFF_BASE_SECONDS', 1.0),
+        backoff_max=config.get('LLM_BACKOFF_MAX_SECONDS', 20.0),
+        max_wait=config.get('LLM_RATE_LIMIT_MAX_WAIT_SECONDS', 30.0),
+        breaker_threshold=config.get('LLM_BREAKER_THRESHOLD', 5),
+        breaker_reset_seconds=config.get('LLM_BREAKER_RESET_SECONDS', 60)
+    )
+
+def configure_provider(app):
+    """Builds the process-wide provider from the app config (called by create_app)."""
+    global _provider
+    with _provider_lock:
+        _provider = build_resilient_provider(app.config)
+    return _provider
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            # Outside create_app (scripts): same settings, read from the environment
+            from config import Config
+            _provider = build_resilient_provider({k: getattr(Config, k) for k in dir(Config) if k.isupper()})
+        return _provider
@@ -1,9 +1,44 @@
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from src.extensions import db
-from .models import QCM, Question
+from src.documents.models import Document
+from src.users.models import User
+from .models import (
+    QCM, Question, GenerationJob, JobStatus, QuestionEmbedding, PracticeQuestion, PracticeServed, QCMVersion
+)
 
 class QCMRepository:
+    @staticmethod
+    def validate_questions(questions_list):
+        """Raises ValueError on the first malformed question, before anything is written."""
+        for index, q_data in enumerate(questions_list):
+            error = Question.validate_data(q_data)
+            if error:
+                raise ValueError(f"Question {index + 1}: {error}")
+
+    @staticmethod
+    def _insert_questions(qcm_id, questions_list):
+        """
+        One multi-row INSERT ... RETURNING id for the whole batch instead of an
+        ORM object (and identity-map entry) per question. Returns the new ids,
+        in the order of questions_list.
+        """
+        if not questions_list:
+            return []
+        rows = [
+            {"text": q_data['text'], "choices": q_data['choices'], "qcm_id": qcm_id}
+            for q_data in questions_list
+        ]
+        result = db.session.execute(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+
     @staticmethod
     def create_qcm_with_questions(qcm_data, questions_list):
+        QCMRepository.validate_questions(questions_list)
         try:
             # 1. Create the Exam header
             new_qcm = QCM(
@@ -15,14 +50,8 @@ class QCMRepository:
             db.session.add(new_qcm)
             db.session.flush() # Flush to get the new_qcm.id before commit
 
-            # 2. Create each Question
-            for q_data in questions_list:
-                new_question = Question(
-                    text=q_data['text'],
-                    choices=q_data['choices'], # Saved as JSON automatically
-                    qcm_id=new_qcm.id
-                )
-                db.session.add(new_question)
+            # 2. Insert all questions in one statement
+            new_qcm.question_ids = QCMRepository._insert_questions(new_qcm.id, questions_list)
 
             db.session.commit()
             return new_qcm
@@ -30,6 +59,48 @@ class QCMRepository:
             db.session.rollback()
             raise e
 
+    @staticmethod
+    def create_job_qcm(qcm_data, job):
+        """
+        Empty QCM header, committed and linked to the job so a progress stream
+        knows its id while the questions are added (add_questions).
+        """
+        new_qcm = QCM(
+            title=qcm_data['title'],
+            level=qcm_data['level'],
+            user_id=qcm_data['user_id'],
+            document_id=qcm_data['document_id']
+        )
+        try:
+            db.session.add(new_qcm)
+            db.session.flush()
+            job.qcm_id = new_qcm.id
+            db.session.commit()
+            return new_qcm
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    @staticmethod
+    def add_questions(qcm_id, questions_list):
+        """Validates and appends one batch of questions to a QCM. Returns the new ids."""
+        QCMRepository.validate_questions(questions_list)
+        try:
+            question_ids = QCMRepository._insert_questions(qcm_id, questions_list)
+            db.session.commit()
+            return question_ids
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    @staticmethod
+    def discard_job_qcm(qcm, job):
+        """Removes the QCM of a job that failed, with whatever questions it already had."""
+        db.session.rollback()
+        job.qcm_id = None
+        db.session.delete(qcm)
+        db.session.commit()
+
     @staticmethod
     def get_by_id(qcm_id):
         return QCM.query.get(qcm_id)
@@ -38,6 +109,34 @@ class QCMRepository:
     def get_by_user(user_id):
         return QCM.query.filter_by(user_id=user_id).order_by(QCM.created_at.desc()).all()
     
+    @staticmethod
+    def get_summaries_by_user(user_id, limit, after=None):
+        """
+        One page of the user's QCMs, newest first, with question counts from a
+        grouped subquery instead of loading every question.
+        after: (created_at, id) of the last row of the previous page (keyset pagination).
+        Returns: up to `limit` rows (id, title, level, document_id, created_at, question_count)
+        """
+        counts = db.session.query(
+            Question.qcm_id, db.func.count(Question.id).label('question_count')
+        ).join(QCM, Question.qcm_id == QCM.id).filter(
+            QCM.user_id == user_id
+        ).group_by(Question.qcm_id).subquery()
+
+        query = db.session.query(
+            QCM.id, QCM.title, QCM.level, QCM.document_id, QCM.created_at,
+            db.func.coalesce(counts.c.question_count, 0).label('question_count')
+        ).outerjoin(counts, counts.c.qcm_id == QCM.id).filter(QCM.user_id == user_id)
+
+        if after:
+            created_at, last_id = after
+            query = query.filter(db.or_(
+                QCM.created_at < created_at,
+                db.and_(QCM.created_at == created_at, QCM.id < last_id)
+            ))
+
+        return query.order_by(QCM.created_at.desc(), QCM.id.desc()).limit(limit).all()
+
     @staticmethod
     def delete_qcm(qcm):
         """Deletes QCM and all associated questions (via cascade)"""
@@ -59,4 +158,280 @@ class QCMRepository:
     # --- NEW: Get Question by ID ---
     @staticmethod
     def get_question_by_id(question_id):
-        return Question.query.get(question_id)
\ No newline at end of file
+        return Question.query.get(question_id)
+
+    # --- Generation jobs ---
+    @staticmethod
+    def create_job(user_id, document_id, params):
+        job = GenerationJob(user_id=user_id, document_id=document_id, params=params)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def create_job_within_limit(user_id, document_id, params, max_active):
+        """
+        Creates the job unless the user already has max_active jobs queued or running.
+        The count and the insert run under a lock on the user's row, so concurrent
+        requests of one user are serialized and cannot all pass the check.
+        Returns: the job, or None when over the limit
+        """
+        try:
+            db.session.query(User.id).filter_by(id=user_id).with_for_update().first()
+            if QCMRepository.count_active_jobs(user_id) >= max_active:
+                db.session.rollback()
+                return None
+            job = GenerationJob(user_id=user_id, document_id=document_id, params=params)
+            db.session.add(job)
+            db.session.commit()
+            return job
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def count_active_jobs(user_id):
+        """Jobs of this user still queued or running"""
+        return GenerationJob.query.filter(
+            GenerationJob.user_id == user_id,
+            GenerationJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+        ).count()
+
+    @staticmethod
+    def touch_jobs(job_ids):
+        """Heartbeat of the jobs this process holds."""
+        if not job_ids:
+            return
+        GenerationJob.query.filter(GenerationJob.id.in_(job_ids)).update(
+            {GenerationJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+
+    @staticmethod
+    def fail_lost_jobs(stale_before, user_id=None, job_id=None):
+        """
+        Marks FAILED the queued/running jobs whose heartbeat is older than `stale_before`:
+        no process holds them any more. Returns: number of jobs marked
+        """
+        query = GenerationJob.query.filter(
+            GenerationJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+            db.or_(
+                GenerationJob.heartbeat_at < stale_before,
+                db.and_(GenerationJob.heartbeat_at.is_(None), GenerationJob.created_at < stale_before)
+            )
+        )
+        if user_id is not None:
+            query = query.filter(GenerationJob.user_id == user_id)
+        if job_id is not None:
+            query = query.filter(GenerationJob.id == job_id)
+        count = query.update({
+            GenerationJob.status: JobStatus.FAILED,
+            GenerationJob.error: "Generation was interrupted by a server restart. Please start it again.",
+            GenerationJob.finished_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def get_job(job_id):
+        return GenerationJob.query.get(job_id)
+
+    @staticmethod
+    def update_job(job, status, qcm_id=None, error=None, missing_questions=None):
+        job.status = status
+        if status == JobStatus.RUNNING:
+            job.started_at = datetime.utcnow()
+        else:
+            job.finished_at = datetime.utcnow()
+        if qcm_id is not None:
+            job.qcm_id = qcm_id
+        if missing_questions is not None:
+            job.missing_questions = missing_questions
+        job.error = error
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def get_questions_after(qcm_id, last_question_id=0):
+        """Questions persisted since the last one already sent (used by the SSE stream)"""
+        return Question.query.filter(
+            Question.qcm_id == qcm_id,
+            Question.id > last_question_id
+        ).order_by(Question.id).all()
+
+
+    # --- Question embeddings ---
+    @staticmethod
+    def get_bank(user_id, after_id=None, updated_after=None):
+        """
+        (question_id, qcm_id, qcm_title, text) of every question in this user's QCMs,
+        or only those added after `after_id` or edited after `updated_after`.
+        """
+        query = db.session.query(Question.id, QCM.id, QCM.title, Question.text).join(
+            QCM, Question.qcm_id == QCM.id
+        ).filter(QCM.user_id == user_id)
+        if after_id is not None:
+            changed = Question.id > after_id
+            if updated_after is not None:
+                changed = db.or_(changed, Question.updated_at > updated_after)
+            query = query.filter(changed)
+        return query.order_by(Question.id).all()
+
+    @staticmethod
+    def get_bank_signature(user_id):
+        """Cheap (count, max id, last edit) fingerprint used to tell whether a cached index is stale"""
+        return tuple(db.session.query(
+            db.func.count(Question.id), db.func.max(Question.id), db.func.max(Question.updated_at)
+        ).join(
+            QCM, Question.qcm_id == QCM.id
+        ).filter(QCM.user_id == user_id).one())
+
+    @staticmethod
+    def get_embeddings(model, text_hashes, batch_size=1000):
+        """Returns: {text_hash: vector bytes} for the hashes already encoded"""
+        found = {}
+        text_hashes = list(text_hashes)
+        for i in range(0, len(text_hashes), batch_size):
+            rows = db.session.query(QuestionEmbedding.text_hash, QuestionEmbedding.vector).filter(
+                QuestionEmbedding.model == model,
+                QuestionEmbedding.text_hash.in_(text_hashes[i:i + batch_size])
+            ).all()
+            found.update(rows)
+        return found
+
+    @staticmethod
+    def save_embeddings(model, dim, vectors_by_hash):
+        if not vectors_by_hash:
+            return
+        rows = [
+            {"text_hash": text_hash, "model": model, "dim": dim, "vector": vector}
+            for text_hash, vector in vectors_by_hash.items()
+        ]
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(QuestionEmbedding), rows)
+        except IntegrityError:
+            # Another worker encoded some of the same texts: keep theirs, add the rest
+            for row in rows:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(QuestionEmbedding), [row])
+                except IntegrityError:
+                    pass
+        db.session.commit()
+
+
+    # --- Practice pool ---
+    @staticmethod
+    def get_pool_document_id(document, level):
+        """
+        Document whose pool serves this one: the first document with the same
+        content that already has questions at this level, else the document itself.
+        """
+        if not document.content_hash:
+            return document.id
+        row = db.session.query(PracticeQuestion.document_id).join(
+            Document, Document.id == PracticeQuestion.document_id
+        ).filter(
+            Document.content_hash == document.content_hash,
+            PracticeQuestion.level == level
+        ).order_by(PracticeQuestion.document_id).first()
+        return row[0] if row else document.id
+
+    @staticmethod
+    def count_pool(document_id, level):
+        return PracticeQuestion.query.filter_by(document_id=document_id, level=level).count()
+
+    @staticmethod
+    def count_unseen(document_id, level, user_id):
+        return PracticeQuestion.query.filter(
+            PracticeQuestion.document_id == document_id,
+            PracticeQuestion.level == level,
+            ~PracticeQuestion.id.in_(QCMRepository._served_ids(user_id))
+        ).count()
+
+    @staticmethod
+    def _served_ids(user_id):
+        return db.select(PracticeServed.practice_question_id).where(PracticeServed.user_id == user_id)
+
+    @staticmethod
+    def get_pool_texts(document_id, level):
+        return [row[0] for row in db.session.query(PracticeQuestion.text).filter_by(
+            document_id=document_id, level=level
+        )]
+
+    @staticmethod
+    def add_to_pool(document_id, level, questions_list):
+        QCMRepository.validate_questions(questions_list)
+        if not questions_list:
+            return 0
+        db.session.execute(insert(PracticeQuestion), [
+            {"document_id": document_id, "level": level, "text": q['text'], "choices": q['choices']}
+            for q in questions_list
+        ])
+        db.session.commit()
+        return len(questions_list)
+
+    @staticmethod
+    def sample_unseen(document_id, level, user_id, count):
+        """Random pool questions this student has never been served"""
+        return PracticeQuestion.query.filter(
+            PracticeQuestion.document_id == document_id,
+            PracticeQuestion.level == level,
+            ~PracticeQuestion.id.in_(QCMRepository._served_ids(user_id))
+        ).order_by(db.func.random()).limit(count).all()
+
+    @staticmethod
+    def mark_served(user_id, practice_question_ids):
+        """Must run in the same transaction as the QCM built from these questions"""
+        db.session.execute(insert(PracticeServed), [
+            {"user_id": user_id, "practice_question_id": pid} for pid in practice_question_ids
+        ])
+
+    @staticmethod
+    def create_practice_qcm(qcm_data, questions_list, practice_question_ids):
+        """
+        Saves a QCM assembled from the pool and marks its questions as served,
+        in one transaction. Returns None if a concurrent request served some
+        of them first.
+        """
+        try:
+            new_qcm = QCM(
+                title=qcm_data['title'],
+                level=qcm_data['level'],
+                user_id=qcm_data['user_id'],
+                document_id=qcm_data['document_id']
+            )
+            db.session.add(new_qcm)
+            db.session.flush()
+            new_qcm.question_ids = QCMRepository._insert_questions(new_qcm.id, questions_list)
+            QCMRepository.mark_served(qcm_data['user_id'], practice_question_ids)
+            db.session.commit()
+            return new_qcm
+        except IntegrityError:
+            db.session.rollback()
+            return None
+
+    # --- Versions ---
+    @staticmethod
+    def get_version(version_id):
+        return QCMVersion.query.get(version_id)
+
+    @staticmethod
+    def get_version_by_hash(content_hash):
+        return QCMVersion.query.filter_by(content_hash=content_hash).first()
+
+    @staticmethod
+    def get_or_create_version(qcm_id, content_hash, payload):
+        """Identical content maps to the same row; nothing is committed here."""
+        version = QCMRepository.get_version_by_hash(content_hash)
+        if version:
+            return version
+        try:
+            with db.session.begin_nested():
+                version = QCMVersion(qcm_id=qcm_id, content_hash=content_hash, payload=payload)
+                db.session.add(version)
+            return version
+        except IntegrityError:
+            # Same snapshot created concurrently
+            return QCMRepository.get_version_by_hash(content_hash)
@@ -0,0 +1,175 @@
+"""
+Protects the LLM provider (and us) when the model is slow or throttling.
+
+Every call goes through ResilientProvider, which:
+1. fails fast while the circuit breaker is open (too many consecutive failures),
+2. waits for room in two process-wide token buckets: requests per minute and
+   tokens per minute (LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE),
+3. retries retryable errors (429, 5xx, timeouts) with exponential backoff and
+   full jitter, so concurrent workers do not retry in lockstep.
+When the retries run out, ProviderUnavailable is raised: callers must not
+retry it again (sharding does not), the breaker already accounts for it.
+Errors the provider rejects outright (400, 401...) say nothing about its
+health and leave the breaker untouched.
+"""
+import logging
+import random
+import threading
+import time
+from src.documents.chunking import estimate_tokens
+from .providers import LLMProvider, ProviderError
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_TOKENS_PER_QUESTION = 150   # Rough size of one generated question (for the token bucket)
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable',
+                   'InternalServerError', 'DeadlineExceeded', 'GatewayTimeout'}
+
+class ProviderUnavailable(ProviderError):
+    """The provider is degraded or over quota; retry_after is in seconds."""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def is_retryable(error):
+    if getattr(error, 'retryable', False):
+        return True
+    code = getattr(error, 'code', None)
+    if isinstance(code, int) and code in RETRYABLE_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_NAMES or isinstance(error, (TimeoutError, ConnectionError))
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holds at most one minute's worth."""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Takes `amount` units now (possibly going negative) and returns how long to wait before using them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount):
+        with self._lock:
+            self.level = min(self.capacity, self.level + min(amount, self.capacity))
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open
+    after `reset_seconds`, letting one trial call through; its result closes
+    or re-opens the circuit.
+    """
+    def __init__(self, threshold=5, reset_seconds=60):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """Seconds until calls are allowed again (0 when closed)."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            return int(remaining) + 1 if remaining > 0 else 0
+
+    def before_call(self):
+        """Raises ProviderUnavailable while open. Returns: True if this call is the half-open trial."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining <= 0 and not self.trial_running:
+                self.trial_running = True
+                return True
+            raise ProviderUnavailable(
+                "AI service is temporarily unavailable, please retry later.",
+                max(1, int(remaining) + 1)
+            )
+
+    def cancel_trial(self):
+        """The trial call never reached the provider: let the next caller try."""
+        with self._lock:
+            self.trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"LLM circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+class ResilientProvider(LLMProvider):
+    def __init__(self, provider, requests_per_minute=60, tokens_per_minute=1000000,
+                 max_retries=3, backoff_base=1.0, backoff_max=20.0, max_wait=30.0,
+                 breaker_threshold=5, breaker_reset_seconds=60):
+        self.provider = provider
+        self.name = provider.name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+
+    def _acquire(self, tokens):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > self.max_wait:
+            self.requests.refund(1)
+            self.tokens.refund(tokens)
+            self.breaker.cancel_trial()
+            raise ProviderUnavailable("AI quota exhausted for now, please retry later.", int(wait) + 1)
+        if wait > 0:
+            time.sleep(wait)
+
+    def generate(self, prompt, num_questions, temperature):
+        is_trial = self.breaker.before_call()
+        tokens = estimate_tokens(len(prompt)) + num_questions * OUTPUT_TOKENS_PER_QUESTION
+
+        attempt = 0
+        while True:
+            self._acquire(tokens)
+            try:
+                result = self.provider.generate(prompt, num_questions, temperature)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The request itself was rejected: neither a success nor a failure of the provider
+                    if is_trial:
+                        self.breaker.cancel_trial()
+                    raise
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise ProviderUnavailable(
+                        f"AI service unavailable after {attempt + 1} attempts: {e}",
+                        max(1, self.breaker.retry_after() or int(self.backoff_max))
+                    ) from e
+                attempt += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                logger.info(f"LLM call failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
@@ -1,6 +1,8 @@
-from flask import request, jsonify, Blueprint, send_file
+from flask import request, jsonify, Blueprint, send_file, Response, stream_with_context
 from flasgger import swag_from
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.auth.decorators import role_required
+from src.users.models import UserRole
 from .service import QCMService
 from . import qcm_bp
 
@@ -22,18 +24,27 @@ from . import qcm_bp
                 'document_id': {'type': 'integer'},
                 'num_questions': {'type': 'integer'},
                 'level': {'type': 'string'},
+                'topic': {'type': 'string', 'description': 'Optional focus used to rank passages'},
+                'pages': {'type': 'string', 'description': 'Optional page range, e.g. "12-30"'},
+                'chapter': {'type': 'string', 'description': 'Optional chapter or chapter range, e.g. 3 or "2-3"'},
+                'fresh': {'type': 'boolean', 'description': 'Bypass the generation cache and call the AI again'},
+                'skip_duplicates': {'type': 'boolean', 'description': 'Drop questions that paraphrase ones already in your QCMs'},
             },
         },
     }],
     'responses': {
-        201: {'description': 'Exam generated successfully'},
-        400: {'description': 'Missing document ID'},
-        500: {'description': 'Generation error'},
+        201: {'description': 'Practice QCM served from the pre-generated pool'},
+        202: {'description': 'Generation queued; poll status_url or stream events_url'},
+        400: {'description': 'Missing document ID, document not ready or invalid range'},
+        429: {'description': 'Too many generations in progress for this user'},
+        503: {'description': 'AI provider degraded; see Retry-After'},
     },
 })
 def generate():
     """
-    Payload: { "document_id": 1, "num_questions": 10, "level": "hard" }
+    Payload: { "document_id": 1, "num_questions": 10, "level": "hard", "topic": "optional" }
+    Optional scope: "pages": "12-30" or "chapter": 3 (only that slice is sent to the AI)
+    The AI call runs in the background: the response only carries the job id.
     """
     user_id = get_jwt_identity()
     data = request.get_json()
@@ -41,37 +52,151 @@ def generate():
     doc_id = data.get('document_id')
     num = data.get('num_questions', 5)
     level = data.get('level', 'medium')
+    topic = data.get('topic')
 
     if not doc_id:
         return jsonify({"error": "Document ID is required"}), 400
 
-    qcm, error = QCMService.generate_exam(user_id, doc_id, num, level)
+    result, error, code = QCMService.submit_generation(
+        user_id, doc_id, num, level, topic,
+        pages=data.get('pages'),
+        chapter=data.get('chapter'),
+        fresh=str(data.get('fresh', request.args.get('fresh', ''))).lower() in ('true', '1'),
+        skip_duplicates=data.get('skip_duplicates')
+    )
 
     if error:
-        return jsonify({"error": error}), 500
+        response = jsonify({"error": error})
+        if code == 503:
+            response.headers['Retry-After'] = str(max(1, QCMService.provider_retry_after()))
+        return response, code
+
+    # Practice QCM served straight from the pre-generated pool
+    if code == 201:
+        return jsonify({
+            "message": "Exam generated successfully",
+            "qcm_id": result.id,
+            "title": result.title
+        }), 201
 
     return jsonify({
-        "message": "Exam generated successfully",
-        "qcm_id": qcm.id,
-        "title": qcm.title
-    }), 201
+        "message": "Generation started",
+        "job_id": result.id,
+        "status": result.status.value,
+        "status_url": f"/qcm/jobs/{result.id}",
+        "events_url": QCMService.job_events_url(result)
+    }), 202
+
+@qcm_bp.route('/cache/stats', methods=['GET'])
+@role_required([UserRole.ADMIN])
+@swag_from({
+    'tags': ['QCM'],
+    'summary': 'Generation cache counters (this process)',
+    'security': [{'BearerAuth': []}],
+    'responses': {
+        200: {'description': 'Entries, hits, misses and hit rate'},
+        403: {'description': 'Unauthorized'},
+    },
+})
+def cache_stats():
+    return jsonify(QCMService.get_cache_stats()), 200
+
+@qcm_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['QCM'],
+    'summary': 'Get the status of a generation job',
+    'security': [{'BearerAuth': []}],
+    'parameters': [{
+        'in': 'path',
+        'name': 'job_id',
+        'type': 'string',
+        'required': True,
+    }],
+    'responses': {
+        200: {'description': 'Job status; qcm_id is set once the QCM exists, missing_questions counts the requested '
+                             'questions it lacks. events_url has a fresh stream token'},
+        403: {'description': 'Not your job'},
+        404: {'description': 'Job not found'},
+    },
+})
+def get_job(job_id):
+    user_id = get_jwt_identity()
+    job, error, code = QCMService.get_job(user_id, job_id)
+    if error:
+        return jsonify({"error": error}), code
+    return jsonify({**job.to_dict(), "events_url": QCMService.job_events_url(job)}), 200
+
+@qcm_bp.route('/jobs/<job_id>/events', methods=['GET'])
+@swag_from({
+    'tags': ['QCM'],
+    'summary': 'Stream a generation job as Server-Sent Events',
+    'description': 'Open the events_url returned by POST /qcm/generate or GET /qcm/jobs/<id> with EventSource. '
+                   'Its token only opens this stream and expires after 15 minutes (never put the access token '
+                   'in a URL). Emits a "status" event with the current state and on every change, and '
+                   '"question" events as questions are saved (a batch each time one shard of the request '
+                   'completes, GENERATION_SHARD_SIZE questions at most). While the job runs the stream ends every '
+                   '25 seconds; EventSource reconnects by itself and Last-Event-ID resumes after the last '
+                   'question received. Call close() after the final status; its missing_questions tells how '
+                   'many requested questions could not be generated.',
+    'produces': ['text/event-stream'],
+    'parameters': [{
+        'in': 'path',
+        'name': 'job_id',
+        'type': 'string',
+        'required': True,
+    }, {
+        'in': 'query',
+        'name': 'token',
+        'type': 'string',
+        'required': True,
+        'description': 'Stream token from events_url',
+    }],
+    'responses': {
+        200: {'description': 'Event stream'},
+        401: {'description': 'Missing, invalid or expired stream token'},
+        404: {'description': 'Job not found'},
+    },
+})
+def stream_job(job_id):
+    job, error, code = QCMService.check_job_events_token(job_id, request.args.get('token'))
+    if error:
+        return jsonify({"error": error}), code
+
+    last_question_id = QCMService.parse_last_event_id(request.headers.get('Last-Event-ID'))
+    return Response(
+        stream_with_context(QCMService.iter_job_events(job_id, last_question_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @qcm_bp.route('/', methods=['GET'])
 @jwt_required()
 @swag_from({
     'tags': ['QCM'],
-    'summary': 'List QCMs for the current user',
+    'summary': 'List QCMs for the current user (summaries, newest first)',
     'security': [{'BearerAuth': []}],
+    'parameters': [
+        {'in': 'query', 'name': 'limit', 'type': 'integer', 'required': False, 'description': 'Page size (max 100)'},
+        {'in': 'query', 'name': 'cursor', 'type': 'string', 'required': False, 'description': 'next_cursor of the previous page'},
+    ],
     'responses': {
-        200: {'description': 'List of QCMs'},
+        200: {'description': '{items: [{id, title, level, document_id, created_at, question_count}], next_cursor}'},
+        400: {'description': 'Invalid cursor'},
     },
 })
 def list_qcms():
-    """Returns all QCMs for the current user"""
+    """Returns one page of QCM summaries; questions are only sent by GET /qcm/<id>"""
     user_id = get_jwt_identity()
-    qcms = QCMService.get_user_qcms(user_id)
+    page, error = QCMService.get_qcm_page(
+        user_id,
+        limit=request.args.get('limit', 20, type=int),
+        cursor=request.args.get('cursor')
+    )
+    if error:
+        return jsonify({"error": error}), 400
 
-    return jsonify([qcm.to_dict() for qcm in qcms]), 200
+    return jsonify(page), 200
 
 @qcm_bp.route('/<int:qcm_id>', methods=['GET'])
 @jwt_required()
@@ -100,9 +225,41 @@ def get_qcm(qcm_id):
         "id": qcm.id,
         "title": qcm.title,
         "level": qcm.level,
+        "document_id": qcm.document_id,
+        "created_at": qcm.created_at.isoformat(),
+        "question_count": len(qcm.questions),
         "questions": [q.to_dict() for q in qcm.questions]
     }), 200
 
+@qcm_bp.route('/<int:qcm_id>/duplicates', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['QCM'],
+    'summary': 'Near-duplicate questions across your question bank',
+    'security': [{'BearerAuth': []}],
+    'parameters': [
+        {'in': 'path', 'name': 'qcm_id', 'type': 'integer', 'required': True},
+        {'in': 'query', 'name': 'threshold', 'type': 'number', 'required': False,
+         'description': 'Cosine similarity from 0 to 1 (default DUPLICATE_SIMILARITY)'},
+    ],
+    'responses': {
+        200: {'description': 'Questions of this QCM with their closest matches in your other questions'},
+        403: {'description': 'Unauthorized'},
+        404: {'description': 'QCM not found'},
+        503: {'description': 'Embedding model unavailable'},
+    },
+})
+def qcm_duplicates(qcm_id):
+    user_id = get_jwt_identity()
+    threshold = request.args.get('threshold', type=float)
+    if threshold is not None and not 0 < threshold <= 1:
+        return jsonify({"error": "threshold must be between 0 and 1"}), 400
+
+    report, error, code = QCMService.find_duplicates(user_id, qcm_id, threshold)
+    if error:
+        return jsonify({"error": error}), code
+    return jsonify(report), 200
+
 # --- NEW: Delete QCM Route ---
 @qcm_bp.route('/<int:qcm_id>', methods=['DELETE'])
 @jwt_required()
@@ -194,24 +351,84 @@ def edit_question(question_id):
         'required': True,
     }],
     'responses': {
-        200: {'description': 'PDF file'},
-        404: {'description': 'PDF generation failed'},
+        200: {'description': 'PDF file (ETag: content version)'},
+        202: {'description': 'Large QCM, rendering in the background; retry after Retry-After seconds'},
+        304: {'description': 'Not modified'},
+        404: {'description': 'QCM not found'},
     },
 })
 def download_qcm_pdf(qcm_id):
     """
-    Generates and downloads the PDF for a specific QCM.
+    Streams the cached PDF for a specific QCM (rendered on first request).
     """
     user_id = get_jwt_identity()
     
-    pdf_buffer, error = QCMService.download_pdf(user_id, qcm_id)
+    result, error, code = QCMService.download_pdf(user_id, qcm_id)
     
     if error:
-        return jsonify({"error": error}), 404
-        
-    return send_file(
-        pdf_buffer,
+        return jsonify({"error": error}), code
+
+    path, etag = result
+    if path is None:
+        response = jsonify({"status": "rendering", "message": "The PDF is being generated, retry shortly."})
+        response.headers['Retry-After'] = '2'
+        return response, 202
+
+    response = send_file(
+        path,
         as_attachment=True,
         download_name=f"exam_{qcm_id}.pdf",
-        mimetype='application/pdf'
-    )
\ No newline at end of file
+        mimetype='application/pdf',
+        conditional=True,
+        etag=etag
+    )
+    # Same URL, new content after an edit: let the browser keep it but revalidate (304 via ETag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@qcm_bp.route('/<int:qcm_id>/variants', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'tags': ['QCM'],
+    'summary': 'Download shuffled paper variants and their answer keys as a ZIP',
+    'security': [{'BearerAuth': []}],
+    'parameters': [
+        {'in': 'path', 'name': 'qcm_id', 'type': 'integer', 'required': True},
+        {
+            'in': 'body',
+            'name': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'required': ['count'],
+                'properties': {
+                    'count': {'type': 'integer', 'example': 120, 'description': 'Number of variants (one per student)'},
+                    'seed': {'type': 'string', 'example': 'td3-2024', 'description': 'Same seed, same variants (random if omitted)'},
+                },
+            },
+        },
+    ],
+    'responses': {
+        200: {'description': 'ZIP with variants/, keys/ and answer_keys.csv (X-Variant-Seed: seed used)'},
+        400: {'description': 'Invalid count'},
+        403: {'description': 'Not the owner of this QCM'},
+        404: {'description': 'QCM not found'},
+    },
+})
+def download_qcm_variants(qcm_id):
+    """
+    Renders one seeded variant per student (question and choice order shuffled)
+    with matching answer keys, and streams them back as a ZIP.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    result, error, code = QCMService.export_variants(user_id, qcm_id, data.get('count'), data.get('seed'))
+    if error:
+        return jsonify({"error": error}), code
+
+    chunks, seed = result
+    response = Response(stream_with_context(chunks), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="exam_{qcm_id}_variants_{seed}.zip"'
+    response.headers['X-Variant-Seed'] = seed
+    return response
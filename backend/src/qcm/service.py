@@ -1,36 +1,391 @@
+import base64
+import json
+import re
+import secrets
+import time
+from datetime import datetime
+from functools import partial
+from flask import current_app
+from src.extensions import db
 from src.documents.repository import DocumentRepository
+from src.documents.chunking import chunk_text, estimate_tokens
 from .repository import QCMRepository
+from .models import QCM
+from .passages import select_passages
+from .sharding import split_count, generate_sharded
+from .resilience import ProviderUnavailable
+from .cache import get_generation_cache
+from .providers import get_provider
+from .practice import serve_from_pool
+from .embeddings import EmbeddingUnavailable, embed_texts, filter_new_questions, get_bank_index, invalidate_bank
 from .ai_generation import AIGenerator
-from .pdf_generator import PDFGenerator
+from . import pdf_cache
+from .variants import stream_variants_zip
+from .versions import qcm_content
+from .jobs import enqueue_generation, fail_lost_jobs
 from src.users.models import User, UserRole
+from src.auth.security import generate_token, verify_token
+
+# QCM list pagination
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Server-Sent Events for generation jobs. A stream holds a request worker, so it is closed after
+# JOB_EVENTS_STREAM_SECONDS and EventSource reconnects with Last-Event-ID to resume where it was
+JOB_EVENTS_POLL_SECONDS = 1.0
+JOB_EVENTS_STREAM_SECONDS = 25
+JOB_EVENTS_RETRY_MS = 1000
+# events_url carries a token that only opens that job's stream, never the user's access token
+JOB_EVENTS_TOKEN_SALT = 'job-events'
+JOB_EVENTS_TOKEN_SECONDS = 15 * 60
+ALL_DUPLICATES_ERROR = "Every generated question duplicates one already in your QCMs. Try another topic or range."
+# Variant seeds end up in file names and headers
+SEED_RE = re.compile(r"[\w-]{1,64}", re.ASCII)
+
+def _sse(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
 
 class QCMService:
     @staticmethod
-    def generate_exam(user_id, doc_id, num_questions, level):
+    def parse_range(value):
+        """Accepts 3, "3", "3-7" or [3, 7]. Returns ((first, last), error)."""
+        try:
+            if isinstance(value, (list, tuple)) and len(value) == 2:
+                first, last = int(value[0]), int(value[1])
+            elif isinstance(value, str) and '-' in value:
+                first, last = (int(part) for part in value.split('-', 1))
+            else:
+                first = last = int(value)
+        except (TypeError, ValueError):
+            return None, "Invalid range: use a number, \"3-7\" or [3, 7]."
+
+        if first < 1 or last < first:
+            return None, "Invalid range: numbers start at 1 and the range must be increasing."
+        return (first, last), None
+
+    @staticmethod
+    def resolve_char_range(document, pages=None, chapter=None):
+        """
+        Turns a page or chapter range into a (char_start, char_end) slice of the
+        extracted text, using the index stored at upload time.
+        Returns: (None, None) when no range was requested, else (span, error).
+        """
+        if pages is None and chapter is None:
+            return None, None
+        if pages is not None and chapter is not None:
+            return None, "Use either 'pages' or 'chapter', not both."
+        if not document.content_hash:
+            return None, "This document has no page index. Upload it again to generate by page or chapter."
+
+        bounds, error = QCMService.parse_range(pages if pages is not None else chapter)
+        if error:
+            return None, error
+        first, last = bounds
+
+        if pages is not None:
+            span = DocumentRepository.get_page_span(document.content_hash, first, last)
+            label = "pages"
+        else:
+            span = DocumentRepository.get_chapter_span(document.content_hash, first, last)
+            label = "chapters"
+
+        if not span or span[0] is None:
+            return None, f"No text found for {label} {first}-{last}."
+        return span, None
+
+    @staticmethod
+    def _load_passages(document, char_range=None):
+        """
+        Returns: (passages, token_counts) in document order.
+        char_range: optional (start, end) slice; only that part of the text is loaded.
+        """
+        if char_range:
+            range_start, range_end = char_range
+            text = DocumentRepository.get_text_slice(document.id, range_start, range_end) or ""
+        else:
+            range_start, range_end = 0, None
+            text = document.extracted_text or ""
+
+        chunks = []
+        if document.content_hash:
+            chunks = DocumentRepository.get_chunks(document.content_hash, range_start, range_end)
+
+        if chunks:
+            # Clip the stored chunks to the requested slice (offsets relative to `text`)
+            spans = []
+            for c in chunks:
+                start = max(c.char_start, range_start) - range_start
+                end = (c.char_end if range_end is None else min(c.char_end, range_end)) - range_start
+                if end > start:
+                    spans.append((start, end))
+        else:
+            # Documents extracted before chunking existed: chunk on the fly
+            spans = chunk_text(text)
+        token_counts = [estimate_tokens(end - start) for start, end in spans]
+
+        return [text[start:end] for start, end in spans], token_counts
+
+    @staticmethod
+    def _join_passages(passages, selected):
+        # Mark the gaps so the model does not read two distant passages as one
+        parts = []
+        previous = None
+        for index in selected:
+            if previous is not None and index != previous + 1:
+                parts.append("[...]\n")
+            parts.append(passages[index])
+            previous = index
+        return "".join(parts)
+
+    @staticmethod
+    def build_source_text(document, mode, topic=None, char_range=None):
+        """
+        Selects a diverse, relevant subset of the document's passages that fits
+        GENERATION_TOKEN_BUDGET. Student mode adds randomness so every practice
+        run covers different parts of the course.
+        """
+        return QCMService.build_shard_texts(document, mode, 1, topic, char_range)[0]
+
+    @staticmethod
+    def build_shard_texts(document, mode, n_shards, topic=None, char_range=None):
+        """
+        Source texts for n_shards generation calls. Passages are selected for
+        n_shards budgets at once, then cut into consecutive groups of roughly
+        equal size, so each shard quizzes a different part of the course.
+        Short documents are shared between shards.
+        """
+        passages, token_counts = QCMService._load_passages(document, char_range)
+        budget = current_app.config.get('GENERATION_TOKEN_BUDGET', 6000)
+        selected = select_passages(
+            passages,
+            token_counts,
+            budget * n_shards,
+            topic=topic,
+            randomize=(mode == "student")
+        )
+
+        groups = [[]]
+        group_tokens = 0
+        per_group = sum(token_counts[i] for i in selected) / n_shards
+        for index in selected:
+            if groups[-1] and group_tokens + token_counts[index] > per_group and len(groups) < n_shards:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(index)
+            group_tokens += token_counts[index]
+
+        texts = [QCMService._join_passages(passages, group) for group in groups]
+        return [texts[i % len(texts)] for i in range(n_shards)]
+
+    @staticmethod
+    def _prepare_generation(user_id, doc_id, pages=None, chapter=None):
+        """
+        Checks everything that can be checked without calling the AI.
+        Returns: ((document, char_range, user), error)
+        """
         # 1. Fetch document
         document = DocumentRepository.get_by_id(doc_id)
-        if not document or not document.extracted_text:
+        if document and not document.is_ready:
+            return None, f"Document is not ready yet (status: {document.status.value})."
+        if not document or not document.word_count:
             return None, "Document not found or empty."
 
-        # 2. Determine Mode based on User Role
+        char_range, error = QCMService.resolve_char_range(document, pages, chapter)
+        if error:
+            return None, error
+
         user = User.query.get(user_id)
         if not user:
             return None, "User not found"
-            
+        return (document, char_range, user), None
+
+    @staticmethod
+    def submit_generation(user_id, doc_id, num_questions, level, topic=None, pages=None, chapter=None, fresh=False,
+                          skip_duplicates=None):
+        """
+        Validates the request and queues it; the AI call runs in the background.
+        Student requests over a whole document are first served from the
+        practice pool, without any AI call.
+        Returns: (GenerationJob, error, 202), (QCM, None, 201) or (None, error, status_code)
+        """
+        try:
+            num_questions = int(num_questions)
+        except (TypeError, ValueError):
+            num_questions = 0
+        if num_questions < 1:
+            return None, "num_questions must be a positive integer.", 400
+
+        prepared, error = QCMService._prepare_generation(user_id, doc_id, pages, chapter)
+        if error:
+            return None, error, 400
+        document, char_range, user = prepared
+
+        if user.role == UserRole.STUDENT and char_range is None and not topic:
+            qcm = serve_from_pool(user.id, document, num_questions, level)
+            if qcm:
+                return qcm, None, 201
+
+        # Fail fast instead of queueing work the provider cannot take right now
+        if QCMService.provider_retry_after():
+            return None, "AI service is temporarily unavailable, please retry later.", 503
+
+        # Jobs lost in a restart would otherwise count against the per-user cap forever
+        fail_lost_jobs(user_id=user_id)
+
+        params = {
+            "num_questions": num_questions,
+            "level": level,
+            "topic": topic,
+            "pages": pages,
+            "chapter": chapter,
+            "fresh": fresh,
+            "skip_duplicates": skip_duplicates
+        }
+        # One user (or one class sharing an account) must not fill every worker
+        try:
+            job = QCMRepository.create_job_within_limit(
+                user_id, doc_id, params, current_app.config.get('GENERATION_MAX_JOBS_PER_USER', 2)
+            )
+        except Exception as e:
+            return None, f"Database Error: {str(e)}", 500
+        if job is None:
+            return None, "You already have generations in progress. Wait for them to finish.", 429
+
+        enqueue_generation(job.id)
+        return job, None, 202
+
+    @staticmethod
+    def provider_retry_after():
+        """Seconds before the AI provider accepts calls again (0 when healthy)."""
+        breaker = getattr(get_provider(), 'breaker', None)
+        return breaker.retry_after() if breaker else 0
+
+    @staticmethod
+    def get_cache_stats():
+        return get_generation_cache(current_app.config).stats()
+
+    @staticmethod
+    def get_job(user_id, job_id):
+        """Returns: (job, error, status_code). Jobs are only visible to their owner."""
+        fail_lost_jobs(job_id=job_id)
+        job = QCMRepository.get_job(job_id)
+        if not job:
+            return None, "Job not found", 404
+        if int(job.user_id) != int(user_id):
+            return None, "Unauthorized: You do not own this job", 403
+        return job, None, 200
+
+    @staticmethod
+    def job_events_url(job):
+        token = generate_token(job.id, JOB_EVENTS_TOKEN_SALT)
+        return f"/qcm/jobs/{job.id}/events?token={token}"
+
+    @staticmethod
+    def check_job_events_token(job_id, token):
+        """Returns: (job, error, status_code) for the token of a job's events_url."""
+        if not token or verify_token(token, JOB_EVENTS_TOKEN_SALT, JOB_EVENTS_TOKEN_SECONDS) != job_id:
+            return None, "Invalid or expired events token: get a new events_url from the job status", 401
+        job = QCMRepository.get_job(job_id)
+        if not job:
+            return None, "Job not found", 404
+        return job, None, 200
+
+    @staticmethod
+    def parse_last_event_id(value):
+        """Last-Event-ID of a reconnecting stream: the id of the last question it received."""
+        try:
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def iter_job_events(job_id, last_question_id=0, poll_interval=JOB_EVENTS_POLL_SECONDS,
+                        duration=JOB_EVENTS_STREAM_SECONDS):
+        """
+        Yields Server-Sent Events for a job: "status" (current state, then every
+        change) and "question" for every question saved after last_question_id,
+        as soon as a poll sees it (a job saves each shard's questions when that
+        shard completes, so they arrive in batches while the job runs). Every event carries the id of the last question
+        sent, so a reconnecting EventSource resumes after it (Last-Event-ID).
+        Ends after the final status, or after `duration` seconds while the job is
+        still running (the client reconnects). The job is written by another
+        thread, so each poll starts a fresh session instead of holding one (and a
+        pooled connection) open.
+        """
+        last_status = None
+        deadline = time.monotonic() + duration
+        yield f"retry: {JOB_EVENTS_RETRY_MS}\n\n"
+
+        while True:
+            job = QCMRepository.get_job(job_id)
+            if job is None:
+                break
+
+            if job.qcm_id:
+                for question in QCMRepository.get_questions_after(job.qcm_id, last_question_id):
+                    last_question_id = question.id
+                    yield _sse("question", question.to_dict(), last_question_id)
+
+            if job.status != last_status:
+                last_status = job.status
+                yield _sse("status", job.to_dict(), last_question_id)
+
+            finished = job.is_finished
+            db.session.remove()
+            if finished or time.monotonic() > deadline:
+                break
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def generate_exam(user_id, doc_id, num_questions, level, topic=None, pages=None, chapter=None, job=None, fresh=False,
+                      skip_duplicates=None):
+        """
+        fresh: skip the generation cache (the new result still replaces the cached one).
+        skip_duplicates: drop questions that paraphrase one already in the user's bank
+        (None = GENERATION_FILTER_DUPLICATES).
+        """
+        prepared, error = QCMService._prepare_generation(user_id, doc_id, pages, chapter)
+        if error:
+            return None, error
+        document, char_range, user = prepared
+
+        # 2. Determine Mode based on User Role
         # Check if the user is a Professor/Admin or a Student
         is_prof = (user.role == UserRole.PROFESSOR or user.role == UserRole.ADMIN)
         mode = "professor" if is_prof else "student"
 
-        # 3. Call AI with the specific MODE
-        questions_json, error = AIGenerator.generate(
-            text_content=document.extracted_text, 
-            num_questions=num_questions, 
-            level=level,
-            mode=mode 
+        # 3. Call AI with the specific MODE, in shards of GENERATION_SHARD_SIZE questions
+        config = current_app.config
+        quotas = split_count(num_questions, config.get('GENERATION_SHARD_SIZE', 10))
+        generate = partial(
+            generate_sharded,
+            get_generation_cache(config).wrap(AIGenerator.generate, fresh=fresh),
+            QCMService.build_shard_texts(document, mode, len(quotas), topic, char_range),
+            quotas,
+            level,
+            mode,
+            max_workers=config.get('GENERATION_SHARD_CONCURRENCY', 3),
+            max_retries=config.get('GENERATION_SHARD_RETRIES', 2)
         )
-        
-        if error:
-            return None, error
+
+        if skip_duplicates is None:
+            skip_duplicates = config.get('GENERATION_FILTER_DUPLICATES', False)
+
+        def keep_new(questions):
+            if not skip_duplicates:
+                return questions
+            try:
+                questions, dropped = filter_new_questions(
+                    questions, user_id,
+                    config.get('EMBEDDING_MODEL'), config.get('DUPLICATE_SIMILARITY', 0.9)
+                )
+            except EmbeddingUnavailable as e:
+                current_app.logger.warning(f"Duplicate filter skipped: {e}")
+                dropped = 0
+            if dropped:
+                current_app.logger.info(f"Dropped {dropped} near-duplicate questions for user {user_id}")
+            return questions
 
         # 4. Save to Database
         # Use different titles so they are easily distinguishable in the list
@@ -42,20 +397,144 @@ class QCMService:
             "user_id": user_id,
             "document_id": doc_id
         }
-        
+
+        if job is not None:
+            return QCMService._generate_into_job(generate, keep_new, qcm_data, job)
+
+        questions_json, error = generate()
+        if error:
+            return None, error
+        questions_json = keep_new(questions_json)
+        if not questions_json:
+            return None, ALL_DUPLICATES_ERROR
+
         try:
             qcm = QCMRepository.create_qcm_with_questions(qcm_data, questions_json)
             return qcm, None
+        except ValueError as e:
+            return None, f"AI Error: invalid question list ({e})"
+        except Exception as e:
+            return None, f"Database Error: {str(e)}"
+
+    @staticmethod
+    def _generate_into_job(generate, keep_new, qcm_data, job):
+        """
+        Saves each shard's questions as soon as that shard completes, so the
+        job's event stream sends them while the other shards still run.
+        The QCM is removed if nothing could be saved.
+        """
+        try:
+            qcm = QCMRepository.create_job_qcm(qcm_data, job)
+        except Exception as e:
+            return None, f"Database Error: {str(e)}"
+
+        saved = 0
+
+        def save_shard(questions):
+            nonlocal saved
+            questions = keep_new(questions)
+            if questions:
+                QCMRepository.add_questions(qcm.id, questions)
+                saved += len(questions)
+
+        try:
+            _, error = generate(on_shard=save_shard)
+        except ProviderUnavailable:
+            QCMRepository.discard_job_qcm(qcm, job)
+            raise
+        except ValueError as e:
+            QCMRepository.discard_job_qcm(qcm, job)
+            return None, f"AI Error: invalid question list ({e})"
         except Exception as e:
+            QCMRepository.discard_job_qcm(qcm, job)
             return None, f"Database Error: {str(e)}"
 
+        if error or not saved:
+            QCMRepository.discard_job_qcm(qcm, job)
+            return None, error or ALL_DUPLICATES_ERROR
+        return qcm, None
+
+    @staticmethod
+    def find_duplicates(user_id, qcm_id, threshold=None):
+        """
+        Near-duplicates of every question of this QCM across the owner's whole bank.
+        Returns: (report, error, status_code)
+        """
+        qcm = QCMRepository.get_by_id(qcm_id)
+        if not qcm:
+            return None, "QCM not found", 404
+        if int(qcm.user_id) != int(user_id):
+            return None, "Unauthorized: You do not own this QCM", 403
+
+        config = current_app.config
+        threshold = threshold if threshold is not None else config.get('DUPLICATE_SIMILARITY', 0.9)
+        model_name = config.get('EMBEDDING_MODEL')
+        questions = qcm.questions
+        try:
+            vectors = embed_texts([q.text for q in questions], model_name)
+            matches = get_bank_index(qcm.user_id, model_name).search(
+                vectors, threshold, exclude_qcm_id=qcm.id
+            )
+        except EmbeddingUnavailable as e:
+            return None, str(e), 503
+
+        duplicates = []
+        for question, found in zip(questions, matches):
+            if not found:
+                continue
+            duplicates.append({
+                "question_id": question.id,
+                "text": question.text,
+                "matches": [{
+                    "question_id": question_id,
+                    "qcm_id": match_qcm_id,
+                    "qcm_title": qcm_title,
+                    "text": text,
+                    "similarity": round(similarity, 3)
+                } for (question_id, match_qcm_id, qcm_title, text), similarity in found]
+            })
+
+        return {
+            "qcm_id": qcm.id,
+            "threshold": threshold,
+            "question_count": len(questions),
+            "duplicates": duplicates
+        }, None, 200
+
     @staticmethod
     def get_exam_details(qcm_id):
         return QCMRepository.get_by_id(qcm_id)
 
     @staticmethod
-    def get_user_qcms(user_id):
-        return QCMRepository.get_by_user(user_id)
+    def get_qcm_page(user_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Summaries of the user's QCMs, newest first.
+        Returns: ({"items": [...], "next_cursor": str | None}, error)
+        """
+        after = None
+        if cursor:
+            try:
+                created_at, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+                after = (datetime.fromisoformat(created_at), int(last_id))
+            except (ValueError, UnicodeDecodeError):
+                return None, "Invalid cursor"
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # One extra row tells whether another page exists
+        rows = QCMRepository.get_summaries_by_user(user_id, limit + 1, after)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = base64.urlsafe_b64encode(
+                f"{last.created_at.isoformat()}|{last.id}".encode()
+            ).decode()
+
+        return {
+            "items": [QCM.summary_dict(row) for row in rows],
+            "next_cursor": next_cursor
+        }, None
     
     # --- NEW: Delete Logic ---
     @staticmethod
@@ -77,6 +556,7 @@ class QCMService:
 
         try:
             QCMRepository.delete_qcm(qcm)
+            pdf_cache.invalidate(qcm_id)
             return "QCM deleted successfully", 200
         except Exception as e:
             return str(e), 500
@@ -93,12 +573,9 @@ class QCMService:
         if int(question.qcm.user_id) != int(user_id):
             return "Unauthorized: You do not own this Question", 403
 
-        # --- NEW SAFEGUARD: Prevent editing if used in an exam ---
-        # Editing a question while an exam exists changes history/grades!
-        if len(question.qcm.sessions) > 0:
-            return "Warning: This QCM is used in an Exam Session. You cannot edit questions unless you delete the exams first.", 409
-        # ---------------------------------------------------------
-            
+        # Exam sessions use the snapshot taken at their creation (QCMVersion),
+        # so editing the live question no longer changes history or grades.
+
         # 3. Validate Data
         new_text = data.get('text')
         new_choices = data.get('choices')
@@ -109,6 +586,8 @@ class QCMService:
         # 4. Perform Update
         try:
             updated_q = QCMRepository.update_question(question_id, new_text, new_choices)
+            invalidate_bank(question.qcm.user_id)
+            pdf_cache.invalidate(question.qcm_id)
             return updated_q, 200
         except Exception as e:
             return str(e), 500
@@ -116,14 +595,55 @@ class QCMService:
 
     @staticmethod
     def download_pdf(user_id, qcm_id):
+        """
+        Returns: ((path, etag), error, status_code); status 202 with no path
+        means a large QCM is being rendered in the background.
+        """
         qcm = QCMRepository.get_by_id(qcm_id)
         
         if not qcm:
-            return None, "QCM not found"
+            return None, "QCM not found", 404
             
         # Optional: Security check (Owner only?)
         # if qcm.user_id != user_id:
         #    return None, "Unauthorized"
-            
-        pdf_buffer = PDFGenerator.create_pdf(qcm)
-        return pdf_buffer, None
\ No newline at end of file
+
+        try:
+            path, etag = pdf_cache.get_pdf(qcm)
+        except Exception as e:
+            return None, f"PDF generation failed: {e}", 500
+        if path is None:
+            return (None, etag), None, 202
+        return (path, etag), None, 200
+
+    @staticmethod
+    def export_variants(user_id, qcm_id, count, seed=None):
+        """
+        One shuffled paper per student plus its answer key, as a streamed ZIP.
+        The same seed always produces the same variants.
+        Returns: ((chunks, seed), error, status_code)
+        """
+        qcm = QCMRepository.get_by_id(qcm_id)
+        if not qcm:
+            return None, "QCM not found", 404
+        if int(qcm.user_id) != int(user_id):
+            return None, "Unauthorized: You do not own this QCM", 403
+        if not qcm.questions:
+            return None, "QCM has no questions", 400
+
+        max_count = current_app.config.get('VARIANTS_MAX', 1000)
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            return None, "count must be an integer", 400
+        if not 1 <= count <= max_count:
+            return None, f"count must be between 1 and {max_count}", 400
+
+        seed = str(seed) if seed not in (None, "") else secrets.token_hex(4)
+        if not SEED_RE.fullmatch(seed):
+            return None, "seed must be 1-64 letters, digits, '-' or '_'", 400
+        # Detach the content from the session: rendering happens while the response streams
+        content = qcm_content(qcm)
+        workers = current_app.config.get('VARIANT_RENDER_WORKERS', 2)
+        chunks = stream_variants_zip(content, count, seed, workers)
+        return (chunks, seed), None, 200
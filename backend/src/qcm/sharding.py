@@ -0,0 +1,118 @@
+"""
+Map-reduce generation for large question counts.
+
+One call asking for 60 questions is slow and often comes back truncated or
+as invalid JSON, which used to throw the whole request away. Instead the
+count is split into shards of at most GENERATION_SHARD_SIZE questions, each
+shard quizzes a different group of passages, shards run concurrently (at
+most GENERATION_SHARD_CONCURRENCY calls at once) and only the shards that
+failed are sent again (malformed output, not provider outages: those were
+already retried by ResilientProvider). Each shard's questions are
+de-duplicated against the earlier ones as soon as it completes, so a caller
+can save them while the other shards still run (on_shard).
+"""
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .passages import STOPWORDS
+from .models import Question
+from .resilience import ProviderUnavailable
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_THRESHOLD = 0.8   # Token Jaccard similarity above which two questions count as the same
+
+# Unlike passage scoring, numbers matter here ("2 + 3" vs "4 + 5")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def _question_tokens(text):
+    return {t for t in _WORD_RE.findall(text.lower()) if t not in STOPWORDS}
+
+def split_count(total, shard_size):
+    """Splits `total` questions into near-equal quotas of at most `shard_size`."""
+    n_shards = max(1, -(-total // shard_size))
+    base, extra = divmod(total, n_shards)
+    return [base + (1 if i < extra else 0) for i in range(n_shards)]
+
+def _is_valid(questions):
+    if not isinstance(questions, list) or not questions:
+        return False
+    return all(Question.validate_data(q) is None for q in questions)
+
+def generate_sharded(generate, shard_texts, quotas, level, mode, max_workers=3, max_retries=2, on_shard=None):
+    """
+    generate: callable(text_content, num_questions, level, mode) -> (questions, error)
+    shard_texts / quotas: source text and question count of each shard.
+    on_shard: callable(questions), called in the calling thread with the new
+    (non-duplicate) questions of each shard as soon as that shard completes.
+    Returns: (questions, error). Succeeds if at least one shard produced questions;
+    error is only set when every shard failed.
+    Raises: ProviderUnavailable if every shard failed and the provider was unavailable.
+    """
+    results = {}
+    errors = {}
+    unavailable = None
+    kept_tokens = []
+    pending = list(range(len(quotas)))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(quotas)))) as pool:
+        for attempt in range(max_retries + 1):
+            futures = {
+                pool.submit(generate, shard_texts[i], quotas[i], level, mode): i
+                for i in pending
+            }
+            failed = []
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    questions, error = future.result()
+                except ProviderUnavailable as e:
+                    # Not retried here: the provider layer already did
+                    unavailable = e
+                    errors[i] = f"AI Error: {e}"
+                    continue
+                except Exception as e:
+                    questions, error = None, f"AI Error: {e}"
+                if not error and not _is_valid(questions):
+                    error = "AI Error: malformed question list"
+                if error:
+                    errors[i] = error
+                    failed.append(i)
+                else:
+                    results[i] = _keep_new(questions[:quotas[i]], kept_tokens, DUPLICATE_THRESHOLD)
+                    if on_shard and results[i]:
+                        on_shard(results[i])
+            if not failed:
+                break
+            logger.warning(f"Generation shards {failed} failed (attempt {attempt + 1}): "
+                           f"{[errors[i] for i in failed]}")
+            pending = failed
+
+    if not results:
+        if unavailable is not None:
+            raise unavailable
+        return None, errors[pending[0]]
+    if len(results) < len(quotas):
+        logger.warning(f"{len(quotas) - len(results)} of {len(quotas)} generation shards gave up")
+
+    return [q for i in sorted(results) for q in results[i]], None
+
+def remove_near_duplicates(questions, threshold=DUPLICATE_THRESHOLD):
+    """Keeps the first of any group of questions whose wording overlaps more than `threshold`."""
+    return _keep_new(questions, [], threshold)
+
+def _keep_new(questions, kept_tokens, threshold):
+    """Questions that duplicate neither an earlier one nor `kept_tokens` (which the kept ones are added to)."""
+    kept = []
+    for q in questions:
+        tokens = _question_tokens(q['text'])
+        duplicate = False
+        for other in kept_tokens:
+            union = len(tokens | other)
+            if union and len(tokens & other) / union >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(q)
+            kept_tokens.append(tokens)
+    return kept
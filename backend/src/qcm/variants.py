@@ -0,0 +1,106 @@
+"""
+Shuffled paper variants of a QCM, one per student, with their answer keys.
+
+Variant i uses the seed "<base_seed>-<i>": question order and choice order
+are permuted by random.Random(seed), so any variant (and its key) can be
+rebuilt later from the seed alone. Rendering is CPU-bound ReportLab work,
+so batches of seeds are spread over a process pool and the ZIP is streamed
+to the client as batches complete, without ever holding it in memory.
+The worker side lives in rendering/variants.py, outside the `src` package,
+so spawned workers load ReportLab only, not the Flask app.
+"""
+import csv
+import io
+import multiprocessing
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from rendering.variants import render_batch
+
+SEEDS_PER_TASK = 20
+
+class _ZipStream:
+    """Write-only file object; ZipFile writes into it and the generator drains it."""
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+def stream_variants_zip(content, count, base_seed, workers):
+    """Yields the bytes of a ZIP with variants/, keys/ and answer_keys.csv."""
+    seeds = [f"{base_seed}-{i}" for i in range(1, count + 1)]
+    batches = [
+        (seeds[i:i + SEEDS_PER_TASK], list(range(i + 1, min(i + SEEDS_PER_TASK, count) + 1)))
+        for i in range(0, count, SEEDS_PER_TASK)
+    ]
+    width = len(str(count))
+
+    sink = _ZipStream()
+    summary = io.StringIO()
+    writer = csv.writer(summary)
+    writer.writerow(["variant", "seed", "answers"])
+
+    pool = _get_process_pool(workers)
+    pending = deque(batches)
+    in_flight = deque()
+    try:
+        with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            # Keep a bounded number of batches in flight; write them back in order
+            while pending or in_flight:
+                while pending and len(in_flight) < 2 * workers:
+                    batch_seeds, numbers = pending.popleft()
+                    in_flight.append(pool.submit(render_batch, content, batch_seeds, numbers))
+
+                for number, seed, paper, answers, key in in_flight.popleft().result():
+                    name = str(number).zfill(width)
+                    archive.writestr(f"variants/variant_{name}.pdf", paper)
+                    archive.writestr(f"keys/key_{name}.pdf", answers)
+                    writer.writerow([number, seed, "".join(key)])
+                    yield sink.drain()
+
+            archive.writestr("answer_keys.csv", summary.getvalue())
+        yield sink.drain()
+    except BrokenProcessPool:
+        _reset_process_pool(pool)
+        raise
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(workers):
+    """One long-lived pool per process; 'spawn' avoids forking a multi-threaded server."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _process_pool
+
+def _reset_process_pool(pool):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,85 @@
+"""
+Serialization of immutable QCM versions.
+
+A version is the canonical JSON of a QCM (sorted keys, no whitespace),
+identified by its sha256 and stored zlib-compressed in one column. Because
+a hash never changes meaning, decoded versions and the student payloads
+derived from them are cached in memory without any invalidation.
+"""
+import hashlib
+import json
+import threading
+import zlib
+from cachetools import LRUCache
+
+CACHE_SIZE = 256
+
+_snapshots = LRUCache(maxsize=CACHE_SIZE)
+_student_payloads = LRUCache(maxsize=CACHE_SIZE)
+_lock = threading.Lock()
+
+def qcm_content(qcm):
+    """Plain-dict copy of a QCM and its questions (the content of a version)."""
+    return {
+        "id": qcm.id,
+        "title": qcm.title,
+        "level": qcm.level,
+        "questions": [{
+            "id": q.id,
+            "text": q.text,
+            "choices": q.choices,
+            "duration": q.duration
+        } for q in sorted(qcm.questions, key=lambda q: q.id)]
+    }
+
+def _canonical(qcm):
+    return json.dumps(qcm_content(qcm), sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def content_hash(qcm):
+    """Version hash of the current state of a QCM, without building the stored payload."""
+    return hashlib.sha256(_canonical(qcm)).hexdigest()
+
+def snapshot_qcm(qcm):
+    """Returns: (content_hash, compressed payload) for the current state of a QCM."""
+    canonical = _canonical(qcm)
+    return hashlib.sha256(canonical).hexdigest(), zlib.compress(canonical, 9)
+
+def load_snapshot(version):
+    """Full content of a version, including the correct answers. Do not mutate."""
+    with _lock:
+        content = _snapshots.get(version.content_hash)
+    if content is None:
+        content = json.loads(zlib.decompress(version.payload))
+        with _lock:
+            _snapshots[version.content_hash] = content
+    return content
+
+def student_payload(version):
+    """What a student receives when joining: the questions without is_correct."""
+    with _lock:
+        payload = _student_payloads.get(version.content_hash)
+    if payload is None:
+        content = load_snapshot(version)
+        payload = {
+            "id": content["id"],
+            "version": version.content_hash,
+            "title": content["title"],
+            "level": content["level"],
+            "question_count": len(content["questions"]),
+            "questions": [{
+                "id": q["id"],
+                "text": q["text"],
+                "duration": q["duration"],
+                "choices": [{"text": c.get("text")} for c in q["choices"]]
+            } for q in content["questions"]]
+        }
+        with _lock:
+            _student_payloads[version.content_hash] = payload
+    return payload
+
+def correct_indexes(version):
+    """{question_id: index of the correct choice} as of this version."""
+    indexes = {}
+    for q in load_snapshot(version)["questions"]:
+        indexes[q["id"]] = next((i for i, c in enumerate(q["choices"]) if c.get("is_correct")), -1)
+    return indexes
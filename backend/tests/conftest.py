@@ -0,0 +1,94 @@
+"""
+App and database fixtures.
+
+The database is TEST_DATABASE_URL when set (a throwaway Postgres database:
+it is emptied by every test), otherwise a SQLite file. The URL has to be in
+the environment before config.py is imported, hence the top of this file.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+_DB_DIR = tempfile.mkdtemp(prefix="smartqcm-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from src import create_app
+from src.extensions import db
+from src.documents.models import Document, DocumentStatus
+from src.exams import autosave, join_cache
+from src.exams.service import ExamService
+from src.qcm.models import QCM, Question
+from src.school.models import Branch
+from src.users.models import User, UserRole
+
+@compiles(TSVECTOR, "sqlite")
+def _tsvector_on_sqlite(type_, compiler, **kw):
+    return "TEXT"
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+@pytest.fixture
+def database(app):
+    with app.app_context():
+        db.create_all()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+            # Ids restart with the next test: forget everything cached under the old ones
+            join_cache.clear()
+            autosave.clear()
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+def auth_header(user):
+    return {"Authorization": "Bearer " + create_access_token(identity=str(user.id))}
+
+@pytest.fixture
+def exam(database):
+    """An open session on a 4-question QCM, its professor and two students."""
+    branch = Branch(name="GL")
+    database.session.add(branch)
+    database.session.flush()
+    users = [
+        User(email=f"{name}@example.com", password_hash="x", first_name=name, last_name="Test",
+             role=role, is_active=True, branch_id=branch.id)
+        for name, role in (("prof", UserRole.PROFESSOR), ("alice", UserRole.STUDENT), ("bob", UserRole.STUDENT))
+    ]
+    database.session.add_all(users)
+    database.session.flush()
+    professor = users[0]
+
+    document = Document(filename="cours.txt", module="Algo", branch_id=branch.id,
+                        file_path="cours.txt", user_id=professor.id, status=DocumentStatus.READY)
+    database.session.add(document)
+    database.session.flush()
+    qcm = QCM(title="Algo", level="medium", user_id=professor.id, document_id=document.id)
+    database.session.add(qcm)
+    database.session.flush()
+    database.session.add_all([
+        Question(qcm_id=qcm.id, text=f"Question {i}?", duration=30,
+                 choices=[{"text": f"c{j}", "is_correct": j == 1} for j in range(4)])
+        for i in range(4)
+    ])
+    database.session.commit()
+
+    start = (datetime.now() - timedelta(minutes=1)).isoformat(timespec="minutes")
+    session, error = ExamService.create_exam_session(professor.id, {
+        "qcm_id": qcm.id, "branch_id": branch.id, "start_time": start, "duration_minutes": 60
+    })
+    assert error is None
+    return SimpleNamespace(session=session, qcm=qcm, professor=professor, students=users[1:])
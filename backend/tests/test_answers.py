@@ -0,0 +1,58 @@
+import random
+import threading
+from datetime import datetime, timedelta
+import pytest
+from src.exams.models import StudentAnswer
+from src.exams.repository import ExamRepository
+from src.exams.service import ExamService
+from src.extensions import db
+
+WRITERS = 8
+
+def _upsert(attempt_id, question_id, index, saved_at):
+    ExamRepository.upsert_answers([{
+        "attempt_id": attempt_id, "question_id": question_id, "selected_choice_index": index,
+        "is_correct": False, "saved_at": saved_at
+    }], ['selected_choice_index', 'saved_at'])
+    db.session.commit()
+
+def _individual(attempt_id, question_id, index, saved_at):
+    ExamRepository.save_individual_answer(attempt_id, question_id, index, saved_at)
+
+def _buffered(attempt_id, question_id, index, saved_at):
+    ExamRepository.save_buffered_answers([(attempt_id, question_id, index, saved_at)])
+
+@pytest.mark.parametrize("write", [_upsert, _individual, _buffered])
+def test_concurrent_saves_keep_one_row_with_the_newest_answer(app, exam, write):
+    joined, error = ExamService.join_exam(exam.students[0].id, exam.session.code)
+    assert error is None
+    attempt_id = joined["attempt_id"]
+    question_id = joined["qcm"]["questions"][0]["id"]
+
+    # Writer i saved answer i at base + i seconds; they reach the database in any order
+    base = datetime.now()
+    writers = list(range(WRITERS))
+    random.shuffle(writers)
+    start = threading.Barrier(WRITERS)
+    errors = []
+
+    def save(i):
+        with app.app_context():
+            try:
+                start.wait()
+                write(attempt_id, question_id, i, base + timedelta(seconds=i))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    db.session.expire_all()
+    rows = StudentAnswer.query.filter_by(attempt_id=attempt_id, question_id=question_id).all()
+    assert [(r.selected_choice_index, r.saved_at) for r in rows] == [(WRITERS - 1, base + timedelta(seconds=WRITERS - 1))]
@@ -0,0 +1,78 @@
+import threading
+import time
+from datetime import datetime
+import pytest
+from src.exams import autosave
+from src.exams.repository import ExamRepository
+from src.exams.service import ExamService
+from src.extensions import db
+
+@pytest.fixture
+def attempt(app, exam, monkeypatch):
+    # Only explicit flushes in these tests
+    monkeypatch.setitem(app.config, "AUTOSAVE_FLUSH_SECONDS", 3600)
+    joined, error = ExamService.join_exam(exam.students[0].id, exam.session.code)
+    assert error is None
+    question_ids = [q["id"] for q in joined["qcm"]["questions"]]
+    return joined["attempt_id"], question_ids
+
+def _stored(attempt_id):
+    db.session.expire_all()
+    return {a.question_id: a.selected_choice_index for a in ExamRepository.get_saved_answers(attempt_id)}
+
+def test_submit_writes_local_autosaves_and_refuses_later_ones(attempt):
+    attempt_id, (q1, q2, q3, _) = attempt
+    assert ExamService.save_answer(attempt_id, q1, 2)[1] is None
+    assert _stored(attempt_id) == {}
+
+    result, error = ExamService.submit_exam(attempt_id, [{"question_id": q2, "selected_index": 1}])
+    assert error is None and result["correct_answers"] == 1
+
+    assert _stored(attempt_id) == {q1: 2, q2: 1}
+    assert ExamService.save_answer(attempt_id, q3, 1)[1] == "Attempt not found or already submitted."
+
+def test_flush_from_another_worker_after_submit_writes_nothing(app, attempt):
+    attempt_id, (q1, q2, _, _) = attempt
+    ExamService.submit_exam(attempt_id, [{"question_id": q2, "selected_index": 1}])
+
+    # Another worker still has the attempt cached as open and buffers an answer
+    autosave.get_open_attempt(attempt_id, lambda _: frozenset(attempt[1]))
+    autosave.put(app, attempt_id, q1, 3)
+    assert autosave.flush(app) == 0
+    assert _stored(attempt_id) == {q2: 1}
+    # That flush told the worker the attempt is finished: it is looked up again next time
+    assert autosave.get_open_attempt(attempt_id, lambda _: None) is None
+
+def test_unbuffered_save_after_submit_is_refused(app, attempt, monkeypatch):
+    monkeypatch.setitem(app.config, "AUTOSAVE_FLUSH_SECONDS", 0)
+    attempt_id, (q1, q2, _, _) = attempt
+    assert ExamService.save_answer(attempt_id, q1, 0)[1] is None
+    ExamService.submit_exam(attempt_id, [{"question_id": q2, "selected_index": 1}])
+
+    assert ExamService.save_answer(attempt_id, q1, 3)[1] == "Exam already submitted."
+    assert _stored(attempt_id) == {q1: 0, q2: 1}
+
+def test_flush_waits_for_a_submit_in_progress(app, attempt):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("row locks need Postgres (set TEST_DATABASE_URL)")
+    attempt_id, (q1, _, _, _) = attempt
+    locked = threading.Event()
+
+    def submit():
+        with app.app_context():
+            row = ExamRepository.get_attempt(attempt_id, for_update=True)
+            locked.set()
+            time.sleep(0.5)
+            ExamRepository.save_answers_and_score(row, [], 0)
+            db.session.remove()
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    locked.wait()
+    started = time.perf_counter()
+    written, finished = ExamRepository.save_buffered_answers([(attempt_id, q1, 3, datetime.now())])
+    thread.join()
+
+    assert time.perf_counter() - started >= 0.3
+    assert (written, finished) == (0, {attempt_id})
+    assert _stored(attempt_id) == {}
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from src.documents.models import Document, DocumentStatus
+from src.documents.repository import DocumentRepository, snippet_html
+
+def _document(database, exam, status, started_minutes_ago=None):
+    doc = Document(filename=f"{status.value}.txt", module="Algo", file_path="x.txt", status=status,
+                   branch_id=exam.professor.branch_id, user_id=exam.professor.id)
+    if started_minutes_ago is not None:
+        doc.processing_started_at = datetime.utcnow() - timedelta(minutes=started_minutes_ago)
+    database.session.add(doc)
+    database.session.commit()
+    return doc
+
+def test_requeue_leaves_documents_a_worker_is_extracting(database, exam):
+    pending = _document(database, exam, DocumentStatus.PENDING)
+    running = _document(database, exam, DocumentStatus.PROCESSING, started_minutes_ago=2)
+    stale = _document(database, exam, DocumentStatus.PROCESSING, started_minutes_ago=90)
+    _document(database, exam, DocumentStatus.READY)
+
+    stuck = DocumentRepository.get_stuck(datetime.utcnow() - timedelta(minutes=30))
+
+    assert [d.id for d in stuck] == [pending.id, stale.id]
+    assert running not in stuck
+
+def test_picking_a_document_up_records_when(database, exam):
+    doc = _document(database, exam, DocumentStatus.PENDING)
+    DocumentRepository.set_status(doc, DocumentStatus.PROCESSING)
+    assert doc.processing_started_at is not None
+
+def test_snippets_escape_the_document_text():
+    raw = "<script>alert(1)</script> le \ue000polymorphisme\ue001 & l'héritage"
+    assert snippet_html(raw) == (
+        "&lt;script&gt;alert(1)&lt;/script&gt; le <mark>polymorphisme</mark> &amp; l&#x27;héritage"
+    )
+    assert snippet_html(None) == ""
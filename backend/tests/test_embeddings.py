@@ -0,0 +1,35 @@
+import numpy as np
+from src.qcm import embeddings
+from src.qcm.embeddings import BankIndex
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def _index(rows, vectors, signature=None):
+    return BankIndex(signature or (len(rows), max(r[0] for r in rows), None), rows, np.array(vectors))
+
+def test_questions_of_the_checked_qcm_are_not_reported():
+    index = _index(
+        [(1, 10, "QCM A", "sibling"), (2, 20, "QCM B", "other")],
+        [_unit(1, 0), _unit(1, 0.01)]
+    )
+    matches = index.search(np.array([_unit(1, 0)]), 0.9, exclude_qcm_id=10)
+
+    assert [row[0] for row, _ in matches[0]] == [2]
+
+def test_added_and_edited_questions_are_merged(monkeypatch):
+    monkeypatch.setattr(embeddings, "embed_texts", lambda texts, model: np.array([_unit(0, 1) for _ in texts]))
+    index = _index([(1, 10, "A", "old"), (2, 10, "A", "kept")], [_unit(1, 0), _unit(1, 0)])
+
+    updated = index.updated((3, 3, "t"), [(1, 10, "A", "edited"), (3, 20, "B", "new")], "model")
+
+    assert [r[3] for r in updated.rows] == ["edited", "kept", "new"]
+    assert np.allclose(updated.matrix, [_unit(0, 1), _unit(1, 0), _unit(0, 1)])
+
+def test_deletions_force_a_rebuild(monkeypatch):
+    monkeypatch.setattr(embeddings, "embed_texts", lambda texts, model: np.array([_unit(0, 1) for _ in texts]))
+    index = _index([(1, 10, "A", "a"), (2, 10, "A", "b")], [_unit(1, 0), _unit(1, 0)])
+
+    # Question 2 deleted, question 3 added: same count, but not a pure addition
+    assert index.updated((2, 3, None), [(3, 10, "A", "c")], "model") is None
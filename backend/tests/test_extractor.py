@@ -0,0 +1,38 @@
+from src.documents.extractor import strip_repeated_lines
+
+def _page(n, body):
+    return "\n".join(["Université X - Cours de Java", *body, f"Page {n} / 8"])
+
+def test_running_header_and_page_numbers_are_removed():
+    pages = [_page(n, [f"Contenu de la page {n}.", "Suite du cours."]) for n in range(1, 9)]
+    cleaned, removed = strip_repeated_lines(pages)
+
+    assert cleaned[0].startswith("Université X")  # First occurrence kept
+    for text in cleaned[1:]:
+        assert "Université X" not in text
+        assert "Page" not in text
+    assert removed > 0
+
+def test_numbered_exercises_are_content():
+    pages = [
+        "\n".join([f"Exercice {n}", f"Écrire une classe Compte{n} avec un solde.", f"Question {n} : que vaut le solde ?"])
+        for n in range(1, 9)
+    ]
+    cleaned, removed = strip_repeated_lines(pages)
+
+    assert cleaned == pages
+    assert removed == 0
+
+def test_pages_are_never_emptied():
+    # Slides made only of repeated lines: the 40-page case must keep every page
+    pages = ["Plan du cours\nIntroduction" for _ in range(40)]
+    cleaned, _ = strip_repeated_lines(pages)
+
+    assert all(text.strip() for text in cleaned)
+
+def test_line_holding_most_of_the_page_is_kept():
+    long_line = "Définition : une interface déclare des méthodes sans les implémenter."
+    pages = [f"{long_line}\n{n}" for n in range(1, 10)]
+    cleaned, _ = strip_repeated_lines(pages)
+
+    assert all(long_line in text for text in cleaned)
@@ -0,0 +1,135 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from src.extensions import db
+from src.qcm import jobs
+from src.qcm.models import JobStatus
+from src.qcm.repository import QCMRepository
+from src.qcm.service import QCMService
+from conftest import auth_header
+
+def _job(exam, status):
+    job = QCMRepository.create_job(exam.professor.id, exam.qcm.document_id, {"num_questions": 4})
+    job.qcm_id = exam.qcm.id
+    return QCMRepository.update_job(job, status)
+
+def _events(stream):
+    return [chunk for chunk in stream if chunk.startswith(("id:", "event:"))]
+
+def test_events_url_token_only_opens_its_own_job(client, exam):
+    job = _job(exam, JobStatus.SUCCEEDED)
+    other = _job(exam, JobStatus.SUCCEEDED)
+    url = QCMService.job_events_url(job)
+    token = url.split("token=", 1)[1]
+
+    assert client.get(url).status_code == 200
+    assert client.get(f"/qcm/jobs/{other.id}/events?token={token}").status_code == 401
+    assert client.get(f"/qcm/jobs/{job.id}/events").status_code == 401
+    # The access token is never accepted in the URL
+    access = auth_header(exam.professor)["Authorization"].split()[1]
+    assert client.get(f"/qcm/jobs/{job.id}/events?jwt={access}").status_code == 401
+    assert client.get(f"/qcm/jobs/{job.id}/events?token={access}").status_code == 401
+
+def test_reconnecting_stream_resumes_after_last_event_id(client, exam):
+    job = _job(exam, JobStatus.SUCCEEDED)
+    question_ids = [q.id for q in exam.qcm.questions]
+
+    response = client.get(QCMService.job_events_url(job), headers={"Last-Event-ID": str(question_ids[1])})
+    body = response.get_data(as_text=True)
+
+    assert body.startswith("retry: ")
+    sent = [int(line[4:]) for line in body.splitlines() if line.startswith("id: ")]
+    assert sent == [question_ids[2], question_ids[3], question_ids[3]]   # 2 questions, then the status
+    assert body.count("event: question") == 2 and body.count("event: status") == 1
+
+def test_stream_of_a_running_job_ends_after_its_duration(database, exam):
+    job = _job(exam, JobStatus.RUNNING)
+    events = _events(QCMService.iter_job_events(job.id, poll_interval=0, duration=0))
+    assert sum("event: status" in e for e in events) == 1
+
+def test_job_lost_in_a_restart_fails_and_stops_counting_against_the_cap(app, database, exam):
+    lost = _job(exam, JobStatus.RUNNING)
+    lost.heartbeat_at = datetime.utcnow() - timedelta(seconds=app.config["GENERATION_JOB_LEASE_SECONDS"] + 1)
+    held = _job(exam, JobStatus.QUEUED)
+    db.session.commit()
+
+    assert jobs.fail_lost_jobs(user_id=exam.professor.id) == 1
+    db.session.expire_all()
+    assert (lost.status, held.status) == (JobStatus.FAILED, JobStatus.QUEUED)
+    assert lost.finished_at is not None and "restart" in lost.error
+    assert QCMRepository.count_active_jobs(exam.professor.id) == 1
+
+def test_heartbeat_keeps_a_held_job_alive(app, database, exam):
+    job = _job(exam, JobStatus.QUEUED)
+    job.heartbeat_at = datetime.utcnow() - timedelta(seconds=app.config["GENERATION_JOB_LEASE_SECONDS"] + 1)
+    db.session.commit()
+
+    QCMRepository.touch_jobs([job.id])
+    assert jobs.fail_lost_jobs(job_id=job.id) == 0
+    db.session.expire_all()
+    assert job.status == JobStatus.QUEUED
+
+def test_job_over_the_user_limit_is_not_created(database, exam):
+    user_id, document_id = exam.professor.id, exam.qcm.document_id
+    assert QCMRepository.create_job_within_limit(user_id, document_id, {}, 1) is not None
+    assert QCMRepository.create_job_within_limit(user_id, document_id, {}, 1) is None
+    assert QCMRepository.count_active_jobs(user_id) == 1
+
+def test_concurrent_requests_cannot_all_pass_the_user_limit(app, database, exam):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("row locks need Postgres (set TEST_DATABASE_URL)")
+    user_id, document_id = exam.professor.id, exam.qcm.document_id
+    requests = 6
+    start = threading.Barrier(requests)
+    created = []
+
+    def submit():
+        with app.app_context():
+            try:
+                start.wait()
+                created.append(QCMRepository.create_job_within_limit(user_id, document_id, {}, 2) is not None)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=submit) for _ in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert created.count(True) == 2
+    assert QCMRepository.count_active_jobs(user_id) == 2
+
+def test_job_short_of_questions_reports_how_many_are_missing(database, exam, monkeypatch):
+    job = QCMRepository.create_job(exam.professor.id, exam.qcm.document_id, {"num_questions": 6})
+    monkeypatch.setattr(QCMService, "generate_exam", lambda *args, **kwargs: (exam.qcm, None))
+
+    jobs.run_generation_job(job.id)
+    status = _events(QCMService.iter_job_events(job.id, poll_interval=0))[-1]
+    assert job.status == JobStatus.SUCCEEDED
+    assert '"missing_questions": 2' in status
+
+def test_job_questions_are_streamed_shard_by_shard(database, exam):
+    job = QCMRepository.create_job(exam.professor.id, exam.qcm.document_id, {"num_questions": 4})
+    data = {"title": "Algo", "level": "medium", "user_id": exam.professor.id, "document_id": exam.qcm.document_id}
+    shard = [{"text": f"Question {i}?", "choices": [{"text": "a", "is_correct": True}, {"text": "b", "is_correct": False}]}
+             for i in range(4)]
+    seen = []
+
+    def generate(on_shard):
+        for batch in (shard[:2], shard[2:]):
+            on_shard(batch)
+            seen.append(len(QCMRepository.get_questions_after(job.qcm_id)))
+        return shard, None
+
+    qcm, error = QCMService._generate_into_job(generate, lambda questions: questions, data, job)
+    assert error is None and job.qcm_id == qcm.id
+    assert seen == [2, 4]
+
+def test_job_that_saved_nothing_leaves_no_qcm(database, exam):
+    job = QCMRepository.create_job(exam.professor.id, exam.qcm.document_id, {"num_questions": 4})
+    data = {"title": "Algo", "level": "medium", "user_id": exam.professor.id, "document_id": exam.qcm.document_id}
+
+    qcm, error = QCMService._generate_into_job(lambda on_shard: (None, "AI Error: boom"), lambda q: q, data, job)
+    assert (qcm, error, job.qcm_id) == (None, "AI Error: boom", None)
+    assert QCMRepository.get_by_user(exam.professor.id) == [exam.qcm]
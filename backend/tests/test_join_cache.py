@@ -0,0 +1,44 @@
+from src.exams import join_cache
+from src.exams.service import ExamService
+from conftest import auth_header
+
+def _join(client, student, code):
+    return client.post("/exams/join", json={"code": code}, headers=auth_header(student))
+
+def test_closing_a_session_stops_cached_joins(client, exam):
+    alice, bob = exam.students
+    assert _join(client, alice, exam.session.code).status_code == 200
+
+    response = client.patch(f"/exams/{exam.session.id}", json={"is_active": False},
+                            headers=auth_header(exam.professor))
+    assert response.status_code == 200
+
+    assert _join(client, bob, exam.session.code).status_code == 400
+    assert not join_cache._payloads
+
+def test_editing_the_duration_rebuilds_the_payload(client, exam):
+    alice = exam.students[0]
+    before = _join(client, alice, exam.session.code).get_json()
+    assert before["exam_config"]["seconds_per_question"] == 60 * 60 // 4
+
+    response = client.patch(f"/exams/{exam.session.id}", json={"duration_minutes": 20},
+                            headers=auth_header(exam.professor))
+    assert response.status_code == 200
+
+    after = _join(client, alice, exam.session.code).get_json()
+    assert after["exam_config"]["total_duration"] == 20
+    assert after["exam_config"]["seconds_per_question"] == 20 * 60 // 4
+
+def test_deleting_a_session_evicts_it(client, exam):
+    code = exam.session.code
+    assert join_cache.get_session(code, ExamService._load_session_for_join, 30) is not None
+
+    message, error = ExamService.delete_exam_session(exam.professor.id, exam.session.id)
+    assert error is None
+    assert _join(client, exam.students[0], code).status_code == 400
+
+def test_only_the_owner_can_edit(client, exam):
+    response = client.patch(f"/exams/{exam.session.id}", json={"is_active": False},
+                            headers=auth_header(exam.students[0]))
+    assert response.status_code == 403
+    assert _join(client, exam.students[0], exam.session.code).status_code == 200
@@ -0,0 +1,37 @@
+from src.documents.models import Document, DocumentBlob, DocumentStatus
+from src.qcm import practice
+from src.qcm.models import PracticeServed
+from src.qcm.repository import QCMRepository
+
+QUESTIONS = [{"text": f"Question {i} ?", "choices": [{"text": "a", "is_correct": True}, {"text": "b", "is_correct": False}]}
+             for i in range(6)]
+
+def _same_content(database, exam):
+    """The exam's document and a second upload of the same file."""
+    first = exam.qcm.document
+    blob = DocumentBlob(sha256="a" * 64, file_path=first.file_path, size_bytes=1)
+    database.session.add(blob)
+    first.content_hash = blob.sha256
+    second = Document(filename="copie.txt", module="Algo", branch_id=first.branch_id, file_path=first.file_path,
+                      content_hash=blob.sha256, user_id=exam.professor.id, status=DocumentStatus.READY)
+    database.session.add(second)
+    database.session.commit()
+    return first, second
+
+def test_first_request_only_queues_a_fill_of_its_level(database, exam, monkeypatch):
+    queued = []
+    monkeypatch.setattr(practice, "enqueue_pool_fill", lambda doc_id, level: queued.append((doc_id, level)))
+
+    assert practice.serve_from_pool(exam.students[0].id, exam.qcm.document, 4, "medium") is None
+    assert queued == [(exam.qcm.document_id, "medium")]
+
+def test_uploads_of_the_same_content_share_one_pool(database, exam, monkeypatch):
+    monkeypatch.setattr(practice, "enqueue_pool_fill", lambda doc_id, level: None)
+    first, second = _same_content(database, exam)
+    QCMRepository.add_to_pool(first.id, "medium", QUESTIONS)
+
+    assert QCMRepository.get_pool_document_id(second, "medium") == first.id
+    assert QCMRepository.get_pool_document_id(second, "hard") == second.id
+    qcm = practice.serve_from_pool(exam.students[0].id, second, 4, "medium")
+    assert qcm.document_id == second.id and len(qcm.questions) == 4
+    assert PracticeServed.query.filter_by(user_id=exam.students[0].id).count() == 4
@@ -0,0 +1,80 @@
+import pytest
+from src.qcm.providers import LLMProvider, ProviderError
+from src.qcm.resilience import ResilientProvider, ProviderUnavailable
+from src.qcm.sharding import generate_sharded
+
+class ScriptedProvider(LLMProvider):
+    name = "scripted"
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate(self, prompt, num_questions, temperature):
+        self.calls += 1
+        error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise error
+        return "[]"
+
+def _resilient(provider, **options):
+    return ResilientProvider(provider, backoff_base=0, backoff_max=0, **options)
+
+def test_rejected_requests_do_not_reset_the_breaker():
+    provider = _resilient(
+        ScriptedProvider([ProviderError("503", retryable=True), ProviderError("400")] * 3),
+        max_retries=0, breaker_threshold=3
+    )
+    for _ in range(3):
+        with pytest.raises(ProviderUnavailable):
+            provider.generate("p", 1, 0.3)
+        with pytest.raises(ProviderError):
+            provider.generate("p", 1, 0.3)
+
+    assert provider.breaker.opened_at is not None
+
+def test_rejected_trial_call_keeps_the_circuit_half_open():
+    provider = _resilient(ScriptedProvider([ProviderError("401")]), breaker_threshold=1, breaker_reset_seconds=0)
+    provider.breaker.record_failure()
+
+    with pytest.raises(ProviderError):
+        provider.generate("p", 1, 0.3)
+
+    assert provider.breaker.opened_at is not None
+    assert provider.breaker.trial_running is False
+
+def test_provider_outage_is_not_retried_per_shard():
+    provider = _resilient(ScriptedProvider([ProviderError("503", retryable=True)] * 100), max_retries=2)
+
+    def generate(text, num_questions, level, mode):
+        provider.generate(text, num_questions, 0.3)
+        return [], None
+
+    with pytest.raises(ProviderUnavailable):
+        generate_sharded(generate, ["a", "b"], [5, 5], "medium", "professor", max_workers=1, max_retries=2)
+
+    # 2 shards x (1 call + 2 provider retries), no shard-level retries on top
+    assert provider.provider.calls == 6
+
+def test_a_provider_without_generate_cannot_be_built():
+    class Incomplete(LLMProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_each_shard_is_passed_on_as_it_completes_without_duplicates():
+    def generate(text, num_questions, level, mode):
+        return [{"text": f"Quelle est la complexité du tri {text} ?",
+                 "choices": [{"text": "a", "is_correct": True}, {"text": "b", "is_correct": False}]}
+                for _ in range(num_questions)], None
+
+    batches = []
+    questions, error = generate_sharded(generate, ["rapide", "rapide", "fusion"], [2, 2, 2], "medium",
+                                        "professor", max_workers=1, on_shard=batches.append)
+
+    assert error is None
+    assert [[q["text"] for q in batch] for batch in batches] == [
+        ["Quelle est la complexité du tri rapide ?"], ["Quelle est la complexité du tri fusion ?"]
+    ]
+    assert questions == batches[0] + batches[1]
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from rendering.variants import make_variant, render_batch
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONTENT = {
+    "title": "Algo",
+    "questions": [
+        {"text": f"Question {i}?", "choices": [{"text": f"c{j}", "is_correct": j == i % 4} for j in range(4)]}
+        for i in range(8)
+    ],
+}
+
+def test_same_seed_same_variant():
+    questions, key = make_variant(CONTENT, "td3-1")
+    again, again_key = make_variant(CONTENT, "td3-1")
+    assert key == again_key
+    assert [q.text for q in questions] == [q.text for q in again]
+    # Each letter points at the correct choice of its shuffled question
+    for q, letter in zip(questions, key):
+        assert q.choices[ord(letter) - 65]["is_correct"]
+
+def test_render_batch_returns_pdfs():
+    [(number, seed, paper, answers, key)] = render_batch(CONTENT, ["s-1"], [1])
+    assert (number, seed) == (1, "s-1")
+    assert paper.startswith(b"%PDF") and answers.startswith(b"%PDF")
+    assert len(key) == len(CONTENT["questions"])
+
+def test_worker_module_does_not_import_the_app():
+    code = (
+        "import sys, rendering.variants; "
+        "print(sorted(m for m in ('flask', 'sqlalchemy', 'src') if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,13 @@
+from types import SimpleNamespace
+from src.qcm.versions import content_hash, snapshot_qcm
+
+def _qcm(text):
+    question = SimpleNamespace(id=1, text=text, choices=[{"text": "a", "is_correct": True}], duration=30)
+    return SimpleNamespace(id=7, title="QCM", level="easy", questions=[question])
+
+def test_content_hash_matches_the_snapshot_hash():
+    qcm = _qcm("Question ?")
+    assert content_hash(qcm) == snapshot_qcm(qcm)[0]
+
+def test_content_hash_changes_with_the_questions():
+    assert content_hash(_qcm("Question ?")) != content_hash(_qcm("Autre question ?"))
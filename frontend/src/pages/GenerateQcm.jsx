@@ -53,7 +53,18 @@ const GenerateQcm = () => {
         level: formData.level,
       });
 
-      setSuccess(`QCM generated successfully! (ID: ${response.data.qcm_id})`);
+      // Generation runs in the background: poll the job until it finishes
+      let job = response.data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = (await qcmAPI.getJob(response.data.job_id)).data;
+      }
+      if (job.status === 'failed' || job.status === 'unavailable') {
+        setError(job.error || 'Failed to generate QCM. Please try again.');
+        return;
+      }
+
+      setSuccess(`QCM generated successfully! (ID: ${job.qcm_id})`);
       setTimeout(() => {
         navigate('/my-qcms');
       }, 2000);
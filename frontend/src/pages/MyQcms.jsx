@@ -7,22 +7,31 @@ const MyQcms = () => {
   const [qcms, setQcms] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchQcms();
   }, []);
 
-  const fetchQcms = async () => {
+  const fetchQcms = async (cursor = null) => {
     try {
-      const response = await qcmAPI.list();
-      setQcms(response.data);
+      const response = await qcmAPI.list(cursor ? { cursor } : undefined);
+      setQcms((previous) => (cursor ? [...previous, ...response.data.items] : response.data.items));
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       setError('Failed to load QCMs');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const handleLoadMore = () => {
+    setLoadingMore(true);
+    fetchQcms(nextCursor);
+  };
+
   const handleCreateSession = (qcmId) => {
     navigate(`/create-exam/${qcmId}`);
   };
@@ -130,6 +139,18 @@ const MyQcms = () => {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <div className="mt-8 text-center">
+          <button
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+            className="bg-gray-100 hover:bg-gray-200 text-gray-700 font-medium py-2 px-6 rounded-lg transition disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -48,7 +48,12 @@ const QcmDetails = () => {
 
   const handleDownloadPDF = async () => {
     try {
-      const response = await qcmAPI.downloadPDF(qcmId);
+      let response = await qcmAPI.downloadPDF(qcmId);
+      // Large QCMs are rendered in the background: retry until the file is ready
+      while (response.status === 202) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        response = await qcmAPI.downloadPDF(qcmId);
+      }
       const url = window.URL.createObjectURL(new Blob([response.data]));
       const link = document.createElement('a');
       link.href = url;
@@ -62,16 +62,27 @@ export const documentAPI = {
       },
     });
   },
+  uploadBulk: (formData) => {
+    return api.post('/documents/upload/bulk', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+  },
   list: () => api.get('/documents/'),
+  getStatus: (docId) => api.get(`/documents/${docId}/status`),
+  search: (query) => api.get('/documents/search', { params: { q: query } }),
 };
 
 export const qcmAPI = {
   generate: (data) => api.post('/qcm/generate', data),
-  list: () => api.get('/qcm/'),
+  getJob: (jobId) => api.get(`/qcm/jobs/${jobId}`),
+  list: (params) => api.get('/qcm/', { params }),
   getById: (qcmId) => api.get(`/qcm/${qcmId}`),
   delete: (qcmId) => api.delete(`/qcm/${qcmId}`),
   updateQuestion: (questionId, data) => api.put(`/qcm/question/${questionId}`, data),
   downloadPDF: (qcmId) => api.get(`/qcm/${qcmId}/download`, { responseType: 'blob' }),
+  downloadVariants: (qcmId, count, seed) => api.post(`/qcm/${qcmId}/variants`, { count, seed }, { responseType: 'blob' }),
 };
 
 export const examAPI = {